@@ -1,11 +1,30 @@
-from copy import deepcopy
-import copy
+from array import array
+from bisect import bisect_left
+from collections import namedtuple, OrderedDict
 from heapq import heappush, heappop
-import heapq
+from itertools import combinations
+from operator import itemgetter
+import math
+import multiprocessing
 import time
 import argparse
+import cProfile
+import json
+import mmap
+import struct
 import sys
 import os
+import tempfile
+
+try:
+    import numpy as np
+except ImportError: # optional, only the batch functions need it
+    np = None
+
+try:
+    import resource
+except ImportError: # not on Windows
+    resource = None
 
 #====================================================================================
 
@@ -17,7 +36,7 @@ class Piece:
     This represents a piece on the Hua Rong Dao puzzle.
     """
 
-    def __init__(self, is_goal, is_single, coord_x, coord_y, orientation):
+    def __init__(self, is_goal, is_single, coord_x, coord_y, orientation, shape=None):
         """
         :param is_goal: True if the piece is the goal piece and False otherwise.
         :type is_goal: bool
@@ -30,6 +49,9 @@ class Piece:
         :param orientation: The orientation of the piece (one of 'h' or 'v') 
             if the piece is a 1x2 piece. Otherwise, this is None
         :type orientation: str
+        :param shape: The shape of a piece that is none of the above (see Board geometry),
+            otherwise None
+        :type shape: Optional[Tuple[Tuple[int, int], ...]]
         """
 
         self.is_goal = is_goal
@@ -37,6 +59,7 @@ class Piece:
         self.coord_x = coord_x
         self.coord_y = coord_y
         self.orientation = orientation
+        self.shape = shape
 
     def __repr__(self):
         return '{} {} {} {} {}'.format(self.is_goal, self.is_single, \
@@ -56,68 +79,525 @@ class Piece:
         self.coord_y = y
        
 
+#====================================================================================
+# Bitboard layout
+#
+# Cell (x, y) of the 4x5 board is bit y * 4 + x of a 20-bit mask (other board sizes
+# follow the same pattern, see Board geometry). A whole board is
+# packed into one integer key holding one mask per piece class (goal, vertical,
+# horizontal, single). Each mask marks the top left cell of every piece of that
+# class; the other cells a piece covers are recovered with shifts. The key is also
+# the hash key used by the explored sets of the searches.
+#====================================================================================
+
+board_width = 4
+board_height = 5
+board_cells = board_width * board_height
+full_mask = (1 << board_cells) - 1
+
+goal_shift = 0
+vertical_shift = board_cells
+horizontal_shift = 2 * board_cells
+single_shift = 3 * board_cells
+
+# every cell of the standard board but the rightmost column, for goal_keys; not rebuilt by
+# set_geometry, as only code limited to the standard board uses it
+col_left = 0x11111                      # every cell with x == 0
+not_col_3 = full_mask & ~(col_left << 3)
+
+goal_target = 1 << (3 * board_width + 1)  # top left corner of the goal piece at (1, 3)
+
+# (shift of the class mask in the key, is_goal, is_single, orientation)
+piece_classes = (
+    (goal_shift, True, False, None),
+    (vertical_shift, False, False, 'v'),
+    (horizontal_shift, False, False, 'h'),
+    (single_shift, False, True, None),
+)
+
+# For every piece class, the one cell moves it can make as
+# (step of the top left cell, top left cells allowed to make the step,
+#  offsets from the top left cell of the cells that must be empty).
+# Order is left, right, up, down. Built from the class shapes by set_geometry.
+shape_moves = ()
+
+
+def pieces_to_key(pieces):
+    """
+    Pack a list of pieces into a board key.
+
+    :param pieces: The list of Pieces
+    :type pieces: List[Piece]
+    :return: The board key
+    :rtype: int
+    """
+    key = 0
+    for piece in pieces:
+        if piece.is_goal:
+            shift = goal_shift
+        elif piece.shape is not None:
+            shift = class_shapes.index(piece.shape, 4) * board_cells
+        elif piece.is_single:
+            shift = single_shift
+        elif piece.orientation == 'v':
+            shift = vertical_shift
+        else:
+            shift = horizontal_shift
+        key |= 1 << (shift + piece.coord_y * board_width + piece.coord_x)
+    return key
+
+
+def key_to_pieces(key):
+    """
+    Unpack a board key into a list of pieces (goal first, then vertical,
+    horizontal and single pieces and pieces of other shapes, in cell order).
+
+    :param key: The board key
+    :type key: int
+    :rtype: List[Piece]
+    """
+    pieces = []
+    for i, (shift, is_goal, is_single, orientation) in enumerate(piece_classes):
+        shape = class_shapes[i] if i > 3 else None
+        mask = (key >> shift) & full_mask
+        while mask:
+            low = mask & -mask
+            cell = low.bit_length() - 1
+            pieces.append(Piece(is_goal, is_single, cell % board_width, cell // board_width, orientation, shape))
+            mask ^= low
+    return pieces
+
+
+def occupied_mask(key):
+    """
+    returns the 20-bit mask of every cell covered by a piece
+    """
+    goal = key & full_mask
+    vertical = (key >> vertical_shift) & full_mask
+    horizontal = (key >> horizontal_shift) & full_mask
+    single = key >> single_shift
+    return (goal | goal << 1 | goal << 4 | goal << 5
+            | vertical | vertical << 4
+            | horizontal | horizontal << 1
+            | single)
+
+
+# A move is stored as a delta against the board it is made on: the class the
+# moved piece belongs to (its shift in the key), the cell its top left corner
+# leaves and the cell it lands on. delta is the mask that applies the move to a
+# key with one xor; applying it a second time undoes it.
+Move = namedtuple('Move', ['shift', 'src', 'dst', 'delta'])
+
+
+def empty_moves(empty):
+    """
+    returns every move that could slide a piece one cell into the empty cells of a mask,
+    as (bit, move) pairs: the move can be made on a board with exactly these cells empty
+    if its key has bit set, that is if a piece of the right class has its top left corner
+    where the move starts. For each class and direction the corners are found all at once
+    by shifting the empty cells onto them. Moves come in the order key_moves returns them.
+    """
+    candidates = []
+    for shift, rules in shape_moves:
+        for step, allowed, leads in rules:
+            corners = allowed
+            for lead in leads:
+                corners &= (empty >> lead) if lead > 0 else (empty << -lead)
+            while corners:
+                low = corners & -corners
+                corners ^= low
+                src = low.bit_length() - 1
+                dst = src + step
+                candidates.append((low << shift, Move(shift, src, dst, (low | 1 << dst) << shift)))
+    return tuple(candidates)
+
+
+# The candidate moves of every mask of exactly two empty cells (see set_geometry)
+move_table = {}
+
+
+def key_moves(key):
+    """
+    returns every move that slides one piece of the board key one cell: the candidates
+    for its empty cells (see empty_moves) whose piece is on the board. Moves are ordered
+    by class, then left, right, up, down, then by the cell they start from.
+    """
+    empty = full_mask ^ occupied_mask(key)
+    candidates = move_table.get(empty)
+    if candidates is None:
+        #boards with more empty cells are worked out each time: caching them as well would
+        #grow without bound, as many masks as there are ways to leave the cells empty
+        candidates = empty_moves(empty)
+    return [move for bit, move in candidates if key & bit]
+
+
+def successor_keys(key):
+    """
+    returns the keys of every board reachable from key by moving one piece one cell.
+    """
+    return [key ^ move.delta for move in key_moves(key)]
+
+
+# Masks used to mirror a key left to right. Every row of every class mask is one
+# nibble of the key, so reversing the bits of all nibbles at once mirrors every
+# cell; the top left corner of a 2-wide piece then sits one cell too far right.
+nibble_pairs = int('3' * (len(piece_classes) * board_cells // 4), 16)
+nibble_odds = int('5' * (len(piece_classes) * board_cells // 4), 16)
+wide_classes = full_mask << goal_shift | full_mask << horizontal_shift
+
+
+def mirror_key(key):
+    """
+    returns the key of the board reflected about its vertical axis
+    """
+    key = (key & nibble_pairs) << 2 | (key >> 2) & nibble_pairs
+    key = (key & nibble_odds) << 1 | (key >> 1) & nibble_odds
+    wide = key & wide_classes
+    return key ^ wide | wide >> 1
+
+
+def canonical_key(key):
+    """
+    Map a board and its mirror image onto one key. Pieces of the same shape are
+    already interchangeable since the key only records which cells hold a piece of
+    each class. The goal position is symmetric, so both boards are equally far from
+    solved.
+
+    :param key: The board key
+    :type key: int
+    :return: The smaller of key and its mirror, and whether it is the mirror
+    :rtype: Tuple[int, bool]
+    """
+    mirrored = mirror_key(key)
+    if mirrored < key:
+        return mirrored, True
+    return key, False
+
+
+# manhattan distance from every cell to the nearest cell the top left corner of the
+# goal piece may end on (see set_geometry)
+goal_distances = ()
+
+
+def goal_distance(key):
+    """
+    manhattan distance of the top left corner of the goal piece from (1, 3), or from the
+    nearest goal cell the board declares
+    """
+    return goal_distances[(key & full_mask).bit_length() - 1]
+
+
+#====================================================================================
+# Board geometry
+#
+# The size of the board, the shape of every class of pieces and the cells the goal
+# piece may end on make up a Geometry. set_geometry builds every table the move
+# generator, the heuristics and the output read from it; read_board calls it when a
+# puzzle declares a board of its own, so tables always fit the board being solved.
+# The standard 4x5 board keeps its hand written bit tricks for the occupied cells and
+# the mirror image, other boards get general versions driven by per class tables.
+# Features built on 64-bit packed keys (the solution database and the heuristics and
+# searches reading it, graph export, cache files) need the standard board.
+#
+# A shape is the cells a piece covers as (dx, dy) offsets from its top left cell, the
+# first cell it covers in reading order. The goal class comes first, then vertical,
+# horizontal and single pieces, then any other shapes, each shifted one board further
+# up the key.
+#====================================================================================
+
+Geometry = namedtuple('Geometry', ['width', 'height', 'shapes', 'goal_corners'])
+
+goal_shape = ((0, 0), (1, 0), (0, 1), (1, 1))
+vertical_shape = ((0, 0), (0, 1))
+horizontal_shape = ((0, 0), (1, 0))
+single_shape = ((0, 0),)
+
+classic_geometry = Geometry(4, 5, (goal_shape, vertical_shape, horizontal_shape, single_shape), ((1, 3),))
+geometry = None # the geometry the tables are built for
+
+# left, right, up, down as (dx, dy): the order moves are generated in
+directions = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+# letters drawn for the pieces of classes with no characters of their own; v is the
+# bottom of a vertical piece
+piece_letters = 'abcdefghijklmnopqrstuwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+# the 4x5 versions, picked back up whenever the standard board is loaded
+classic_occupied_mask = occupied_mask
+classic_mirror_key = mirror_key
+mirrored_canonical_key = canonical_key
+
+
+def normalize_shape(cells):
+    """
+    returns the shape of a piece covering cells, given as (x, y) pairs, and its top left cell
+    """
+    cells = sorted(cells, key=lambda cell: (cell[1], cell[0]))
+    x0, y0 = cells[0]
+    return tuple((x - x0, y - y0) for x, y in cells), (x0, y0)
+
+
+def is_connected(cells):
+    """
+    returns True if every cell of a piece, given as (x, y) pairs, joins the others through
+    cells sharing a side
+    """
+    cells = set(cells)
+    stack = [next(iter(cells))]
+    reached = set(stack)
+    while stack:
+        x, y = stack.pop()
+        for cell in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if cell in cells and cell not in reached:
+                reached.add(cell)
+                stack.append(cell)
+    return len(reached) == len(cells)
+
+
+def mirror_shape(shape):
+    """
+    returns the shape reflected about a vertical axis
+    """
+    return normalize_shape((-dx, dy) for dx, dy in shape)[0]
+
+
+def build_shape_moves(shapes, width, height):
+    """
+    returns the move rules of every class as (shift of the class mask in the key, rules),
+    with one (step of the top left cell, top left cells allowed to make the step, offsets
+    from the top left cell of the cells that must be empty) rule per direction
+    """
+    cells = width * height
+
+    def fits(shape, x, y):
+        return all(0 <= x + dx < width and 0 <= y + dy < height for dx, dy in shape)
+
+    shape_moves = []
+    for i, shape in enumerate(shapes):
+        rules = []
+        for mx, my in directions:
+            allowed = 0
+            for cell in range(cells):
+                x, y = cell % width, cell // width
+                if fits(shape, x, y) and fits(shape, x + mx, y + my):
+                    allowed |= 1 << cell
+            covered = set(shape)
+            leads = sorted(dx + mx + (dy + my) * width for dx, dy in shape if (dx + mx, dy + my) not in covered)
+            rules.append((mx + my * width, allowed, tuple(leads)))
+        shape_moves.append((i * cells, tuple(rules)))
+    return tuple(shape_moves)
+
+
+def general_occupied_mask(key):
+    """
+    returns the mask of every cell covered by a piece, on any board
+    """
+    occupied = 0
+    for shift, offsets in class_offsets:
+        mask = (key >> shift) & full_mask
+        if mask:
+            for offset in offsets:
+                occupied |= mask << offset if offset >= 0 else mask >> -offset
+    return occupied
+
+
+def general_mirror_key(key):
+    """
+    returns the key of the board reflected about its vertical axis, on any board
+    """
+    mirrored = 0
+    for shift, mirror_shift, anchors in mirror_classes:
+        mask = (key >> shift) & full_mask
+        while mask:
+            low = mask & -mask
+            mask ^= low
+            mirrored |= 1 << (mirror_shift + anchors[low.bit_length() - 1])
+    return mirrored
+
+
+def unmirrored_key(key):
+    """
+    canonical_key for boards that aren't symmetric: every board is its own canonical key
+    """
+    return key, False
+
+
+def mirror_move(move):
+    """
+    returns the move reflected about the vertical axis of the board
+    """
+    for shift, mirror_shift, anchors in mirror_classes:
+        if shift == move.shift:
+            src = anchors[move.src]
+            dst = anchors[move.dst]
+            return Move(mirror_shift, src, dst, (1 << src | 1 << dst) << mirror_shift)
+
+
+def require_classic_board(feature):
+    """
+    Raise ValueError unless the current geometry is the standard 4x5 board.
+    """
+    if geometry != classic_geometry:
+        raise ValueError('{} needs the standard 4x5 board'.format(feature))
+
+
+def set_geometry(new):
+    """
+    Make new the geometry of every board from now on and rebuild the tables that depend
+    on it. Keys of boards of another geometry mean nothing afterwards.
+
+    :type new: Geometry
+    """
+    global geometry, board_width, board_height, board_cells, full_mask
+    global vertical_shift, horizontal_shift, single_shift, class_shapes, piece_classes, class_offsets
+    global shape_moves, move_table, goal_target, goal_distances, mirror_classes
+    global occupied_mask, mirror_key, canonical_key
+    global piece_chars, move_steps, move_directions, goal_region, blocking_classes, single_class
+    if new == geometry:
+        return
+    #geometry names the tables only once they are all built, so a signal that interrupts
+    #the rebuild leaves no geometry current and the next call starts over
+    geometry = None
+    width, height, shapes = new.width, new.height, tuple(new.shapes)
+    cells = width * height
+    board_width, board_height, board_cells = width, height, cells
+    full_mask = (1 << cells) - 1
+    vertical_shift, horizontal_shift, single_shift = cells, 2 * cells, 3 * cells
+    class_shapes = shapes
+    piece_classes = tuple((i * cells, i == 0, i == 3, {1: 'v', 2: 'h'}.get(i)) for i in range(len(shapes)))
+    class_offsets = tuple((i * cells, tuple(dx + dy * width for dx, dy in shape)) for i, shape in enumerate(shapes))
+    
+    shape_moves = build_shape_moves(shapes, width, height)
+    #the candidate moves of every way of leaving two cells empty, as on the standard board;
+    #key_moves works out those of boards that leave more as it meets them
+    move_table = {1 << a | 1 << b: empty_moves(1 << a | 1 << b) for a, b in combinations(range(cells), 2)}
+    
+    goal_target = 0
+    for x, y in new.goal_corners:
+        goal_target |= 1 << (y * width + x)
+    goal_distances = tuple(min(abs(cell % width - x) + abs(cell // width - y) for x, y in new.goal_corners)
+                           for cell in range(cells))
+    
+    #every class reflects onto the class of its mirrored shape; the top row of a piece stays
+    #its top row, so the top left cell moves by the width of that row
+    mirror_classes = []
+    for i, shape in enumerate(shapes):
+        mirrored = mirror_shape(shape)
+        targets = [j for j, other in enumerate(shapes) if other == mirrored and (j == 0) == (i == 0)]
+        if not targets:
+            mirror_classes = None
+            break
+        right = max(dx for dx, dy in shape if dy == 0)
+        anchors = tuple(2 * (cell // width) * width + width - 1 - right - cell for cell in range(cells))
+        mirror_classes.append((i * cells, targets[0] * cells, anchors))
+    symmetric = (mirror_classes is not None
+                 and {mirror_classes[0][2][y * width + x] for x, y in new.goal_corners}
+                 == {y * width + x for x, y in new.goal_corners})
+    if new == classic_geometry:
+        occupied_mask, mirror_key, canonical_key = classic_occupied_mask, classic_mirror_key, mirrored_canonical_key
+    else:
+        occupied_mask = general_occupied_mask
+        mirror_key = general_mirror_key
+        canonical_key = mirrored_canonical_key if symmetric else unmirrored_key
+    
+    #the characters each class draws, by offset from the top left cell of the piece; None
+    #draws the letter of the piece
+    piece_chars = []
+    for i, (shift, offsets) in enumerate(class_offsets):
+        if i == 0:
+            chars = tuple((offset, char_goal) for offset in offsets)
+        elif i == 1 and shapes[i] == vertical_shape:
+            chars = ((0, '^'), (width, 'v'))
+        elif i == 2 and shapes[i] == horizontal_shape:
+            chars = ((0, '<'), (1, '>'))
+        elif i == 3 and shapes[i] == single_shape:
+            chars = ((0, char_single),)
+        else:
+            chars = tuple((offset, None) for offset in offsets)
+        piece_chars.append((shift, chars))
+    move_steps = {'L': -1, 'R': 1, 'U': -width, 'D': width}
+    move_directions = {step: direction for direction, step in move_steps.items()}
+    
+    #the cells the goal piece covers wherever it ends, and the top left corners of the pieces
+    #of each other class that cover one of them
+    goal_region = full_mask
+    for x, y in new.goal_corners:
+        goal_region &= general_occupied_mask(1 << (y * width + x))
+    blocking_classes = []
+    for shift, offsets in class_offsets[1:]:
+        blocking = 0
+        for offset in offsets:
+            blocking |= goal_region >> offset if offset >= 0 else goal_region << -offset
+        blocking_classes.append((shift, blocking & full_mask))
+    single_class = full_mask << single_shift
+    geometry = new
+
+
+set_geometry(classic_geometry)
+
+
 class Board:
     """
     Board class for setting up the playing board.
     """
 
+    __slots__ = ('key', '_pieces', '_grid')
+
     def __init__(self, pieces):
         """
         :param pieces: The list of Pieces
         :type pieces: List[Piece]
         """
 
-        self.width = 4
-        self.height = 5
-
-        self.pieces = pieces
-
-        # self.grid is a 2-d (size * size) array automatically generated
-        # using the information on the pieces when a board is being created.
-        # A grid contains the symbol for representing the pieces on the board.
-        self.grid = []
-        self.__construct_grid()
+        # self.key packs the whole board into one integer (see the bitboard layout
+        # above). The piece list and the grid are only decoded from it when asked for.
+        self.key = pieces_to_key(pieces)
+        self._pieces = pieces
+        self._grid = None
 
-        
-    def __construct_grid(self):
+    @classmethod
+    def from_key(cls, key):
         """
-        Called in __init__ to set up a 2-d grid based on the piece location information.
+        Build a board straight from a board key without going through Pieces.
 
+        :param key: The board key
+        :type key: int
+        :rtype: Board
         """
+        board = cls.__new__(cls)
+        board.key = key
+        board._pieces = None
+        board._grid = None
+        return board
 
-        for i in range(self.height):
-            line = []
-            for j in range(self.width):
-                line.append('.')
-            self.grid.append(line)
+    @property
+    def width(self):
+        return board_width
 
-        for piece in self.pieces:
-            if piece.is_goal:
-                self.grid[piece.coord_y][piece.coord_x] = char_goal
-                self.grid[piece.coord_y][piece.coord_x + 1] = char_goal
-                self.grid[piece.coord_y + 1][piece.coord_x] = char_goal
-                self.grid[piece.coord_y + 1][piece.coord_x + 1] = char_goal
-            elif piece.is_single:
-                self.grid[piece.coord_y][piece.coord_x] = char_single
-            else:
-                if piece.orientation == 'h':
-                    self.grid[piece.coord_y][piece.coord_x] = '<'
-                    self.grid[piece.coord_y][piece.coord_x + 1] = '>'
-                elif piece.orientation == 'v':
-                    self.grid[piece.coord_y][piece.coord_x] = '^'
-                    self.grid[piece.coord_y + 1][piece.coord_x] = 'v'
+    @property
+    def height(self):
+        return board_height
+
+    @property
+    def pieces(self):
+        if self._pieces is None:
+            self._pieces = key_to_pieces(self.key)
+        return self._pieces
+
+    @property
+    def grid(self):
+        # self.grid is a 2-d (size * size) array generated the first time it is needed.
+        # A grid contains the symbol for representing the pieces on the board.
+        if self._grid is None:
+            self._grid = [list(row) for row in board_text(self.key).splitlines()]
+        return self._grid
 
     def display(self, file):
         """
         Print out the current board.
 
         """
-        for i, line in enumerate(self.grid):
-            for ch in line:
-                #print(ch, end='')
-                file.write(f"{ch}")
-            #print()
-            file.write('\n')
+        file.write(board_text(self.key))
             
     def print_piece_attribute(self, x_coordinate, y_coordinate):
         """
@@ -135,141 +615,52 @@ class Board:
         
     def find_empty_pieces(self):
         """
-        returns x and y coordinates of each of the 2 empty spaces. 
+        returns x and y coordinates of each of the empty spaces. 
         
         """   
         spaces = []
-        for i in range(5):
-            for j in range(4):
-                if (self.grid[i][j] == '.'):
-                  spaces.append([j,i])
-                         
-        #print(len(self.grid))
+        empty = full_mask ^ occupied_mask(self.key)
+        while empty:
+            low = empty & -empty
+            cell = low.bit_length() - 1
+            spaces.append([cell % self.width, cell // self.width])
+            empty ^= low
         return spaces
-            
-    #helper function to check movable pieces to left of both spaces
-    def check_left(self, movable_list, spaces):
-        #check left of first space
-        for i in range(2):
-            if spaces[i][0] != 0: #if x coordinate of spaces is NOT on left puzzle edge
-                #char_piece = self.grid[spaces[i][0]-1][spaces[i][1]] #could be '>', '2', '1', '^', 'v' 
-                char_piece = self.grid[spaces[i][1]][spaces[i][0]-1]
-                #print(char_piece)
-                #if the left char piece is '>' then you know  piece is <> horizontal so top left coordinate is 2 to left of space
-                if char_piece == '>':
-                    top_left = [spaces[i][0]-2, spaces[i][1], "space_right", i]
-                    movable_list.append(top_left)
-                    
-                #if left char piece is '2' then you know the coordinates
-                elif char_piece == '2':
-                    top_left = [spaces[i][0]-1, spaces[i][1], "space_right", i]
-                    movable_list.append(top_left)
-        
-        #if its a vertical piece you need both spaces to be stacked and ajacent (if its a valid movable piece don't have to check 'v')
-        #same with goal piece, its only movable on a left check if space 1 is on top of space 2 and is right of goal block
-        if spaces[0][0] != 0 and spaces[1][0]!= 0:
-            #char_piece = self.grid[spaces[0][0]-1][spaces[0][1]]
-            char_piece = self.grid[spaces[0][1]][spaces[0][0]-1]
-            if  char_piece == '^' and (spaces[0][0] == spaces[1][0] and spaces[0][1] == spaces[1][1]-1):
-                top_left = [spaces[0][0]-1, spaces[0][1], "space_right", 0]
-                movable_list.append(top_left)
-                          
-            if char_piece == '1' and self.grid[spaces[1][1]][spaces[1][0]-1]=='1': 
-                top_left = [spaces[0][0]-2, spaces[0][1], "space_right", 0]
-                movable_list.append(top_left)
-                
-         
-        return movable_list
-    
-    #helper function to check movable pieces to right of both spaces
-    def check_right(self, movable_list, spaces):
-        #check right of space
-        for i in range(2):
-            if spaces[i][0] != 3: #if x coordinate of space 1 is NOT on right puzzle edge
-                #char_piece = self.grid[spaces[i][0]+1][spaces[i][1]] #could be '<', '2', '1', '^', 'v' 
-                char_piece = self.grid[spaces[i][1]][spaces[i][0]+1]
-                #if right char piece is '2' or '<' then you know you are already right of the top left of the piece
-                if char_piece == '2' or char_piece == '<':
-                    top_left = [spaces[i][0]+1, spaces[i][1], "space_left", i]
-                    movable_list.append(top_left)
-        
-        #for vertical or goal piece to be movable space 1 must be left of block AND space 2 must be under space 1
-        if spaces[0][0] != 3 and spaces[1][0]!=3:
-            char_piece = self.grid[spaces[0][1]][spaces[0][0]+1]
-            if  char_piece == '^' and (spaces[0][0] == spaces[1][0] and spaces[0][1] == spaces[1][1]-1):
-                top_left = [spaces[0][0]+1, spaces[0][1], "space_left", 0]
-                movable_list.append(top_left)
-            
-            elif char_piece == '1' and self.grid[spaces[1][1]][spaces[1][0]+1]=='1':
-                top_left = [spaces[0][0]+1, spaces[0][1], "space_left", 0]
-                movable_list.append(top_left) 
-        
-        return movable_list
-    
-    #helper function to check movable pieces above a space
-    def check_up(self, movable_list, spaces):
-        for i in range(2):
-            if spaces[i][1] !=0: #only look up if y_coord of spaces are NOT on row 1
-                char_piece = self.grid[spaces[i][1]-1][spaces[i][0]]
-                if char_piece == '2':
-                    top_left = [spaces[i][0], spaces[i][1]-1, "space_below", i]
-                    movable_list.append(top_left)
-                elif char_piece == 'v':
-                    top_left = [spaces[i][0], spaces[i][1]-2, "space_below", i]
-                    movable_list.append(top_left)
-        
-        if spaces[0][1] !=0 and spaces[1][1]!=0:
-            char_piece = self.grid[spaces[0][1]-1][spaces[0][0]]
-            if char_piece == '<' and (spaces[0][0] == spaces[1][0]-1) and (self.grid[spaces[1][1]-1][spaces[1][0]] == '>') and (spaces[0][1]==spaces[1][1]) :
-                top_left = [spaces[0][0], spaces[0][1]-1, "space_below" ,0]
-                movable_list.append(top_left)
-        
-            elif char_piece == '1' and self.grid[spaces[1][1]-1][spaces[1][0]] == '1':
-                top_left = [spaces[0][0], spaces[0][1]-2, "space_below", 0]
-                movable_list.append(top_left)
-                
-        return movable_list
-    
-    #helper function to check movable pieces below a space
-    def check_down(self, movable_list, spaces):
-        for i in range(2):
-            if spaces[i][1] !=4: #only look down if y_coord of spaces are NOT on row 4
-                char_piece = self.grid[spaces[i][1]+1][spaces[i][0]]
-                if char_piece == '2' or char_piece =='^':
-                    top_left = [spaces[i][0], spaces[i][1]+1, "space_above", i]
-                    movable_list.append(top_left)
-        
-        
-        if spaces[0][1] !=4 and spaces[1][1]!=4:
-            char_piece = self.grid[spaces[0][1]+1][spaces[0][0]]
-            if (char_piece == '<') and (spaces[0][0] == spaces[1][0]-1) and (self.grid[spaces[1][1]+1][spaces[1][0]] == '>') and (spaces[0][1]==spaces[1][1]):
-                top_left = [spaces[0][0], spaces[0][1]+1, "space_above", 0]
-                movable_list.append(top_left)
-        
-            elif (char_piece == '1') and (self.grid[spaces[1][1]+1][spaces[1][0]] == '1'):
-                top_left = [spaces[0][0], spaces[0][1]+1, "space_above", 0]
-                movable_list.append(top_left)
-                
-        return movable_list
-    
-    
+
     def check_movable(self):
-        """return a list of the movable pieces
-        """
-        # a piece is only movable if it neighbors an empty spot depending on the piece type
-        #single piece only need to check if any 4 surrounding coordinates are empty
-        #first fine empty coordinates
-        spaces = self.find_empty_pieces()
-        movable_list = list()
-        self.check_left(movable_list, spaces)
-        self.check_right(movable_list, spaces)
-        self.check_up(movable_list, spaces)
-        self.check_down(movable_list, spaces)
-        #movable_list = self.remove_duplicates(movable_list)
-        #print(movable_list)
-        
-        return movable_list, spaces          
-         
+        """return a list of the moves that can be made on this board
+        """
+        return key_moves(self.key)
+
+    def make_move(self, move):
+        """
+        Apply a move to this board in place.
+
+        :param move: A move returned by check_movable
+        :type move: Move
+        """
+        self.key ^= move.delta
+        self._pieces = None
+        self._grid = None
+
+    def undo_move(self, move):
+        """
+        Take back a move previously applied with make_move.
+
+        :param move: The move to take back
+        :type move: Move
+        """
+        self.key ^= move.delta
+        self._pieces = None
+        self._grid = None
+
+    def child(self, move):
+        """
+        returns a new board with the move applied, leaving this board untouched.
+        Nothing but the key is built; pieces and grid are decoded on demand.
+        """
+        return Board.from_key(self.key ^ move.delta)
+
 
 class State:
     """
@@ -279,7 +670,7 @@ class State:
     heuristic function, f value, current depth and parent.
     """
 
-    def __init__(self, board, f, depth, g, parent=None):
+    def __init__(self, board, f, depth, g, parent=None, move=None, reflected=False):
         """
         :param board: The board of the state.
         :type board: Board
@@ -289,35 +680,37 @@ class State:
         :type depth: int
         :param parent: The parent of current state.
         :type parent: Optional[State]
+        :param move: The move that turned the parent's board into this one.
+        :type move: Optional[Move]
+        :param reflected: True if board is stored as the mirror image of the board
+            the move leads to (see canonical_key).
+        :type reflected: bool
         """
         self.board = board
         self.f = f
         self.depth = depth
         self.parent = parent
+        self.move = move
+        self.reflected = reflected
         self.g = g
-        self.id = hash(board)  # The id for breaking ties.
+        self.id = board.key  # The id for breaking ties.
     
     def __lt__(self, other):
         
         if self.f == other.f:
-            return self.id < self.id
+            return self.id < other.id
 
         return self.f < other.f
     
     def set_f(self, f): self.f = f    
     
-    def heuristic(self, board):
+    def heuristic(self, board, heuristic=goal_distance):
         """
-        function that takes a state and returns a state's heuristic value (h value) with manhattan distance
-        distance of 2x2 piece and bottom opening. using top left corner
+        function that takes a state and returns a state's heuristic value (h value), by default the
+        manhattan distance of 2x2 piece and bottom opening. using top left corner
         """
         #xy coordinates of goal top left corner = [1,3]
-        self.hval = 0 #place holder
-        for i in board.pieces:
-            if i.is_goal == True:
-                self.hval = 0
-                self.hval+= abs(i.coord_x - 1) #x distance from goal state
-                self.hval+= abs(i.coord_y - 3) #y distance from goal state
+        self.hval = heuristic(board.key)
         
         return self.hval
          
@@ -325,147 +718,12 @@ def goal_test(board):
     """
     function that takes a state and returns true if state is goal
     """
-    for i in board.pieces:
-        if i.is_goal == True and (i.coord_x == 1 and i.coord_y == 3):
-            return True
-            
-    return False
-    
-def find_piece(pieces, movable_pieces, movable_piece_num):
-    piece_id = 0
-    for piece in pieces:
-        #print(piece.coord_x, piece.coord_y)
-        if piece.coord_x == movable_pieces[movable_piece_num][0] and piece.coord_y == movable_pieces[movable_piece_num][1]:
-            return piece_id
-        
-        piece_id+=1
-        
-    return piece_id
-        
-def possible_moves(pieces, moavable_pieces,spaces):
-    """This helper method takes in a movable piece and
-    returns a list of "moves"/board configs for that piece. at most
-    it would return 2 posibles moves for a piece
-
-    Args:
-        piece (piece): movable piece
-    """
-    #spaces = board.find_empty_pieces()
-    successor_boards = list()
-    
-    for i in range(len(moavable_pieces)):
-        piece_num = find_piece(pieces, moavable_pieces, i)
-        pieces_copy = copy.deepcopy(pieces)
-        #moving goal pieces
-                
-        if pieces_copy[piece_num].is_goal== True: #if movable piece is '1'
-            
-            #if goal piece is to the right of spaces
-            if moavable_pieces[i][2] == "space_right":
-                #set piece coordinates to space coords and return a board
-                pieces_copy[piece_num].set_coords(spaces[0][0]-1, spaces[0][1])
-                #generate a board
-                new_board = Board(pieces_copy)
-                successor_boards.append(new_board)
-            #if goal piece is to the right of spaces
-            elif moavable_pieces[i][2] == "space_left" or moavable_pieces[i][2] == "space_above":
-                pieces_copy[piece_num].set_coords(spaces[0][0], spaces[0][1])
-                new_board = Board(pieces_copy)
-                successor_boards.append(new_board)
-                
-            elif moavable_pieces[i][2] == "space_below":
-                pieces_copy[piece_num].set_coords(spaces[0][0], spaces[0][1]-1)
-                new_board = Board(pieces_copy)
-                successor_boards.append(new_board)
-        
-        #moving vertical pieces
-        if pieces_copy[piece_num].orientation == 'v':
-            if moavable_pieces[i][2] == "space_right" or moavable_pieces[i][2] == "space_left" :
-                pieces_copy[piece_num].set_coords(spaces[0][0], spaces[0][1])
-                new_board = Board(pieces_copy)
-                successor_boards.append(new_board)
-            
-            elif moavable_pieces[i][2] == "space_above" and moavable_pieces[i][3]==0:
-                pieces_copy[piece_num].set_coords(spaces[0][0], spaces[0][1])#CHANGED
-                new_board = Board(pieces_copy)
-                successor_boards.append(new_board)
-            
-            elif moavable_pieces[i][2] == "space_above" and moavable_pieces[i][3]==1:
-                pieces_copy[piece_num].set_coords(spaces[1][0], spaces[1][1])#CHANGED
-                new_board = Board(pieces_copy)
-                successor_boards.append(new_board)
-            
-            elif moavable_pieces[i][2] == "space_below" and moavable_pieces[i][3] == 0:
-                pieces_copy[piece_num].set_coords(spaces[0][0], spaces[0][1]-1)
-                #print(spaces[0][1]+1)
-                new_board = Board(pieces_copy)
-                successor_boards.append(new_board)
-                
-            elif moavable_pieces[i][2] == "space_below" and moavable_pieces[i][3] == 1:
-                pieces_copy[piece_num].set_coords(spaces[1][0], spaces[1][1]-1)
-                new_board = Board(pieces_copy)
-                successor_boards.append(new_board)
-        
-        #moving horizontal pieces
-        if pieces_copy[piece_num].orientation == 'h':
-            for k in range(2):
-                if moavable_pieces[i][2] == "space_right" and moavable_pieces[i][3] == k:
-                    pieces_copy[piece_num].set_coords(spaces[k][0]-1, spaces[k][1])
-                    new_board = Board(pieces_copy)
-                    successor_boards.append(new_board)
-        
-            for k in range(2):
-                if moavable_pieces[i][2] == "space_left" and moavable_pieces[i][3] == k:
-                    pieces_copy[piece_num].set_coords(spaces[k][0], spaces[k][1])
-                    new_board = Board(pieces_copy)
-                    successor_boards.append(new_board)
-        
-            if moavable_pieces[i][2] == "space_above" or moavable_pieces[i][2] == "space_below":
-                pieces_copy[piece_num].set_coords(spaces[0][0], spaces[0][1])
-                new_board = Board(pieces_copy)
-                successor_boards.append(new_board)
-            
-        #moving single pieces
-        if pieces_copy[piece_num].is_single:
-            for k in range(2):
-                if (moavable_pieces[i][2] == "space_right" or moavable_pieces[i][2] == "space_left" or moavable_pieces[i][2] == "space_above" or moavable_pieces[i][2] == "space_below" ) and moavable_pieces[i][3] == k:
-                    pieces_copy[piece_num].set_coords(spaces[k][0], spaces[k][1])
-                    new_board = Board(pieces_copy)
-                    successor_boards.append(new_board)
-            
-    return successor_boards
-            
-def generate_successors(parent_state):
-    """
-    function that takes a state and returns a list of its successor states
-    likely most complex function in program break down into several helper functions
-    """
-    #f cost is hval + however many states/moves you make which is incremented +=1 each time we pick a state
-    movable_pieces, spaces = parent_state.board.check_movable() #TO DO RETURN THE 2 SPACE CORRDINATES
-    #generate a list of all boards based on avaiable moves 
-    successor_boards = possible_moves(parent_state.board.pieces, movable_pieces, spaces)
-    if len(spaces) > 2:
-        print(spaces)
-        parent_state.board.display()
-        print("")
-        parent_state.parent.board.display()
-        print(movable_pieces)
-        sys.exit()
-    
-    #now create a list of state instinaces based on the sucessor boards 
-    sucessor_states = list()
-    
-    for sus_board in successor_boards:
-        sucessor = State(sus_board, parent_state.f+1, parent_state.depth+1 ,parent_state.g+1 , parent_state)
-        h_val = sucessor.heuristic(sucessor.board)
-        g_val = parent_state.g +1
-        sucessor.set_f(h_val+ g_val)
-        sucessor_states.append(sucessor)
-        
-    return sucessor_states
+    return board.key & goal_target != 0
     
 def get_solution(goal_state):
-    """given a goal state, trace back parent states to get a solution and display/return sequence from initial to goal state
+    """given a goal state, trace back parent states to get a solution and display/return sequence from initial to goal state.
+    Boards the search stored mirrored are reflected back, so every board and move is in the
+    orientation of the initial board.
 
     Args:
         goal_state (State): the final state in which goal state is true after producing series of sucessors
@@ -476,159 +734,2631 @@ def get_solution(goal_state):
     while parent_state!=None:
         solution.append(parent_state)
         parent_state = parent_state.parent
-        
+    
+    reflected = False #whether the parent of the current state is stored mirrored
+    for state in reversed(solution):
+        if reflected and state.move is not None:
+            state.move = mirror_move(state.move)
+        if state.reflected:
+            reflected = not reflected
+            state.reflected = False
+        if reflected:
+            state.board = Board.from_key(mirror_key(state.board.key))
+    
     return solution
      
-def dfs(initial_state):
-    """this function takes an initial state and returns the first solution found by DFS
-    with multi path pruning
-    """
-    frontier = list()
-    explored = set()
-    
-    frontier.append(initial_state)
-    #expanded = 0
-    while frontier!=0:
-        #print(expanded)
-        curr_state = frontier[-1] #select last in
-        curr_explored = False
-        frontier.pop(-1)
-        curr_fields = frozenset((piece.is_goal, piece.is_single, piece.coord_x, piece.coord_y, piece.orientation) for piece in set(curr_state.board.pieces))
-        
-        if curr_fields in explored:
-            curr_explored = True
+def trace_chain(parents, key):
+    """
+    returns the keys from the root of parents, a {key: parent key} mapping in which the
+    root maps to None, to key
+    """
+    chain = [key]
+    while parents[chain[-1]] is not None:
+        chain.append(parents[chain[-1]])
+    chain.reverse()
+    return chain
+
+def follow_chain(initial_state, chain):
+    """
+    returns the goal state of the path from initial_state along chain, canonical keys of
+    boards one move apart starting with the initial board. The chain is followed with real
+    moves from the initial board, so every board is in the orientation of the initial board.
+    """
+    curr_state = initial_state
+    key = initial_state.board.key
+    for canonical in chain[1:]:
+        for move in key_moves(key):
+            if canonical_key(key ^ move.delta)[0] == canonical:
+                break
+        key ^= move.delta
+        g_val = curr_state.g + 1
+        curr_state = State(Board.from_key(key), g_val, curr_state.depth + 1, g_val, curr_state, move)
+    return curr_state
+
+def dfs(initial_state, heuristic=goal_distance, depth_limit=None, deepen=None, shorten=True, result=None):
+    """this function takes an initial state and returns the goal state of the first solution found by
+    DFS with multi path pruning, or None if there is none. The successors of a board are tried best
+    heuristic value first. Boards are kept as canonical keys only, and states are built for the
+    solution alone. The search is instrumented through result if one is given (see SearchResult)
+
+    Args:
+        heuristic (Callable[[int], int]): orders the successors, and with a depth limit prunes boards
+            that can't reach the goal within it, so it has to be admissible then
+        depth_limit (Optional[int]): no board is expanded past this many moves from the initial board
+        deepen (Optional[int]): if given, search again with a limit this much higher each time no
+            solution is found within the limit, starting from depth_limit (or the heuristic value of
+            the initial board). Unless the first limit is already past the optimal length, solutions
+            are then at most deepen - 1 moves longer than optimal, at the cost of searching again
+            every board within each limit
+        shorten (bool): if True the solution is replaced by the shortest path to a goal through the
+            boards the search visited (see shorten_path)
+
+    Raises:
+        ValueError: if depth_limit is negative or deepen is less than 1, which would search to the
+            same limit forever
+    """
+    if depth_limit is not None and depth_limit < 0:
+        raise ValueError('the depth limit must be at least 0, not {}'.format(depth_limit))
+    if deepen is not None and deepen < 1:
+        raise ValueError('deepen must be at least 1, not {}'.format(deepen))
+    timed = result.timed if result is not None else untimed
+    canonical = timed('hashing', canonical_key)
+    moves = timed('moves', key_moves)
+    heuristic = timed('heuristic', heuristic)
+    start = canonical(initial_state.board.key)[0]
+    h_val = heuristic(start)
+    
+    limit = depth_limit
+    if deepen is not None and limit is None:
+        limit = h_val
+    if result is not None:
+        result.lower_bound = max(result.lower_bound, h_val)
+    while True:
+        #the path found is only needed when it isn't replaced
+        parents = dict() if not shorten else None
+        goal, explored, cut_off = depth_limited_dfs(start, h_val, limit, heuristic, canonical, moves, parents, result)
+        if goal is not None or deepen is None or not cut_off:
+            break
+        if result is not None:
+            #the pass searched every path of up to limit moves
+            result.lower_bound = max(result.lower_bound, limit + 1)
+        limit += deepen
+    
+    if goal is None:
+        if cut_off and result is not None:
+            #boards were left unsearched, so the board may still be solvable past the limit
+            result.exhausted = 'depth'
+            result.lower_bound = max(result.lower_bound, limit + 1)
+        return None
+    if goal == start:
+        return initial_state
+    if shorten:
+        return shorten_path(initial_state, explored, result)
+    return follow_chain(initial_state, trace_chain(parents, goal))
+
+def depth_limited_dfs(start, h_val, limit, heuristic, canonical, moves, parents=None, result=None):
+    """
+    One pass of dfs from the canonical key start, expanding no board more than limit moves
+    from it (no limit if limit is None). Returns the canonical key of the goal found or None,
+    the boards visited as {canonical key: depth}, and whether any board was cut off by the
+    limit. The parent of every board visited is recorded in parents if it is given.
+
+    With a limit a board reached again by a shorter path is searched again from there,
+    since what lies past it may now be within the limit.
+    """
+    #(key, parent key, depth, heuristic value) of every board waiting to be searched
+    frontier = [(start, None, 0, h_val)]
+    explored = dict()
+    cut_off = False
+    
+    while frontier:
+        key, parent, depth, h_val = frontier.pop() #select last in
         
-        if curr_explored == False:
-            explored.add(curr_fields)
-            #expanded+=1
-            if goal_test(curr_state.board) == True:
-                return curr_state
-            #curr_state.board.display()
-            sucessors = generate_successors(curr_state) #expand current state and generate its successors
-            #frontier.pop(-1) #remove last explanded state from frontier
-            for sucessor in sucessors:
-                frontier.append(sucessor)
-                    
-    return "no solution"       
-
-def a_star(initial_state):
-    frontier = list()
-    explored = set()
-    
-    heapq.heappush(frontier, initial_state)
-    
-    #num_expanded = 0
-    while frontier!=0:
+        seen_depth = explored.get(key)
+        if seen_depth is not None and (limit is None or seen_depth <= depth):
+            if result is not None:
+                result.duplicates += 1
+            continue
         
-        #num_expanded+=1
-        #print(["num expanded:", num_expanded])
-        curr_state = heapq.heappop(frontier)
-        curr_explored = False
-        #print(['f val', curr_state.f])
-        curr_fields = frozenset((piece.is_goal, piece.is_single, piece.coord_x, piece.coord_y, piece.orientation) for piece in set(curr_state.board.pieces))
-    
-        if curr_fields in explored:
-            curr_explored = True
+        explored[key] = depth
+        if parents is not None:
+            parents[key] = parent
+        if result is not None:
+            result.expanded += 1
+            result.closed = len(explored)
+            if len(frontier) > result.peak_frontier:
+                result.peak_frontier = len(frontier)
+            if result.expanded >= result.next_check:
+                result.checkpoint(len(frontier))
+        if key & goal_target:
+            return key, explored, cut_off
+        if limit is not None and depth + h_val > limit:
+            cut_off = True
+            continue
         
-        if curr_explored == False:
-            explored.add(curr_fields)
-            if goal_test(curr_state.board) == True:
-                return curr_state
-            
-            sucessors = generate_successors(curr_state) #expand current state and generate its successors
-            
-            for sucessor in sucessors:
-                heapq.heappush(frontier, sucessor)
+        sucessors = list()
+        key_moves_made = moves(key)
+        if result is not None:
+            result.generated += len(key_moves_made)
+        for move in key_moves_made:
+            sucessor = canonical(key ^ move.delta)[0]
+            #boards seen already are only dropped up front without a limit; with one they may come back shallower
+            if limit is None and sucessor in explored:
+                if result is not None:
+                    result.duplicates += 1
+                continue
+            sucessors.append((heuristic(sucessor), sucessor))
+        #push the best board last, so it is the next one searched
+        sucessors.sort(key=itemgetter(0), reverse=True)
+        for h_val, sucessor in sucessors:
+            frontier.append((sucessor, key, depth + 1, h_val))
+    
+    return None, explored, cut_off
 
-def read_from_file(filename):
+def shorten_path(initial_state, explored, result=None):
     """
-    Load initial board from a given file.
+    returns the goal state of the shortest path from the initial board to a goal that only
+    goes through boards in explored (canonical keys), found breadth first. Run on the boards
+    a dfs visited it cuts out the detours of the path it found, which is among them.
+    """
+    timed = result.timed if result is not None else untimed
+    canonical = timed('hashing', canonical_key)
+    moves = timed('moves', key_moves)
+    parents = {initial_state.board.key: None}
+    layer = [initial_state.board.key]
+    goal = None
+    while layer and goal is None:
+        next_layer = list()
+        for key in layer:
+            for move in moves(key):
+                sucessor = key ^ move.delta
+                if sucessor in parents or canonical(sucessor)[0] not in explored:
+                    continue
+                parents[sucessor] = key
+                if sucessor & goal_target:
+                    goal = sucessor
+                    break
+                next_layer.append(sucessor)
+            if goal is not None:
+                break
+        layer = next_layer
+    
+    keys = [goal]
+    while parents[keys[-1]] is not None:
+        keys.append(parents[keys[-1]])
+    curr_state = initial_state
+    for key in reversed(keys[:-1]):
+        g_val = curr_state.g + 1
+        curr_state = State(Board.from_key(key), g_val, curr_state.depth + 1, g_val, curr_state,
+                           key_step(curr_state.board.key, key))
+    return curr_state
 
-    :param filename: The name of the given file.
-    :type filename: str
-    :return: A loaded board
-    :rtype: Board
+class OpenList:
     """
+    The open list of a_star: a heap of plain (f, h, counter, key) tuples, so ordering never
+    calls back into Python. Ties on f go to the smaller h, then to the earlier push. The best
+    g known for every key is kept; a push that doesn't improve on it is dropped, and heap
+    entries left behind by a later improvement are skipped when they come up.
 
-    puzzle_file = open(filename, "r")
+    With a weight w, f is g + w * h and the h kept is w * h. g is recovered as f - h, so w
+    has to be a number that keeps this exact, such as an integer or a multiple of 1/4.
+    """
 
-    line_index = 0
-    pieces = []
-    g_found = False
-
-    for line in puzzle_file:
-
-        for x, ch in enumerate(line):
-
-            if ch == '^': # found vertical piece
-                pieces.append(Piece(False, False, x, line_index, 'v'))
-            elif ch == '<': # found horizontal piece
-                pieces.append(Piece(False, False, x, line_index, 'h'))
-            elif ch == char_single:
-                pieces.append(Piece(False, True, x, line_index, None))
-            elif ch == char_goal:
-                if g_found == False:
-                    pieces.append(Piece(True, False, x, line_index, None))
-                    g_found = True
-        line_index += 1
-
-    puzzle_file.close()
-    board = Board(pieces)
-    #board.display()
-    
-    return board
+    def __init__(self, weight=1):
+        self.heap = []
+        self.best_g = dict() # key -> smallest g pushed
+        self.counter = 0
+        self.weight = weight
 
-if __name__ == "__main__":
+    def __len__(self):
+        return len(self.heap)
 
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        "--inputfile",
-        type=str,
-        required=True,
-        help="The input file that contains the puzzle."
-    )
+    def improves(self, key, g):
+        """
+        returns True if g is better than every g pushed for key so far
+        """
+        return g < self.best_g.get(key, math.inf)
+
+    def push(self, key, g, h):
+        """
+        Push key with path cost g and heuristic value h unless it was pushed before with a g
+        no worse. Returns True if it was pushed.
+        """
+        if g >= self.best_g.get(key, math.inf):
+            return False
+        self.best_g[key] = g
+        self.counter += 1
+        h *= self.weight
+        heappush(self.heap, (g + h, h, self.counter, key))
+        return True
+
+    def pop(self):
+        """
+        returns the key with the smallest f, its g and its f, or None if the list is empty
+        """
+        while self.heap:
+            f, h, _, key = heappop(self.heap)
+            if f - h == self.best_g[key]:
+                return key, f - h, f
+        return None
+
+
+def a_star(initial_state, heuristic=goal_distance, result=None, cache=None, weight=1, bound=math.inf):
+    """this function takes an initial state and returns the goal state of an optimal solution,
+    or None if there is none. heuristic maps a board key to an admissible estimate of the moves
+    left (see make_heuristic). The search is instrumented through result if one is given (see
+    SearchResult); closed counts every board with a best path stored, open or not. Every f
+    popped is at most the optimal length, so the largest one is the lower bound in result.
+
+    A weight above 1 orders the search by g + weight * h instead (see OpenList), which
+    finds a solution sooner at most weight times as long as optimal. Boards that can't
+    lead to a solution shorter than bound moves are dropped, so with a bound the solution
+    is shorter than it, and None means there is none.
+
+    Boards are kept as canonical keys, each with the key of its parent on the best path to it,
+    and states are built for the solution alone (see follow_chain).
+
+    With a SolutionCache, boards with an optimal solution in cache get their exact distance as
+    heuristic value, and the first one popped has the smallest f, so its cached rest of the path
+    is spliced in and the search stops there.
+    """
+    frontier = OpenList(weight)
+    parents = dict() #canonical key -> canonical key of its parent on the best path to it
+    if cache is not None:
+        estimate = heuristic
+        def heuristic(key):
+            left = cache.distance(key)
+            return estimate(key) if left is None else left
+    timed = result.timed if result is not None else untimed
+    moves = timed('moves', key_moves)
+    canonical = timed('hashing', canonical_key)
+    heuristic = timed('heuristic', heuristic)
+    improves = timed('heap', frontier.improves)
+    push = timed('heap', frontier.push)
+    pop = timed('heap', frontier.pop)
     
-    parser.add_argument(
-        "--outputfile",
-        type=str,
-        required=True,
-        help="The output file that contains the solution."
-    )
+    key = canonical(initial_state.board.key)[0]
+    parents[key] = None
+    h_val = heuristic(initial_state.board.key)
+    if h_val < bound:
+        push(key, 0, h_val)
+    if result is not None and h_val > result.lower_bound:
+        result.lower_bound = h_val
     
-    parser.add_argument(
-        "--algo",
-        type=str,
-        required=True,
-        choices=['astar', 'dfs'],
-        help="The searching algorithm."
-    )
+    popped = pop()
+    while popped is not None:
+        key, g_val, f_val = popped
+        if result is not None:
+            if weight == 1 and f_val > result.lower_bound:
+                result.lower_bound = f_val
+            result.expanded += 1
+            result.closed = len(parents)
+            if len(frontier) > result.peak_frontier:
+                result.peak_frontier = len(frontier)
+            if result.expanded >= result.next_check:
+                result.checkpoint(len(frontier))
+        if key & goal_target:
+            return follow_chain(initial_state, trace_chain(parents, key))
+        if cache is not None and cache.distance(key) is not None:
+            goal_state = splice_solution(follow_chain(initial_state, trace_chain(parents, key)), cache)
+            if goal_state is not None:
+                return goal_state
+        
+        #expand the current board: only successors that improve on their best g are kept
+        g_val += 1
+        key_moves_made = moves(key)
+        if result is not None:
+            result.generated += len(key_moves_made)
+        for move in key_moves_made:
+            sucessor = key ^ move.delta
+            sucessor_key = canonical(sucessor)[0]
+            if improves(sucessor_key, g_val):
+                h_val = heuristic(sucessor)
+                if g_val + h_val < bound:
+                    push(sucessor_key, g_val, h_val)
+                    parents[sucessor_key] = key
+            elif result is not None:
+                result.duplicates += 1
+        popped = pop()
+    
+    return None
+
+# The weights of the passes of anytime_a_star, each a multiple of 1/4 (see OpenList)
+anytime_weights = (5, 3, 2, 1.5, 1.25, 1)
+
+def anytime_a_star(initial_state, heuristic=goal_distance, weights=anytime_weights, result=None):
+    """this function takes an initial state and returns the goal state of an optimal solution,
+    or None if there is none, found by restarting weighted A*. The first pass, with the largest
+    weight, finds a solution quickly; every later pass, with a smaller weight, only searches for
+    a shorter one. A pass that finds none proves the last solution optimal, and so does a pass
+    of weight 1, which is plain A*. Every solution is set as result.goal as soon as it is found,
+    so when a budget runs out (see SearchResult) the shortest solution so far is kept, and
+    result.lower_bound holds the fewest moves a solution is proven to take.
+    """
+    best = None
+    for weight in weights:
+        goal_state = a_star(initial_state, heuristic, result, weight=weight, bound=best.g if best else math.inf)
+        if goal_state is None:
+            if best is not None and result is not None:
+                #there is no shorter solution
+                result.lower_bound = best.g
+            break
+        best = goal_state
+        if result is not None:
+            result.goal = best
+            #a solution found with weight w is at most w times as long as optimal
+            result.lower_bound = max(result.lower_bound, math.ceil(best.g / weight))
+    return best
+
+def breadth_first(initial_state, result=None):
+    """this function takes an initial state and returns the goal state of an optimal solution
+    found by a breadth first search, one layer at a time, or None if there is no solution. Boards
+    are kept as canonical keys only, each with the key of the board it was reached from. Expanded
+    and generated states are counted in result if one is given. This is the bfs engine wherever
+    batch_bfs can't run: without numpy, or on a board other than the standard one.
+
+    A second search backwards from the solved boards doesn't pay here: the goal is a set of
+    boards, thousands on the classic layouts, and even seeded with those of the initial board's
+    component alone the two searches together expand about as many boards as this one.
+    """
+    start = canonical_key(initial_state.board.key)[0]
+    if start & goal_target:
+        return initial_state
+    parents = {start: None} #canonical key -> the key it was reached from, None at the root
+    
+    layer = [start]
+    depth = 0
+    while layer:
+        next_layer = list()
+        for key in layer:
+            key_moves_made = key_moves(key)
+            if result is not None:
+                result.expanded += 1
+                result.generated += len(key_moves_made)
+                if result.expanded >= result.next_check:
+                    result.checkpoint(len(layer) + len(next_layer))
+            for move in key_moves_made:
+                sucessor = canonical_key(key ^ move.delta)[0]
+                if sucessor in parents:
+                    if result is not None:
+                        result.duplicates += 1
+                    continue
+                parents[sucessor] = key
+                #no board of a shallower layer is solved, so the first one found is as close as any
+                if sucessor & goal_target:
+                    return follow_chain(initial_state, trace_chain(parents, sucessor))
+                next_layer.append(sucessor)
+        
+        depth += 1
+        if result is not None:
+            result.lower_bound = max(result.lower_bound, depth + 1)
+        layer = next_layer
+    
+    return None
+
+def ida_star(initial_state, heuristic=goal_distance, table_size=1 << 16, result=None, cache=None):
+    """this function takes an initial state and returns the goal state of an optimal solution found by
+    iterative deepening A*. Each iteration is a depth first search cut off where f passes a bound,
+    and the next bound is the smallest f that was cut off. Moves are made and taken back on a single
+    board, so memory grows with the solution depth and not with the nodes expanded.
+
+    table_size bounds an optional transposition table. For every board it keeps the best lower bound
+    on the moves left learned so far (the heuristic, raised whenever a subtree is searched without
+    finding the goal) and the depth it was expanded at in the current iteration; a board reached again
+    no shallower in the same iteration is cut off. When the table is full the least recently used
+    board is evicted. 0 disables the table. Expanded and generated boards are counted in result if
+    one is given.
+
+    Moves can always be taken back, so the cycles cut off keep the next bound finite even when the
+    goal can't be reached. An iteration that evicts nothing from the table and only cuts off boards
+    it expanded elsewhere has searched every board reachable from the initial one, so the board has
+    no solution and None is returned. Without the table, or with one too small for the boards
+    reachable, an unsolvable board is searched until the budget of result runs out.
+
+    With a SolutionCache, a board with an optimal solution in cache within the bound ends the search:
+    every bound so far was a lower bound on the solution length, so the cached rest of its path is
+    spliced in.
+    """
+    board = Board.from_key(initial_state.board.key)
+    table = OrderedDict() #canonical key -> [h, iteration, g]
+    
+    if goal_test(board):
+        return initial_state
+    
+    root_key = canonical_key(board.key)[0]
+    bound = heuristic(board.key)
+    iteration = 0
+    while bound != math.inf:
+        iteration += 1
+        if result is not None:
+            #every bound so far is at most the solution length
+            result.lower_bound = max(result.lower_bound, bound)
+        path = list() #moves from the initial board to the current one
+        on_path = {root_key}
+        evicted = False
+        cut = set() #the boards past the bound, while every board expanded is in the table
+        #one frame per board on the path: [moves left to try, key, smallest f cut off below it]
+        stack = [[board.check_movable(), root_key, math.inf]]
+        if result is not None:
+            result.expanded += 1
+            result.generated += len(stack[-1][0])
+        while stack:
+            frame = stack[-1]
+            if not frame[0]:
+                #every move of this board is tried: what was cut off below it bounds its moves left
+                stack.pop()
+                on_path.discard(frame[1])
+                g_val = len(path)
+                if table_size and frame[1] in table:
+                    entry = table[frame[1]]
+                    entry[0] = max(entry[0], frame[2] - g_val)
+                if path:
+                    board.undo_move(path.pop())
+                if stack:
+                    stack[-1][2] = min(stack[-1][2], frame[2])
+                else:
+                    next_bound = frame[2]
+                continue
+            
+            move = frame[0].pop()
+            board.make_move(move)
+            g_val = len(path) + 1
+            key = canonical_key(board.key)[0]
+            entry = table.get(key) if table_size else None
+            h_val = entry[0] if entry is not None else heuristic(board.key)
+            left = cache.distance(board.key) if cache is not None else None
+            if left is not None:
+                h_val = left
+            f_val = g_val + h_val
+            if (key in on_path or f_val > bound
+                    or (entry is not None and entry[1] == iteration and entry[2] <= g_val)):
+                frame[2] = min(frame[2], f_val)
+                if f_val > bound and f_val != math.inf and key not in on_path and not evicted:
+                    cut.add(key)
+                board.undo_move(move)
+                continue
+            
+            path.append(move)
+            if goal_test(board) or left is not None:
+                curr_state = initial_state
+                solved = Board.from_key(initial_state.board.key)
+                for move in path:
+                    solved.make_move(move)
+                    g_val = curr_state.g + 1
+                    curr_state = State(Board.from_key(solved.key), g_val, curr_state.depth + 1, g_val, curr_state, move)
+                if left is None:
+                    return curr_state
+                goal_state = splice_solution(curr_state, cache)
+                if goal_state is not None:
+                    return goal_state
+            
+            if table_size:
+                if entry is None:
+                    entry = table[key] = [h_val, iteration, g_val]
+                    if len(table) > table_size:
+                        table.popitem(last=False)
+                        evicted = True
+                else:
+                    entry[1] = iteration
+                    entry[2] = g_val
+                    table.move_to_end(key)
+            on_path.add(key)
+            stack.append([board.check_movable(), key, math.inf])
+            if result is not None:
+                result.expanded += 1
+                result.generated += len(stack[-1][0])
+                if result.expanded >= result.next_check:
+                    result.checkpoint(len(stack))
+        
+        if table_size and not evicted and all(key in table and table[key][1] == iteration for key in cut):
+            #every board one move past those searched was searched too: the goal is out of reach
+            return None
+        #no solution within bound, so the next bound is at least one more
+        bound = max(next_bound, bound + 1)
+    
+    return None
+
+#====================================================================================
+# Solution database
+#
+# For every layout (number of vertical, horizontal and single pieces) the whole
+# state space is small, so the distance to the goal of every solvable board can be
+# computed once with a breadth first search backwards from the solved boards and
+# stored on disk.
+#
+# Tables on disk are fixed width binary arrays: a header, the canonical keys packed
+# into 64 bits in ascending order, then one fixed width value per key (none for a
+# plain set of keys). Everything is little endian and 8 byte aligned, so a table is
+# memory mapped and searched in place; opening it costs the same for any size, and
+# every process on the host reading the same file shares its pages.
+#====================================================================================
+
+db_magic = b'HRDDB2\0\0'
+db_header = struct.Struct('<8sQB7x') # magic, number of keys, bytes per value
+db_value_types = {0: None, 1: 'B', 2: 'H', 4: 'I'}
+default_db_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hrd_db')
+
+
+def pack_key(key):
+    """
+    Pack a board key into 64 bits: the vertical, horizontal and single masks in the
+    low 60 bits and the cell of the goal piece in the top 4 bits.
+    """
+    return (key >> vertical_shift) | ((key & full_mask).bit_length() - 1) << 60
+
+
+def unpack_key(packed):
+    """
+    returns the board key packed with pack_key
+    """
+    return (packed & ((1 << 60) - 1)) << vertical_shift | 1 << (packed >> 60)
+
+
+def key_layout(key):
+    """
+    returns the number of vertical, horizontal and single pieces on the board key
+    """
+    return (bin((key >> vertical_shift) & full_mask).count('1'),
+            bin((key >> horizontal_shift) & full_mask).count('1'),
+            bin(key >> single_shift).count('1'))
+
+
+def layout_keys(vertical, horizontal, singles, goal_corners=None):
+    """
+    returns the canonical keys of every board of the layout, or only of those with the top
+    left corner of the goal piece on one of the cells in the goal_corners mask
+    """
+    require_classic_board('Enumerating a layout')
+    if goal_corners is None:
+        goal_corners = not_col_3 & (full_mask >> board_width) #anywhere the 2x2 fits
+    keys = set()
+    empties = board_cells - 4 - 2 * vertical - 2 * horizontal - singles
+
+    def place(key, occupied, vertical, horizontal, singles, empties):
+        if occupied == full_mask:
+            keys.add(canonical_key(key)[0])
+            return
+        free = full_mask ^ occupied
+        low = free & -free #fill the first free cell
+        if empties:
+            place(key, occupied | low, vertical, horizontal, singles, empties - 1)
+        if singles:
+            place(key | low << single_shift, occupied | low, vertical, horizontal, singles - 1, empties)
+        if vertical and free & low << 4:
+            place(key | low << vertical_shift, occupied | low | low << 4, vertical - 1, horizontal, singles, empties)
+        if horizontal and low & not_col_3 and free & low << 1:
+            place(key | low << horizontal_shift, occupied | low | low << 1, vertical, horizontal - 1, singles, empties)
+
+    while goal_corners and empties >= 0:
+        goal = goal_corners & -goal_corners
+        place(goal, occupied_mask(goal), vertical, horizontal, singles, empties)
+        goal_corners ^= goal
+    return keys
+
+
+def goal_keys(vertical, horizontal, singles):
+    """
+    returns the canonical keys of every board of the layout with the goal piece at (1, 3)
+    """
+    return layout_keys(vertical, horizontal, singles, goal_target)
+
+
+def build_solution_db(vertical, horizontal, singles):
+    """
+    Breadth first search backwards from every solved board of the layout. Moves can
+    always be taken back, so the successors of a board are also its predecessors.
+
+    :return: The distance to the goal of every solvable canonical key
+    :rtype: Dict[int, int]
+    """
+    if np is not None:
+        distances = dict()
+        for depth, layer in enumerate(batch_layers(map(pack_key, goal_keys(vertical, horizontal, singles)))):
+            distances.update(zip(map(unpack_key, layer.tolist()), [depth] * layer.size))
+        return distances
+    distances = dict.fromkeys(goal_keys(vertical, horizontal, singles), 0)
+    layer = list(distances)
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for key in layer:
+            for sucessor in successor_keys(key):
+                sucessor = canonical_key(sucessor)[0]
+                if sucessor not in distances:
+                    distances[sucessor] = depth
+                    next_layer.append(sucessor)
+        layer = next_layer
+    return distances
+
+
+def db_path(layout, db_dir=default_db_dir):
+    """
+    returns the file name of the table for a (vertical, horizontal, single) layout
+    """
+    return os.path.join(db_dir, 'v{}h{}s{}.db'.format(*layout))
+
+
+def write_key_table(filename, keys, values=None, width=1):
+    """
+    Write a table file of packed keys and optional values.
+
+    :param keys: Packed keys (see pack_key), in any order
+    :type keys: Iterable[int]
+    :param values: The value of each key, in the same order as keys
+    :type values: Optional[Iterable[int]]
+    :param width: Bytes per value, one of 1, 2 or 4
+    :type width: int
+    """
+    if values is None:
+        rows = sorted((key, 0) for key in keys)
+        width = 0
+    else:
+        rows = sorted(zip(keys, values))
+    packed_keys = array('Q', (key for key, _ in rows))
+    packed_values = array(db_value_types[width] or 'B', (value for _, value in rows) if width else ())
+    if sys.byteorder != 'little':
+        packed_keys.byteswap()
+        packed_values.byteswap()
+
+    def write(db_file):
+        db_file.write(db_header.pack(db_magic, len(packed_keys), width))
+        packed_keys.tofile(db_file)
+        packed_values.tofile(db_file)
+    replace_file(filename, write)
+
+
+def replace_file(filename, write):
+    """
+    Write a file through a temporary file in the same directory and then rename it into
+    place, so other processes only ever see no file or the complete one.
+
+    :param write: Called with the temporary file, opened for binary writing
+    :type write: Callable[[BinaryIO], None]
+    """
+    directory, name = os.path.split(filename)
+    fd, temp_name = tempfile.mkstemp(prefix=name + '.', suffix='.tmp', dir=directory or '.')
+    try:
+        with os.fdopen(fd, 'wb') as temp_file:
+            write(temp_file)
+        os.chmod(temp_name, 0o644) #mkstemp makes the file private
+        os.replace(temp_name, filename)
+    except BaseException:
+        os.unlink(temp_name)
+        raise
+
+
+def write_solution_db(distances, filename):
+    """
+    Write the distances returned by build_solution_db to a table file.
+    """
+    write_key_table(filename, map(pack_key, distances), distances.values())
+
+
+class KeyTable:
+    """
+    A table file written by write_key_table, memory mapped read only. keys and
+    values are views straight into the mapping; nothing is parsed or copied.
+    """
+
+    def __init__(self, filename):
+        """
+        :param filename: The table file
+        :type filename: str
+        """
+        with open(filename, 'rb') as db_file:
+            size = os.fstat(db_file.fileno()).st_size
+            if size < db_header.size:
+                raise ValueError('{} is not a table file'.format(filename))
+            self._map = mmap.mmap(db_file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, width = db_header.unpack_from(self._map)
+        if magic != db_magic or width not in db_value_types:
+            self._map.close()
+            raise ValueError('{} is not a table file'.format(filename))
+        expected = db_header.size + count * (8 + width)
+        if size != expected:
+            self._map.close()
+            raise ValueError('{} is damaged: {} bytes, expected {} for {} keys'.format(
+                filename, size, expected, count))
+        view = memoryview(self._map)
+        start = db_header.size
+        end = start + 8 * count
+        self.keys = view[start:end].cast('Q')
+        self.values = view[end:end + width * count].cast(db_value_types[width]) if width else None
+        if sys.byteorder != 'little':
+            # the files are little endian, so big endian hosts get a private copy
+            self.keys = array('Q', self.keys)
+            self.keys.byteswap()
+            if width:
+                self.values = array(db_value_types[width], self.values)
+                self.values.byteswap()
+
+    def __len__(self):
+        return len(self.keys)
+
+    def find(self, packed):
+        """
+        returns the index of a packed key in the table, or -1 if it isn't there
+        """
+        i = bisect_left(self.keys, packed)
+        if i < len(self.keys) and self.keys[i] == packed:
+            return i
+        return -1
+
+    def __contains__(self, packed):
+        return self.find(packed) >= 0
+
+    def get(self, packed, default=None):
+        """
+        returns the value stored for a packed key, or default if it isn't there
+        """
+        i = self.find(packed)
+        return self.values[i] if i >= 0 else default
+
+
+class SolutionDB(KeyTable):
+    """
+    The distance table of one layout, written by write_solution_db.
+    """
+
+    def distance(self, key):
+        """
+        returns the number of moves needed to solve the board key, or None if it can't be solved
+        """
+        return self.get(pack_key(canonical_key(key)[0]))
+
+
+# tables opened by this process, by file name
+open_tables = {}
+
+
+def load_solution_db(layout, db_dir=default_db_dir):
+    """
+    Load the table for a layout, building and saving it first if it doesn't exist yet.
+
+    :rtype: SolutionDB
+    """
+    require_classic_board('The solution database')
+    filename = db_path(layout, db_dir)
+    if filename not in open_tables:
+        try:
+            table = SolutionDB(filename)
+        except (OSError, ValueError) as error:
+            if not isinstance(error, FileNotFoundError):
+                print('{}, rebuilding it'.format(error), file=sys.stderr)
+            os.makedirs(db_dir, exist_ok=True)
+            write_solution_db(build_solution_db(*layout), filename)
+            table = SolutionDB(filename)
+        open_tables[filename] = table
+    return open_tables[filename]
+
+
+def db_solve(initial_state, db_dir=default_db_dir, result=None):
+    """this function takes an initial state and returns the goal state of an optimal solution
+    read from the solution database, or None if the board can't be solved. From every board
+    it takes a move to a board one step closer to the goal. Boards stepped from are counted as
+    expanded and boards looked up as generated in result if one is given.
+    """
+    db = load_solution_db(key_layout(initial_state.board.key), db_dir)
+    if result is not None:
+        result.start_search()
+    distance = db.distance(initial_state.board.key)
+    if distance is None:
+        return None
+    
+    curr_state = initial_state
+    while distance > 0:
+        if result is not None:
+            result.expanded += 1
+        for move in curr_state.board.check_movable():
+            child = curr_state.board.child(move)
+            if result is not None:
+                result.generated += 1
+            if db.distance(child.key) == distance - 1:
+                break
+        distance -= 1
+        g_val = curr_state.g + 1
+        curr_state = State(child, g_val + distance, curr_state.depth + 1, g_val, curr_state, move)
+        
+    return curr_state
+
+#====================================================================================
+# State space
+#
+# Tools for whole state spaces rather than single puzzles. A component is every board
+# reachable from a start board, as canonical keys. Its graph is written in a compact
+# binary adjacency (CSR) format:
+#   header   magic 'HRDGRAPH', number of boards N, number of edges E (little endian)
+#   keys     N packed keys (see pack_key), ascending; a board's index is its position
+#   offsets  N + 1 uint32; the neighbours of board i are neighbours[offsets[i]:offsets[i + 1]]
+#   neighbours  E uint32 board indexes, every edge stored in both directions
+#   distances   N uint8 moves to the goal, 255 if the goal can't be reached
+#====================================================================================
+
+graph_magic = b'HRDGRAPH'
+graph_header = struct.Struct('<8sQQ')
+unreachable = 255
+
+
+def enumerate_component(key):
+    """
+    returns the canonical keys of every board reachable from the board key, breadth first
+    """
+    start = canonical_key(key)[0]
+    if np is not None and geometry == classic_geometry:
+        return [unpack_key(packed) for layer in batch_layers([pack_key(start)]) for packed in layer.tolist()]
+    seen = {start}
+    order = [start]
+    for curr_key in order:
+        for sucessor in successor_keys(curr_key):
+            sucessor = canonical_key(sucessor)[0]
+            if sucessor not in seen:
+                seen.add(sucessor)
+                order.append(sucessor)
+    return order
+
+
+def component_graph(keys):
+    """
+    Build the adjacency of a component returned by enumerate_component.
+
+    :return: The packed keys in ascending order, the offsets and the neighbours (see above)
+    :rtype: Tuple[array, array, array]
+    """
+    require_classic_board('The component graph')
+    packed = array('Q', sorted(pack_key(key) for key in keys))
+    index = {unpack_key(p): i for i, p in enumerate(packed)}
+    offsets = array('I', [0])
+    neighbours = array('I')
+    for p in packed:
+        key = unpack_key(p)
+        adjacent = {index[canonical_key(sucessor)[0]] for sucessor in successor_keys(key)}
+        adjacent.discard(index[key]) #a move onto the mirror image of the same board
+        neighbours.extend(sorted(adjacent))
+        offsets.append(len(neighbours))
+    return packed, offsets, neighbours
+
+
+def graph_distances(packed, offsets, neighbours):
+    """
+    returns the moves to the goal from every board of a component graph, breadth first
+    from the solved boards in it (unreachable where the goal can't be reached)
+    """
+    distances = array('B', [unreachable]) * len(packed)
+    layer = [i for i, p in enumerate(packed) if unpack_key(p) & goal_target]
+    for i in layer:
+        distances[i] = 0
+    depth = 0
+    while layer:
+        depth += 1
+        next_layer = []
+        for i in layer:
+            for j in neighbours[offsets[i]:offsets[i + 1]]:
+                if distances[j] == unreachable:
+                    distances[j] = min(depth, unreachable - 1)
+                    next_layer.append(j)
+        layer = next_layer
+    return distances
+
+
+def write_graph(filename, packed, offsets, neighbours, distances):
+    """
+    Write a component graph in the binary adjacency format described above.
+    """
+    columns = [packed, offsets, neighbours, distances]
+    if sys.byteorder != 'little':
+        columns = [array(column.typecode, column) for column in columns]
+        for column in columns:
+            column.byteswap()
+
+    def write(graph_file):
+        graph_file.write(graph_header.pack(graph_magic, len(packed), len(neighbours)))
+        for column in columns:
+            column.tofile(graph_file)
+    replace_file(filename, write)
+
+
+def layout_components(vertical, horizontal, singles):
+    """
+    Split every board of a layout into connected components.
+
+    :return: The components, largest first, each a list of canonical keys
+    :rtype: List[List[int]]
+    """
+    remaining = layout_keys(vertical, horizontal, singles)
+    components = []
+    while remaining:
+        component = enumerate_component(next(iter(remaining)))
+        remaining.difference_update(component)
+        components.append(component)
+    components.sort(key=len, reverse=True)
+    return components
+
+#====================================================================================
+# Heuristics
+#
+# A heuristic maps a board key to a lower bound on the number of moves left. Every
+# heuristic here is admissible and consistent, so a_star still returns optimal
+# solutions with any of them. heuristic_factories builds each one for the layout
+# of the board being solved.
+#====================================================================================
+
+# goal_region holds the cells the goal piece ends on, and blocking_classes the top left
+# corners of the pieces of each other class that cover one of them (see set_geometry)
+
+
+def blocking_distance(key):
+    """
+    manhattan distance of the goal piece plus one move for every other piece covering a
+    cell the goal piece has to end on, since each of those has to move at least once
+    """
+    distance = goal_distance(key)
+    for shift, blocking in blocking_classes:
+        distance += bin((key >> shift) & blocking).count('1')
+    return distance
+
+
+def pattern_db_heuristic(layout, db_dir=default_db_dir, singles=3):
+    """
+    returns a pattern database heuristic for boards of the layout. The pattern keeps the
+    goal piece, every 1x2 piece and some of the 1x1 pieces and drops the rest of the 1x1
+    pieces, which only makes the puzzle easier, so the distance to the goal of the pattern
+    (read from the solution database of the smaller layout) is a lower bound. Moves of the
+    dropped pieces are never counted there, so one move is added for each of them covering
+    the goal region. Any choice of 1x1 pieces to keep gives a lower bound; the largest one
+    is used.
+
+    :param layout: The (vertical, horizontal, single) counts of the boards to solve
+    :type layout: Tuple[int, int, int]
+    :param singles: The number of 1x1 pieces kept in the pattern
+    :type singles: int
+    """
+    vertical, horizontal, all_singles = layout
+    singles = min(singles, all_singles)
+    db = load_solution_db((vertical, horizontal, singles), db_dir)
+    
+    def heuristic(key):
+        cells = key >> single_shift
+        board = key & ~single_class
+        cell_bits = []
+        while cells:
+            low = cells & -cells
+            cell_bits.append(low)
+            cells ^= low
+        best = 0
+        for kept in combinations(cell_bits, singles):
+            kept = sum(kept)
+            distance = db.distance(board | kept << single_shift)
+            if distance is None:
+                return math.inf #the pattern can't be solved, so neither can the board
+            distance += bin(((key >> single_shift) ^ kept) & goal_region).count('1')
+            best = max(best, distance)
+        return best
+    
+    return heuristic
+
+
+def max_heuristic(*parts):
+    """
+    returns a heuristic taking the largest value of several admissible heuristics
+    """
+    def heuristic(key):
+        return max(part(key) for part in parts)
+    return heuristic
+
+
+# heuristic name -> function building it from the layout of the board and the
+# directory of the solution database
+heuristic_factories = {
+    'manhattan': lambda layout, db_dir: goal_distance,
+    'blocking': lambda layout, db_dir: blocking_distance,
+    'pdb': lambda layout, db_dir: pattern_db_heuristic(layout, db_dir),
+    'max': lambda layout, db_dir: max_heuristic(blocking_distance, pattern_db_heuristic(layout, db_dir)),
+}
+
+
+def make_heuristic(name, board, db_dir=default_db_dir):
+    """
+    returns the heuristic called name for boards with the same layout as board
+    """
+    return heuristic_factories[name](key_layout(board.key), db_dir)
+
+#====================================================================================
+# Batch evaluation
+#
+# Breadth first searches over whole state spaces spend most of their time in Python
+# on every single board. With numpy installed a layer of boards is held instead as
+# an array of packed keys (see pack_key) and handled with array operations: the
+# moves of each class and direction are found for every board at once as in
+# empty_moves, successors are mirrored into canonical form, deduplicated with
+# sorting and dropped if they are in the sorted array of boards already seen, and
+# goal flags and heuristic values are computed for a whole array. Like packed keys
+# this needs the standard 4x5 board.
+#====================================================================================
+
+low_60 = (1 << 60) - 1
+nibble_pairs_60 = int('3' * 15, 16)
+nibble_odds_60 = int('5' * 15, 16)
+
+
+def require_numpy(feature):
+    """
+    Raise ImportError if numpy isn't installed, and ValueError unless the current geometry
+    is the standard 4x5 board.
+    """
+    if np is None:
+        raise ImportError('{} needs numpy'.format(feature))
+    require_classic_board(feature)
+
+
+def batch_successors(packed):
+    """
+    returns every board one move from the boards of an array of packed keys, as the
+    index of the board each move is made on and the packed key it leads to
+    """
+    require_numpy('Batch expansion')
+    one = np.uint64(1)
+    cell = packed >> np.uint64(60)
+    classes = [one << cell]
+    for shift in (vertical_shift, horizontal_shift, single_shift):
+        classes.append((packed >> np.uint64(shift - vertical_shift)) & np.uint64(full_mask))
+    occupied = np.zeros_like(packed)
+    for mask, (_, offsets) in zip(classes, class_offsets):
+        for offset in offsets:
+            occupied |= mask << np.uint64(offset)
+    empty = ~occupied & np.uint64(full_mask)
+    
+    parents = [np.zeros(0, dtype=np.intp)]
+    successors = [np.zeros(0, dtype=np.uint64)]
+    for mask, (shift, rules) in zip(classes, shape_moves):
+        for step, allowed, leads in rules:
+            corners = mask & np.uint64(allowed)
+            for lead in leads:
+                corners &= (empty >> np.uint64(lead)) if lead > 0 else (empty << np.uint64(-lead))
+            rows = np.flatnonzero(corners)
+            corners = corners[rows]
+            #one pass for each piece of the class that can make the step on the same board
+            while rows.size:
+                low = corners & (~corners + one)
+                if shift == goal_shift:
+                    dst = (cell[rows].astype(np.int64) + step).astype(np.uint64)
+                    moved = (packed[rows] & np.uint64(low_60)) | dst << np.uint64(60)
+                else:
+                    dst = low << np.uint64(step) if step > 0 else low >> np.uint64(-step)
+                    moved = packed[rows] ^ (low | dst) << np.uint64(shift - vertical_shift)
+                parents.append(rows)
+                successors.append(moved)
+                corners ^= low
+                left = np.flatnonzero(corners)
+                rows = rows[left]
+                corners = corners[left]
+    return np.concatenate(parents), np.concatenate(successors)
+
+
+def batch_canonical(packed):
+    """
+    returns the array of packed keys mapped onto the packed canonical keys of their boards
+    (see canonical_key), mirrored the same way as mirror_key
+    """
+    keys = packed & np.uint64(low_60)
+    pairs = np.uint64(nibble_pairs_60)
+    odds = np.uint64(nibble_odds_60)
+    mirrored = (keys & pairs) << np.uint64(2) | (keys >> np.uint64(2)) & pairs
+    mirrored = (mirrored & odds) << np.uint64(1) | (mirrored >> np.uint64(1)) & odds
+    wide = mirrored & np.uint64(full_mask << (horizontal_shift - vertical_shift))
+    mirrored = mirrored ^ wide | wide >> np.uint64(1)
+    #the goal piece is 2 wide: x becomes 2 - x
+    cell = packed >> np.uint64(60)
+    mirrored_cell = cell + np.uint64(2) - ((cell & np.uint64(3)) << np.uint64(1))
+    #canonical_key compares whole keys, where the goal mask comes last
+    smaller = (mirrored < keys) | ((mirrored == keys) & (mirrored_cell < cell))
+    return np.where(smaller, mirrored | mirrored_cell << np.uint64(60), packed)
+
+
+def batch_goal_flags(packed):
+    """
+    returns which boards of an array of packed keys are solved, as a boolean array
+    """
+    return (np.uint64(goal_target) >> (packed >> np.uint64(60))) & np.uint64(1) == 1
+
+
+def batch_goal_distance(packed):
+    """
+    goal_distance of every board of an array of packed keys
+    """
+    return np.asarray(goal_distances, dtype=np.int64)[(packed >> np.uint64(60)).astype(np.intp)]
+
+
+def batch_bit_count(values):
+    """
+    returns the number of bits set in each value of an uint64 array
+    """
+    if hasattr(np, 'bitwise_count'): # numpy 2.0 on
+        return np.bitwise_count(values).astype(np.int64)
+    return np.unpackbits(values.astype('<u8').view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1, dtype=np.int64)
+
+
+def batch_blocking_distance(packed):
+    """
+    blocking_distance of every board of an array of packed keys
+    """
+    distance = batch_goal_distance(packed)
+    for shift, blocking in blocking_classes:
+        distance += batch_bit_count((packed >> np.uint64(shift - vertical_shift)) & np.uint64(blocking))
+    return distance
+
+
+# heuristic name -> the heuristic of heuristic_factories computed for an array of packed keys
+batch_heuristics = {
+    'manhattan': batch_goal_distance,
+    'blocking': batch_blocking_distance,
+}
+
+
+def batch_unique(values):
+    """
+    returns the values of an array in ascending order without repeats. Same as np.unique,
+    which recent numpy versions run through a hash table that is far slower on uint64.
+    """
+    values = np.sort(values)
+    if values.size:
+        values = values[np.concatenate(([True], values[1:] != values[:-1]))]
+    return values
+
+
+def batch_expand(layer, seen):
+    """
+    returns the canonical packed keys one move from the boards of layer that aren't in
+    seen, in ascending order and without repeats, and the number of moves made
+
+    :param layer: Canonical packed keys
+    :type layer: numpy.ndarray
+    :param seen: Canonical packed keys in ascending order
+    :type seen: numpy.ndarray
+    """
+    _, successors = batch_successors(layer)
+    generated = successors.size
+    successors = batch_unique(batch_canonical(successors))
+    if seen.size:
+        found = np.minimum(np.searchsorted(seen, successors), seen.size - 1)
+        successors = successors[seen[found] != successors]
+    return successors, generated
+
+
+def batch_layers(start, result=None):
+    """
+    Breadth first search from some boards, a layer at a time. Boards expanded and generated
+    are counted in result if one is given.
+
+    :param start: The canonical packed keys of the boards to start from
+    :type start: Iterable[int]
+    :return: Every layer in turn, starting with the start boards, as an ascending array of
+        canonical packed keys
+    :rtype: Iterator[numpy.ndarray]
+    """
+    require_numpy('Batch search')
+    layer = batch_unique(np.fromiter(start, dtype=np.uint64))
+    seen = layer
+    while layer.size:
+        yield layer
+        if result is not None:
+            result.expanded += layer.size
+            result.peak_frontier = max(result.peak_frontier, layer.size)
+            if result.expanded >= result.next_check:
+                result.checkpoint(layer.size)
+        layer, generated = batch_expand(layer, seen)
+        #a stable sort merges the two ascending runs in linear time
+        seen = np.sort(np.concatenate((seen, layer)), kind='stable')
+        if result is not None:
+            result.generated += generated
+            result.duplicates += generated - layer.size
+            result.closed = seen.size
+
+
+def batch_bfs(initial_state, heuristic=batch_blocking_distance, result=None):
+    """this function takes an initial state and returns the goal state of an optimal solution
+    found by a breadth first search over whole layers of packed keys, or None if there is
+    none. Layers are kept, so the path back is found by expanding each one again and
+    picking a board leading to the next board of the path.
+
+    Every solution passes through each layer, so the depth of a layer plus the smallest
+    value of the batch heuristic over it is a lower bound on the solution length, kept up
+    to date in result for a search stopped by its budget.
+    """
+    layers = []
+    for layer in batch_layers([pack_key(canonical_key(initial_state.board.key)[0])], result):
+        layers.append(layer)
+        goals = layer[batch_goal_flags(layer)]
+        if goals.size:
+            break
+        if result is not None:
+            result.lower_bound = max(result.lower_bound, len(layers) - 1 + int(heuristic(layer).min()))
+    else:
+        return None
+    
+    chain = [goals[0]]
+    for layer in reversed(layers[:-1]):
+        parents, successors = batch_successors(layer)
+        chain.append(layer[parents[np.flatnonzero(batch_canonical(successors) == chain[-1])[0]]])
+    return follow_chain(initial_state, [unpack_key(int(packed)) for packed in reversed(chain)])
+
+#====================================================================================
+# Parallel search
+#
+# Hash distributed A*: every canonical key is owned by one worker process, picked by
+# hashing the key. A worker keeps the open and closed lists of the keys it owns and
+# sends the successors it generates to their owners in one batch per worker. Workers
+# run in lock step: each round every worker expands all its open states with the
+# current smallest f, then takes in the batches sent to it and reports its new
+# smallest f. With a consistent heuristic no state is ever reached again with a
+# smaller g once expanded, and a goal is optimal as soon as no open state anywhere
+# has a smaller f. With no heuristic and no goal the rounds are the breadth first
+# layers of the whole state space.
+#====================================================================================
+
+def key_owner(key, workers):
+    """
+    returns the index of the worker owning a canonical key
+    """
+    return ((key % 2305843009213693951) * 0x9E3779B97F4A7C15 >> 32) % workers
+
+
+def hda_worker(index, inboxes, control, reports, heuristic_name, layout, db_dir, find_goal):
+    """
+    The loop of one worker process of parallel_a_star. Commands come in on control:
+    ('seed', key) adds the initial key if this worker owns it, ('expand', f) runs one
+    round, ('parent', key) sends back the parent of a key it owns and ('stop',) ends it.
+    """
+    if heuristic_name is None:
+        heuristic = lambda key: 0
+    else:
+        heuristic = heuristic_factories[heuristic_name](layout, db_dir)
+    workers = len(inboxes)
+    best = dict() #key -> [g, parent key]
+    expanded = set()
+    buckets = dict() #f -> [(key, g)], open states by f
+    goal = None #(g, key) of the best goal seen
+    
+    def insert(key, g_val, parent):
+        nonlocal goal
+        entry = best.get(key)
+        if entry is not None and entry[0] <= g_val:
+            return
+        best[key] = [g_val, parent]
+        f_val = g_val + heuristic(key)
+        if f_val != math.inf:
+            buckets.setdefault(f_val, []).append((key, g_val))
+        if find_goal and key & goal_target and (goal is None or g_val < goal[0]):
+            goal = (g_val, key)
+    
+    def report(count, generated):
+        reports.put((index, min(buckets) if buckets else math.inf, goal, count, generated))
+    
+    while True:
+        command = control.get()
+        if command[0] == 'seed':
+            if key_owner(command[1], workers) == index:
+                insert(command[1], 0, None)
+            report(0, 0)
+        
+        elif command[0] == 'expand':
+            outgoing = [list() for _ in range(workers)]
+            count = 0
+            generated = 0
+            for key, g_val in buckets.pop(command[1], ()):
+                if key in expanded or best[key][0] != g_val:
+                    continue #stale entry
+                expanded.add(key)
+                count += 1
+                sucessors = successor_keys(key)
+                generated += len(sucessors)
+                for sucessor in sucessors:
+                    sucessor = canonical_key(sucessor)[0]
+                    outgoing[key_owner(sucessor, workers)].append((sucessor, g_val + 1, key))
+            for owner, batch in enumerate(outgoing):
+                inboxes[owner].put(batch)
+            for _ in range(workers):
+                for key, g_val, parent in inboxes[index].get():
+                    if key not in expanded:
+                        insert(key, g_val, parent)
+            report(count, generated)
+        
+        elif command[0] == 'parent':
+            reports.put((index, best[command[1]][1]))
+        
+        else:
+            return
+
+
+def run_hda(board, heuristic_name, workers, db_dir, find_goal, result=None):
+    """
+    Start the workers and run rounds until a goal is proven optimal or nothing is left
+    open. Returns the canonical keys from the initial board to the goal (None if there
+    is no goal) and the number of states expanded in each round.
+    """
+    context = multiprocessing.get_context()
+    inboxes = [context.Queue() for _ in range(workers)]
+    controls = [context.Queue() for _ in range(workers)]
+    reports = context.Queue()
+    processes = [context.Process(target=hda_worker, daemon=True,
+                                 args=(i, inboxes, controls[i], reports, heuristic_name,
+                                       key_layout(board.key), db_dir, find_goal))
+                 for i in range(workers)]
+    for process in processes:
+        process.start()
+    
+    def run(command):
+        for control in controls:
+            control.put(command)
+        replies = [reports.get() for _ in range(workers)]
+        goals = [reply[2] for reply in replies if reply[2] is not None]
+        return (min(reply[1] for reply in replies), min(goals) if goals else None,
+                sum(reply[3] for reply in replies), sum(reply[4] for reply in replies))
+    
+    try:
+        if result is not None:
+            result.start_search()
+        f_bound, goal, _, _ = run(('seed', canonical_key(board.key)[0]))
+        rounds = list()
+        while f_bound != math.inf and (goal is None or goal[0] > f_bound):
+            if result is not None and find_goal:
+                #no open state has a smaller f
+                result.lower_bound = max(result.lower_bound, f_bound)
+            f_bound, goal, count, generated = run(('expand', f_bound))
+            rounds.append(count)
+            if result is not None:
+                result.expanded += count
+                result.generated += generated
+                if result.expanded >= result.next_check:
+                    result.checkpoint(0)
+        
+        chain = None
+        if goal is not None:
+            chain = [goal[1]]
+            while True:
+                controls[key_owner(chain[-1], workers)].put(('parent', chain[-1]))
+                parent = reports.get()[1]
+                if parent is None:
+                    break
+                chain.append(parent)
+            chain.reverse()
+        return chain, rounds
+    finally:
+        for control in controls:
+            control.put(('stop',))
+        for process in processes:
+            process.join()
+
+
+def parallel_a_star(initial_state, heuristic='manhattan', workers=None, db_dir=default_db_dir, result=None):
+    """this function takes an initial state and returns the goal state of an optimal solution found
+    by hash distributed A* on workers processes (one per core by default). heuristic is the name of
+    a heuristic in heuristic_factories; each worker builds its own. Expanded and generated states
+    are counted in result if one is given.
+    """
+    chain, _ = run_hda(initial_state.board, heuristic, workers or os.cpu_count(), db_dir, True, result)
+    if chain is None:
+        return None
+    return follow_chain(initial_state, chain)
+
+
+def parallel_enumerate(board, workers=None):
+    """
+    Count every board reachable from board (mirror images counted once) with the parallel
+    search engine running breadth first.
+
+    :return: The number of boards at each distance from board
+    :rtype: List[int]
+    """
+    _, rounds = run_hda(board, None, workers or os.cpu_count(), default_db_dir, False)
+    return rounds
+
+#====================================================================================
+# Result cache
+#
+# Solutions already found, by canonical board. Every board on a solved path is kept
+# with the number of moves left and the next board on the path, so one solve answers
+# every later query for any board it went through. Entries found by an optimal engine
+# are exact distances: astar and idastar use them as heuristic values and splice in
+# the stored rest of the path as soon as they reach a cached board that can't be
+# beaten. Cache files hold the entries from least to most recently used: a header,
+# then the packed keys, the packed next keys, the moves left and the optimal flags.
+#====================================================================================
+
+cache_magic = b'HRDCACHE'
+cache_header = struct.Struct('<8sQ') # magic, number of entries
+
+
+class SolutionCache:
+    """
+    Solutions by canonical board, bounded in size by evicting the least recently used
+    board. A board whose next board was evicted can't be spliced any more and counts
+    as a miss.
+    """
+
+    def __init__(self, max_entries=1 << 20, filename=None):
+        """
+        :param max_entries: The number of boards kept
+        :type max_entries: int
+        :param filename: A cache file to load if it exists and to save to
+        :type filename: Optional[str]
+        """
+        self.entries = OrderedDict() # canonical key -> (moves left, next canonical key, optimal)
+        self.max_entries = max_entries
+        self.filename = filename
+        self.hits = 0
+        self.misses = 0
+        if filename is not None and os.path.exists(filename):
+            self.load(filename)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def distance(self, key, optimal=True):
+        """
+        returns the number of moves left from the board key on the cached solution, or None
+        if the board isn't cached. With optimal, solutions of engines that aren't optimal
+        are ignored.
+        """
+        entry = self.entries.get(canonical_key(key)[0])
+        if entry is None or (optimal and not entry[2]):
+            return None
+        return entry[0]
+
+    def suffix(self, key, optimal=True):
+        """
+        returns the canonical keys of the cached solution from the board key to the goal, or
+        None if the board isn't cached or part of its solution was evicted
+        """
+        key = canonical_key(key)[0]
+        entry = self.entries.get(key)
+        if entry is None or (optimal and not entry[2]):
+            self.misses += 1
+            return None
+        keys = [key]
+        while entry[0] > 0:
+            self.entries.move_to_end(key)
+            left = entry[0]
+            key = entry[1]
+            entry = self.entries.get(key)
+            #moves left only ever shrink along a chain, so a chain that doesn't is stale
+            if entry is None or entry[0] >= left or (optimal and entry[0] != left - 1):
+                self.misses += 1
+                return None
+            keys.append(key)
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return keys
+
+    def add(self, keys, optimal=True):
+        """
+        Store a solution. A board already cached keeps its entry unless the new one is
+        shorter, or exact where the old one isn't.
+
+        :param keys: The board keys from a board to the goal
+        :type keys: Iterable[int]
+        :param optimal: True if the solution is optimal
+        :type optimal: bool
+        """
+        keys = [canonical_key(key)[0] for key in keys]
+        next_key = 0
+        for left, key in enumerate(reversed(keys)):
+            entry = self.entries.get(key)
+            if entry is None or (optimal and not entry[2]) or (entry[2] == optimal and left < entry[0]):
+                self.entries[key] = (left, next_key, optimal)
+            self.entries.move_to_end(key)
+            next_key = key
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def load(self, filename):
+        """
+        Add the entries of a cache file written by save.
+
+        :raises ValueError: If the file isn't a cache file or is cut short
+        """
+        require_classic_board('A cache file')
+        with open(filename, 'rb') as cache_file:
+            size = os.fstat(cache_file.fileno()).st_size
+            header = cache_file.read(cache_header.size)
+            if len(header) < cache_header.size or cache_header.unpack(header)[0] != cache_magic:
+                raise ValueError('{} is not a cache file'.format(filename))
+            count = cache_header.unpack(header)[1]
+            expected = cache_header.size + count * (8 + 8 + 2 + 1)
+            if size != expected:
+                raise ValueError('{} is damaged: {} bytes, expected {} for {} boards'.format(
+                    filename, size, expected, count))
+            columns = (array('Q'), array('Q'), array('H'), array('B'))
+            for column in columns:
+                column.fromfile(cache_file, count)
+                if sys.byteorder != 'little':
+                    column.byteswap()
+        for packed, packed_next, left, optimal in zip(*columns):
+            key = unpack_key(packed)
+            self.entries[key] = (left, unpack_key(packed_next) if left else 0, bool(optimal))
+            self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def save(self, filename=None):
+        """
+        Write every entry to a cache file, by default the one the cache was loaded from.
+        """
+        require_classic_board('A cache file')
+        filename = filename or self.filename
+        columns = (array('Q', (pack_key(key) for key in self.entries)),
+                   array('Q', (pack_key(entry[1]) if entry[0] else 0 for entry in self.entries.values())),
+                   array('H', (entry[0] for entry in self.entries.values())),
+                   array('B', (entry[2] for entry in self.entries.values())))
+
+        def write(cache_file):
+            cache_file.write(cache_header.pack(cache_magic, len(self.entries)))
+            for column in columns:
+                if sys.byteorder != 'little':
+                    column.byteswap()
+                column.tofile(cache_file)
+        replace_file(filename, write)
+
+
+def splice_solution(state, cache, optimal=True):
+    """
+    Extend state with the rest of the solution cached for its board. Boards are stored in
+    canonical orientation, so moves into a mirrored one are marked reflected and get_solution
+    reflects them back.
+
+    :return: The goal state, or None if the board has no complete solution in cache
+    :rtype: Optional[State]
+    """
+    keys = cache.suffix(state.board.key, optimal)
+    if keys is None:
+        return None
+    curr_state = state
+    for key in keys[1:]:
+        move = key_step(curr_state.board.key, key)
+        reflected = move is None
+        if reflected:
+            move = key_step(curr_state.board.key, mirror_key(key))
+        g_val = curr_state.g + 1
+        curr_state = State(Board.from_key(key), g_val, curr_state.depth + 1, g_val, curr_state, move, reflected)
+    return curr_state
+
+#====================================================================================
+# Search engines
+#
+# Every --algo name maps to one engine in search_engines. An engine takes the initial
+# state, a SearchResult to fill in and the solver options as keyword arguments
+# (heuristic, dbdir, tablesize, workers, cache); it ignores the options it has no use
+# for. Engines that don't always find an optimal solution are registered as such, so
+# their solutions are never taken as exact distances.
+#
+# A search can be given a Budget of wall clock time, boards expanded and resident
+# memory. The result checks it every budget_every boards expanded, and once any part
+# runs out the engine is stopped where it is: the result keeps the best solution found
+# so far, if the engine has one, and the fewest moves a solution is proven to take.
+# The budget is not checked while tables are loaded or built.
+#====================================================================================
+
+def untimed(phase, function):
+    """
+    Stands in for SearchResult.timed where there is no result: returns function as it is.
+    """
+    return function
+
+
+# seconds of wall clock time from the start of solve, boards expanded and MiB of
+# resident memory of the process; None for no limit
+Budget = namedtuple('Budget', ['seconds', 'nodes', 'memory'], defaults=(None, None, None))
+
+# boards expanded between two checks of a budget
+budget_every = 1000
+
+
+class BudgetExhausted(Exception):
+    """
+    Raised by SearchResult.checkpoint to stop an engine once a part of its budget runs out.
+    """
+
+    def __init__(self, budget):
+        """
+        :param budget: The part that ran out: 'seconds', 'nodes' or 'memory'
+        :type budget: str
+        """
+        super().__init__('the {} budget ran out'.format(budget))
+        self.budget = budget
+
+
+def resident_memory(peak=False):
+    """
+    returns the resident memory of this process in bytes, or None where it can't be read.
+    Outside Linux this is the peak so far. With peak, it is the peak so far of this process
+    or of any child process it waited for, whichever is higher.
+    """
+    if not peak:
+        try:
+            with open('/proc/self/statm', 'rb') as statm:
+                return int(statm.read().split()[1]) * mmap.PAGESIZE
+        except (OSError, IndexError, ValueError):
+            pass
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if peak:
+        usage = max(usage, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return usage if sys.platform == 'darwin' else usage * 1024 # bytes on macOS
+
+
+class SearchResult:
+    """
+    The outcome of running a search engine: the solution found, if any, and the work it took.
+
+    It is also how a search is instrumented. Engines count into its fields as they go and
+    call checkpoint once expanded reaches next_check, which stays at infinity unless a
+    progress callback or a budget is given. Phases are only timed when asked for: an engine
+    passes the functions of each phase through timed once before it starts, so an untimed
+    search runs the plain functions and pays for nothing but the counters.
+    """
+
+    def __init__(self, algo, timing=False, progress=None, progress_every=10000, budget=None):
+        """
+        :param algo: The name of the engine.
+        :type algo: str
+        :param timing: True to time the phases of the search (see timed)
+        :type timing: bool
+        :param progress: Called as progress(result, frontier size) every progress_every
+            boards expanded
+        :type progress: Optional[Callable[[SearchResult, int], None]]
+        :param progress_every: Boards expanded between progress calls
+        :type progress_every: int
+        :param budget: The limits of the search, None for none
+        :type budget: Optional[Budget]
+        """
+        self.algo = algo
+        self.goal = None # final state of the solution, None if there is no solution
+        self.cached = False # True if the whole solution came from the cache
+        self.exhausted = None # the part of the budget that ran out, 'depth' for a dfs depth limit, None if none did
+        self.lower_bound = 0 # the fewest moves a solution is proven to take
+        self.expanded = 0
+        self.generated = 0 # successor boards produced, including ones already seen
+        self.duplicates = 0 # successor boards dropped as already seen
+        self.peak_frontier = 0 # most boards waiting on the frontier at once
+        self.closed = 0 # boards in the closed set of the search
+        self.phases = dict() if timing else None # phase name -> seconds spent in it
+        self.setup_time = 0.0 # seconds spent loading tables and building heuristics
+        self.search_time = 0.0 # seconds spent searching
+        self.progress = progress
+        self.progress_every = progress_every
+        self.next_progress = progress_every if progress is not None else math.inf
+        self.budget = budget
+        self._path = None
+        self._start = time.perf_counter()
+        if budget is not None:
+            self.deadline = self._start + budget.seconds if budget.seconds is not None else math.inf
+            self.next_budget = min(budget_every, budget.nodes if budget.nodes is not None else math.inf)
+        else:
+            self.next_budget = math.inf
+        self.next_check = min(self.next_progress, self.next_budget)
+
+    def timed(self, phase, function):
+        """
+        returns function, or when phases are timed a wrapper adding the time spent in each
+        call to the phase
+        """
+        if self.phases is None:
+            return function
+        phases = self.phases
+        phases.setdefault(phase, 0.0)
+        clock = time.perf_counter
+
+        def timed_function(*args):
+            start = clock()
+            value = function(*args)
+            phases[phase] += clock() - start
+            return value
+        return timed_function
+
+    def checkpoint(self, frontier):
+        """
+        Called by an engine when expanded reaches next_check: reports progress when it is
+        due and checks the budget.
+
+        :param frontier: The number of boards on the frontier
+        :type frontier: int
+        :raises BudgetExhausted: If a part of the budget ran out
+        """
+        if self.expanded >= self.next_progress:
+            self.next_progress = self.expanded + self.progress_every
+            self.progress(self, frontier)
+        if self.expanded >= self.next_budget:
+            budget = self.budget
+            if budget.nodes is not None and self.expanded >= budget.nodes:
+                raise BudgetExhausted('nodes')
+            if time.perf_counter() >= self.deadline:
+                raise BudgetExhausted('seconds')
+            if budget.memory is not None:
+                memory = resident_memory()
+                if memory is not None and memory >= budget.memory * (1 << 20):
+                    raise BudgetExhausted('memory')
+            self.next_budget = min(self.expanded + budget_every,
+                                   budget.nodes if budget.nodes is not None else math.inf)
+        self.next_check = min(self.next_progress, self.next_budget)
+
+    def stats(self):
+        """
+        returns the counters and timers as a JSON serialisable dict
+        """
+        stats = {
+            'algo': self.algo,
+            'moves': self.moves,
+            'cached': self.cached,
+            'expanded': self.expanded,
+            'generated': self.generated,
+            'duplicates': self.duplicates,
+            'peak_frontier': self.peak_frontier,
+            'closed': self.closed,
+            'lower_bound': self.lower_bound,
+            'exhausted': self.exhausted,
+            'setup_time': self.setup_time,
+            'search_time': self.search_time,
+        }
+        if self.phases is not None:
+            stats['phases'] = dict(self.phases)
+        return stats
+
+    def start_search(self):
+        """
+        Called by an engine when its setup is done and the search itself starts.
+        """
+        now = time.perf_counter()
+        self.setup_time = now - self._start
+        self._start = now
+
+    def finish(self):
+        """
+        Called once the engine returns.
+        """
+        self.search_time = time.perf_counter() - self._start
+
+    @property
+    def solved(self):
+        return self.goal is not None
+
+    @property
+    def status(self):
+        """
+        'solved' or 'no solution' for a search that ended by itself. When the budget ran
+        out, or the depth limit of dfs cut the search off, 'partial' with the best solution
+        found so far and 'exhausted' with none.
+        """
+        if self.exhausted is not None:
+            return 'partial' if self.solved else 'exhausted'
+        return 'solved' if self.solved else 'no solution'
+
+    @property
+    def path(self):
+        """
+        The states from the initial board to the goal, or None if there is no solution.
+        """
+        if self._path is None and self.goal is not None:
+            self._path = list(reversed(get_solution(self.goal)))
+        return self._path
+
+    @property
+    def moves(self):
+        """
+        The number of moves in the solution, or None if there is no solution.
+        """
+        return None if self.goal is None else len(self.path) - 1
+
+    def keys(self):
+        """
+        Yield the board keys of the solution from the initial board to the goal.
+        """
+        for state in self.path or ():
+            yield state.board.key
+
+
+search_engines = {}
+optimal_engines = set()
+
+
+def search_engine(name, optimal=True):
+    """
+    Decorator registering an engine under an --algo name. optimal is False for an engine
+    whose solutions may be longer than necessary.
+    """
+    def register(engine):
+        search_engines[name] = engine
+        if optimal:
+            optimal_engines.add(name)
+        return engine
+    return register
+
+
+@search_engine('dfs', optimal=False)
+def dfs_engine(initial_state, result, heuristic='manhattan', dbdir=default_db_dir, depth=None, deepen=None,
+               shorten=True, **options):
+    heuristic = make_heuristic(heuristic, initial_state.board, dbdir)
+    result.start_search()
+    result.goal = dfs(initial_state, heuristic, depth, deepen, shorten, result)
+
+
+@search_engine('astar')
+def astar_engine(initial_state, result, heuristic='manhattan', dbdir=default_db_dir, cache=None, **options):
+    heuristic = make_heuristic(heuristic, initial_state.board, dbdir)
+    result.start_search()
+    result.goal = a_star(initial_state, heuristic, result, cache)
+
+
+@search_engine('anytime', optimal=False)
+def anytime_engine(initial_state, result, heuristic='manhattan', dbdir=default_db_dir, **options):
+    heuristic = make_heuristic(heuristic, initial_state.board, dbdir)
+    result.start_search()
+    result.goal = anytime_a_star(initial_state, heuristic, result=result)
+
+
+@search_engine('idastar')
+def idastar_engine(initial_state, result, heuristic='manhattan', dbdir=default_db_dir, tablesize=1 << 16,
+                   cache=None, **options):
+    heuristic = make_heuristic(heuristic, initial_state.board, dbdir)
+    result.start_search()
+    result.goal = ida_star(initial_state, heuristic, tablesize, result, cache)
+
+
+@search_engine('hda')
+def hda_engine(initial_state, result, heuristic='manhattan', dbdir=default_db_dir, workers=None, **options):
+    result.goal = parallel_a_star(initial_state, heuristic, workers, dbdir, result)
+
+
+@search_engine('bfs')
+def bfs_engine(initial_state, result, heuristic='manhattan', **options):
+    if np is None or geometry != classic_geometry:
+        result.goal = breadth_first(initial_state, result)
+        return
+    #heuristics without a batch version bound the solution length by blocking_distance
+    result.goal = batch_bfs(initial_state, batch_heuristics.get(heuristic, batch_blocking_distance), result)
+
+
+@search_engine('db')
+def db_engine(initial_state, result, dbdir=default_db_dir, **options):
+    result.goal = db_solve(initial_state, dbdir, result)
+
+
+def solve(board, algo, cache=None, timing=False, progress=None, progress_every=10000, budget=None, **options):
+    """
+    Solve a board with the engine registered as algo. If the budget runs out the search
+    stops there: result.exhausted tells which part ran out, result.goal is the best
+    solution found so far if there is one (only the anytime engine has one before it
+    ends), and result.lower_bound the fewest moves a solution is proven to take.
+
+    :param board: The board to solve
+    :type board: Board
+    :param algo: The name of the engine (a key of search_engines)
+    :type algo: str
+    :param cache: Solutions to answer from and to add the new solution to. An optimal
+        engine only uses solutions found by optimal engines.
+    :type cache: Optional[SolutionCache]
+    :param timing: True to time the phases of the search
+    :type timing: bool
+    :param progress: Called as progress(result, frontier size) every progress_every boards expanded
+    :type progress: Optional[Callable[[SearchResult, int], None]]
+    :param budget: The limits of the search, None for none
+    :type budget: Optional[Budget]
+    :param options: Solver options passed on to the engine (heuristic, dbdir, tablesize, workers,
+        and for dfs depth, deepen and shorten)
+    :rtype: SearchResult
+    """
+    result = SearchResult(algo, timing, progress, progress_every, budget)
+    initial_state = State(board, 0, 0, 0, None)
+    optimal = algo in optimal_engines
+    if cache is not None:
+        result.goal = splice_solution(initial_state, cache, optimal)
+        result.cached = result.goal is not None
+    if result.goal is None:
+        try:
+            search_engines[algo](initial_state, result, cache=cache if optimal else None, **options)
+        except BudgetExhausted as error:
+            result.exhausted = error.budget
+    result.finish()
+    if result.solved and optimal and result.exhausted is None:
+        result.lower_bound = result.moves
+    if cache is not None and result.solved and not result.cached:
+        cache.add(result.keys(), optimal)
+    return result
+
+#====================================================================================
+# Solution output
+#
+# Solutions are written from a stream of board keys, one board at a time, either as
+# full boards separated by blank lines or in the compact move list format: the
+# initial board, a blank line, then one line per move giving the piece id, the
+# direction (L, R, U or D) and the number of cells moved. Pieces are numbered from 0
+# by their top left cell in reading order on the initial board.
+#====================================================================================
+
+# piece_chars holds the characters each class draws and move_steps the step of each
+# direction (see set_geometry)
+
+
+def board_text(key):
+    """
+    returns the board key drawn as in the puzzle files, one line per row. Pieces of shapes
+    without characters of their own get a letter each.
+    """
+    cells = ['.'] * board_cells
+    letters = iter(piece_letters)
+    for shift, chars in piece_chars:
+        mask = (key >> shift) & full_mask
+        while mask:
+            low = mask & -mask
+            cell = low.bit_length() - 1
+            if chars[0][1] is None:
+                letter = next(letters)
+            for offset, ch in chars:
+                cells[cell + offset] = ch or letter
+            mask ^= low
+    return ''.join(''.join(cells[y * board_width:(y + 1) * board_width]) + '\n' for y in range(board_height))
+
+
+def piece_ids(key):
+    """
+    returns the id of every piece of the board key as {(shift, top left cell): id}
+    """
+    corners = list()
+    for shift, _, _, _ in piece_classes:
+        mask = (key >> shift) & full_mask
+        while mask:
+            low = mask & -mask
+            corners.append((low.bit_length() - 1, shift))
+            mask ^= low
+    corners.sort()
+    return {(shift, cell): i for i, (cell, shift) in enumerate(corners)}
+
+
+def key_move(before, after):
+    """
+    returns (shift, src, dst) of the piece that moved between two boards one move apart
+    """
+    diff = before ^ after
+    for shift, _, _, _ in piece_classes:
+        cells = (diff >> shift) & full_mask
+        if cells:
+            src = (before >> shift) & cells
+            dst = (after >> shift) & cells
+            return shift, src.bit_length() - 1, dst.bit_length() - 1
+
+
+def key_step(before, after):
+    """
+    returns the Move that turns board key before into after, or None if no single move does
+    """
+    diff = before ^ after
+    low = diff & -diff
+    high = diff ^ low
+    if not high or high & (high - 1):
+        return None
+    first = low.bit_length() - 1
+    last = high.bit_length() - 1
+    shift = first - first % board_cells
+    #both cells in one class, one cell apart and not across the edge of a row
+    if last >= shift + board_cells or last - first not in (1, board_width):
+        return None
+    if last - first == 1 and first % board_width == board_width - 1:
+        return None
+    if before & low:
+        return Move(shift, first - shift, last - shift, diff)
+    return Move(shift, last - shift, first - shift, diff)
+
+
+def write_boards(keys, file):
+    """
+    Write every board of a solution, each followed by a blank line.
+
+    :param keys: The board keys from the initial board to the goal
+    :type keys: Iterable[int]
+    """
+    for key in keys:
+        file.write(board_text(key))
+        file.write('\n')
+
+
+def write_moves(keys, file):
+    """
+    Write a solution in the compact move list format. Moves of one piece in one direction
+    in a row are written as one line.
+
+    :param keys: The board keys from the initial board to the goal
+    :type keys: Iterable[int]
+    """
+    keys = iter(keys)
+    prev = next(keys)
+    file.write(board_text(prev))
+    file.write('\n')
+    ids = piece_ids(prev)
+    run = None #[piece id, direction, distance] of the line being built
+    for key in keys:
+        shift, src, dst = key_move(prev, key)
+        piece = ids.pop((shift, src))
+        ids[(shift, dst)] = piece
+        direction = move_directions[dst - src]
+        if run is not None and run[0] == piece and run[1] == direction:
+            run[2] += 1
+        else:
+            if run is not None:
+                file.write('{} {} {}\n'.format(*run))
+            run = [piece, direction, 1]
+        prev = key
+    if run is not None:
+        file.write('{} {} {}\n'.format(*run))
+
+
+def replay_moves(lines):
+    """
+    Replay a solution written by write_moves.
+
+    :param lines: The lines of the move list
+    :type lines: Iterable[str]
+    :return: The board keys from the initial board to the goal
+    :rtype: Iterator[int]
+    :raises ValueError: At a line that can't be read or a move that can't be made, naming the line
+    """
+    lines = iter(lines)
+    board_lines = list()
+    for line in lines:
+        if line.strip():
+            board_lines.append(line)
+        elif board_lines:
+            break
+    key = read_board(board_lines).key
+    yield key
+    
+    pieces = {piece: corner for corner, piece in piece_ids(key).items()}
+    for line_number, line in enumerate(lines, len(board_lines) + 2):
+        if not line.strip():
+            continue
+        try:
+            piece, direction, distance = line.split()
+            piece, distance = int(piece), int(distance)
+            if direction not in move_steps or distance < 1:
+                raise ValueError
+        except ValueError:
+            raise ValueError('line {}: can\'t read {!r}'.format(line_number, line.strip())) from None
+        if piece not in pieces:
+            raise ValueError('line {}: there is no piece {}'.format(line_number, piece))
+        shift, cell = pieces[piece]
+        step = move_steps[direction]
+        for _ in range(distance):
+            dst = cell + step
+            #the top left cell may not leave the board, nor wrap round to the next row
+            if not 0 <= dst < board_cells or abs(dst % board_width - cell % board_width) > 1:
+                raise ValueError('line {}: piece {} can\'t move {}'.format(line_number, piece, direction))
+            sucessor = key ^ (1 << cell | 1 << dst) << shift
+            if sucessor not in successor_keys(key):
+                raise ValueError('line {}: piece {} can\'t move {}'.format(line_number, piece, direction))
+            key = sucessor
+            cell = dst
+            yield key
+        pieces[piece] = (shift, cell)
+
+
+#====================================================================================
+# Puzzle input
+#
+# A puzzle is the rows of its board, optionally below size and goal header lines (see
+# parse_puzzle). A stream may hold many puzzles separated by blank lines, as the
+# solution files hold boards. Every puzzle is checked as it is parsed, so a malformed
+# board is reported with its line before any search starts, and comes out as its
+# Geometry and board key without building pieces or a Board.
+#====================================================================================
+
+Puzzle = namedtuple('Puzzle', ['geometry', 'key'])
+
+# the standard puzzle: one 2x2 goal piece, five 1x2 pieces and four 1x1 pieces on the 4x5
+# board, which leaves two cells empty
+classic_counts = (1, 5, 4)
+
+# The masks of every row seen (see scan_row). Puzzles share few distinct rows, so most
+# rows are parsed with one lookup.
+row_masks = dict()
+row_masks_limit = 1 << 16
+
+# The geometry of every puzzle drawn without lettered pieces seen, by its size, goal
+# piece and goal header (see parse_puzzle)
+puzzle_geometries = dict()
+
+
+def scan_row(row):
+    """
+    returns the cells of a row holding each standard character, as masks with bit x set
+    for column x: (goal, ^, v, <, single), and the (x, letter) pairs of the lettered cells.
+    Rows are remembered in row_masks.
+
+    :raises ValueError: At an unknown character or a < and > that don't pair up, naming its column
+    """
+    masks = row_masks.get(row)
+    if masks is not None:
+        return masks
+    goal = top = bottom = left = single = 0
+    letters = []
+    for x, ch in enumerate(row):
+        if ch == '.':
+            continue
+        bit = 1 << x
+        if ch == char_goal:
+            goal |= bit
+        elif ch == char_single:
+            single |= bit
+        elif ch == '^':
+            top |= bit
+        elif ch == 'v':
+            bottom |= bit
+        elif ch == '<':
+            if row[x + 1:x + 2] != '>':
+                raise ValueError('column {}: < without a > after it'.format(x + 1))
+            left |= bit
+        elif ch == '>':
+            if x == 0 or row[x - 1] != '<':
+                raise ValueError('column {}: > without a < before it'.format(x + 1))
+        elif ch.isalpha():
+            letters.append((x, ch))
+        else:
+            raise ValueError('column {}: unknown piece {!r}'.format(x + 1, ch))
+    masks = (goal, top, bottom, left, single, tuple(letters))
+    if len(row_masks) >= row_masks_limit:
+        row_masks.clear()
+    row_masks[row] = masks
+    return masks
+
+
+def split_puzzles(lines):
+    """
+    Split a stream into its puzzles, the runs of lines between blank lines.
+
+    :param lines: The lines of the stream
+    :type lines: Iterable[str]
+    :return: The number of the first line of every puzzle, counting from 1, and its lines
+    :rtype: Iterator[Tuple[int, List[str]]]
+    """
+    puzzle_lines = []
+    first = None
+    for number, line in enumerate(lines, 1):
+        if line.strip():
+            if not puzzle_lines:
+                first = number
+            puzzle_lines.append(line)
+        elif puzzle_lines:
+            yield first, puzzle_lines
+            puzzle_lines = []
+    if puzzle_lines:
+        yield first, puzzle_lines
+
+
+def parse_puzzle(lines, first_line=1, classic=False):
+    """
+    Parse and check one puzzle.
+
+    The rows may follow header lines declaring the size of the board and the cells the
+    top left cell of the goal piece may end on:
+
+        size <width> <height>
+        goal <x> <y> [<x> <y> ...]
+
+    Without them the board is as big as its rows and the goal piece has to end centred
+    on the bottom row. Besides the standard characters, any letter but v marks a cell of
+    a piece of any shape: the cells with the same letter make up one piece. The cells
+    marked 1 make up the goal piece, whatever its shape.
+
+    Every row must be as wide as the board, every ^ must have a v below it and every <
+    a > to its right (and the other way round), the cells of the goal piece and of each
+    lettered piece must join up through cells sharing a side, and the goal piece must fit
+    on every goal cell declared.
+
+    :param lines: The header lines, then the rows of the board, top to bottom
+    :type lines: Iterable[str]
+    :param first_line: The line number of the first line, for error messages
+    :type first_line: int
+    :param classic: True to accept only the standard puzzle (see classic_counts): a 2x2 goal
+        piece, no lettered pieces and the standard number of every other piece
+    :type classic: bool
+    :raises ValueError: If the puzzle is malformed, naming the line at fault
+    :rtype: Puzzle
+    """
+    size = None
+    goal_corners = None
+    corners_line = first_line
+    rows = [] # (line number, row)
+    for number, line in enumerate(lines, first_line):
+        words = line.split()
+        if not words:
+            continue
+        try:
+            if words[0] == 'size':
+                size = tuple(map(int, words[1:]))
+                if len(size) != 2 or min(size) < 1:
+                    raise ValueError
+            elif words[0] == 'goal':
+                values = list(map(int, words[1:]))
+                if not values or len(values) % 2:
+                    raise ValueError
+                goal_corners = tuple(zip(values[::2], values[1::2]))
+                corners_line = number
+            elif len(words) == 1:
+                rows.append((number, words[0]))
+            else:
+                raise ValueError
+        except ValueError:
+            raise ValueError('line {}: can\'t read {!r}'.format(number, line.strip())) from None
+    if not rows:
+        raise ValueError('line {}: the puzzle has no board'.format(first_line))
+    width, height = size or (len(rows[0][1]), len(rows))
+    if len(rows) != height:
+        raise ValueError('line {}: the board has {} rows, not {}'.format(rows[0][0], len(rows), height))
+    for number, row in rows:
+        if len(row) != width:
+            raise ValueError('line {}: the row is {} cells wide, not {}'.format(number, len(row), width))
+
+    cells = width * height
+    key = 0
+    goal_mask = 0
+    lettered = dict() # letter -> cells
+    above = 0 # the ^ cells of the row above
+    for y, (number, row) in enumerate(rows):
+        try:
+            goal, top, bottom, left, single, letters = scan_row(row)
+        except ValueError as error:
+            raise ValueError('line {}, {}'.format(number, error)) from None
+        if bottom != above:
+            x = ((bottom ^ above) & -(bottom ^ above)).bit_length() - 1
+            number, ch, where = (rows[y - 1][0], '^', 'below') if above >> x & 1 else (number, 'v', 'above')
+            raise ValueError('line {}, column {}: {} without a {} {} it'.format(
+                number, x + 1, ch, 'v' if ch == '^' else '^', where))
+        above = top
+        offset = y * width
+        goal_mask |= goal << offset
+        key |= (top << cells | left << 2 * cells | single << 3 * cells) << offset
+        for x, ch in letters:
+            lettered.setdefault(ch, []).append((x, y))
+    if above:
+        x = (above & -above).bit_length() - 1
+        raise ValueError('line {}, column {}: ^ without a v below it'.format(rows[-1][0], x + 1))
+    if not goal_mask:
+        raise ValueError('line {}: the board has no goal piece'.format(rows[0][0]))
+    low = goal_mask & -goal_mask
+    goal_line = rows[(low.bit_length() - 1) // width][0]
+    if classic:
+        if goal_mask // low != 1 | 2 | 1 << width | 2 << width:
+            raise ValueError('line {}: the goal piece of a standard puzzle is a 2x2 block'.format(goal_line))
+        if lettered:
+            raise ValueError('line {}: a standard puzzle has no lettered pieces'.format(
+                rows[min(y for cells in lettered.values() for x, y in cells)][0]))
+    key |= low
+    #puzzles without lettered pieces share their geometry with every puzzle drawn alike
+    drawn = (width, height, goal_mask // low, goal_corners)
+    new = None if lettered else puzzle_geometries.get(drawn)
+    if new is None:
+        goal_cells = []
+        while goal_mask:
+            low = goal_mask & -goal_mask
+            cell = low.bit_length() - 1
+            goal_cells.append((cell % width, cell // width))
+            goal_mask ^= low
+        if not is_connected(goal_cells):
+            raise ValueError('line {}: the cells of the goal piece don\'t join up'.format(goal_line))
+        goal = normalize_shape(goal_cells)[0]
+        shapes = [goal, vertical_shape, horizontal_shape, single_shape]
+        for letter, piece_cells in lettered.items():
+            shape, (x, y) = normalize_shape(piece_cells)
+            if not is_connected(piece_cells):
+                raise ValueError('line {}: the cells of piece {} don\'t join up'.format(rows[y][0], letter))
+            if shape not in shapes[1:]:
+                shapes.append(shape)
+            key |= 1 << (shapes.index(shape, 1) * cells + y * width + x)
+        for shape in shapes[4:]:
+            #mirror images can only be told apart from their shapes if both are classes
+            if mirror_shape(shape) not in shapes[1:]:
+                shapes.append(mirror_shape(shape))
+        if goal_corners is None:
+            left = min(dx for dx, dy in goal)
+            goal_corners = (((width - (max(dx for dx, dy in goal) - left + 1)) // 2 - left,
+                             height - 1 - max(dy for dx, dy in goal)),)
+        for x, y in goal_corners:
+            if not all(0 <= x + dx < width and 0 <= y + dy < height for dx, dy in goal):
+                raise ValueError('line {}: the goal piece doesn\'t fit with its top left cell at {} {}'.format(corners_line, x, y))
+        new = Geometry(width, height, tuple(shapes), goal_corners)
+        if not lettered:
+            if len(puzzle_geometries) >= row_masks_limit:
+                puzzle_geometries.clear()
+            puzzle_geometries[drawn] = new
+
+    if classic:
+        counts = (1, bin(key >> cells & ((1 << 2 * cells) - 1)).count('1'), bin(key >> 3 * cells).count('1'))
+        if new != classic_geometry or counts != classic_counts:
+            raise ValueError('line {}: not a standard puzzle, which has one 2x2, five 1x2 and four 1x1 pieces '
+                             'on the 4x5 board'.format(first_line))
+    return Puzzle(new, key)
+
+
+def read_puzzles(lines, classic=False):
+    """
+    Parse every puzzle of a stream (see split_puzzles and parse_puzzle, which classic is
+    passed on to). The geometry of the puzzles is left as it was; see load_puzzle.
+
+    :raises ValueError: At the first malformed puzzle
+    :rtype: Iterator[Puzzle]
+    """
+    for first_line, puzzle_lines in split_puzzles(lines):
+        yield parse_puzzle(puzzle_lines, first_line, classic)
+
+
+def load_puzzle(puzzle):
+    """
+    Make the geometry of a puzzle the current one (see set_geometry) and return its board.
+
+    :type puzzle: Puzzle
+    :rtype: Board
+    """
+    set_geometry(puzzle.geometry)
+    return Board.from_key(puzzle.key)
+
+
+def read_board(lines, classic=False):
+    """
+    Load the board of a stream holding one puzzle (see parse_puzzle) and make its
+    geometry the current one.
+
+    :param lines: The header lines, then the rows of the board, top to bottom
+    :type lines: Iterable[str]
+    :param classic: True to accept only the standard puzzle
+    :type classic: bool
+    :raises ValueError: If the puzzle is malformed, or there isn't exactly one
+    :rtype: Board
+    """
+    puzzles = list(read_puzzles(lines, classic))
+    if len(puzzles) != 1:
+        raise ValueError('expected one puzzle, found {}'.format(len(puzzles)))
+    return load_puzzle(puzzles[0])
+
+
+def read_from_file(filename, classic=False):
+    """
+    Load initial board from a given file.
+
+    :param filename: The name of the given file.
+    :type filename: str
+    :param classic: True to accept only the standard puzzle (see read_board)
+    :type classic: bool
+    :return: A loaded board
+    :rtype: Board
+    """
+
+    with open(filename, "r") as puzzle_file:
+        board = read_board(puzzle_file, classic)
+    #board.display()
+    
+    return board
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--inputfile",
+        type=str,
+        required=True,
+        help="The input file that contains the puzzle."
+    )
+    
+    parser.add_argument(
+        "--outputfile",
+        type=str,
+        required=True,
+        help="The output file that contains the solution."
+    )
+    
+    parser.add_argument(
+        "--classic",
+        action="store_true",
+        help="Reject every puzzle but the standard one: one 2x2, five 1x2 and four 1x1 pieces on the 4x5 board."
+    )
+    
+    parser.add_argument(
+        "--algo",
+        type=str,
+        default='astar',
+        choices=list(search_engines),
+        help="The searching algorithm."
+    )
+    
+    parser.add_argument(
+        "--format",
+        type=str,
+        default='boards',
+        choices=['boards', 'moves'],
+        help="Write every board of the solution, or the initial board and a compact list of moves."
+    )
+    
+    parser.add_argument(
+        "--replay",
+        action="store_true",
+        help="Read a move list written with --format moves from the input file and write its boards."
+    )
+    
+    parser.add_argument(
+        "--heuristic",
+        type=str,
+        default='manhattan',
+        choices=list(heuristic_factories),
+        help="The heuristic used by astar, anytime and idastar, to order the moves tried by dfs and for the lower bound of bfs."
+    )
+    
+    parser.add_argument(
+        "--tablesize",
+        type=int,
+        default=1 << 16,
+        help="The number of boards kept in the transposition table of idastar (0 to disable it)."
+    )
+    
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="The number of worker processes used by hda."
+    )
+    
+    parser.add_argument(
+        "--dbdir",
+        type=str,
+        default=default_db_dir,
+        help="The directory holding the solution database used by --algo db."
+    )
+    
+    parser.add_argument(
+        "--cache",
+        type=str,
+        help="A cache file of solutions to answer from, and to save new solutions to."
+    )
+    
+    parser.add_argument(
+        "--cachesize",
+        type=int,
+        default=1 << 20,
+        help="The number of boards kept in the cache."
+    )
+    
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="Write the search counters and the time spent in each phase to stderr as JSON."
+    )
+    
+    parser.add_argument(
+        "--progress",
+        type=int,
+        default=0,
+        help="Report progress to stderr every this many boards expanded."
+    )
+    
+    parser.add_argument(
+        "--depth",
+        type=int,
+        help="With dfs, expand no board more than this many moves from the input (at least 0)."
+    )
+    
+    parser.add_argument(
+        "--deepen",
+        type=int,
+        help="With dfs, search again with a depth limit this much higher (at least 1) until a solution is found. "
+             "Without it dfs returns the first solution it finds, which can be far from optimal (424 moves "
+             "against 178 on benchmarks/v2h3_hardest.txt); with --deepen it is at most DEEPEN - 1 moves too long, "
+             "but searches 40-500 times as many boards there."
+    )
+    
+    parser.add_argument(
+        "--noshorten",
+        action="store_true",
+        help="With dfs, keep the path found instead of the shortest one through the boards searched."
+    )
+    
+    parser.add_argument(
+        "--timelimit",
+        type=float,
+        help="Stop searching after this many seconds and write the best solution found so far, if any."
+    )
+    
+    parser.add_argument(
+        "--nodelimit",
+        type=int,
+        help="Stop searching after expanding this many boards."
+    )
+    
+    parser.add_argument(
+        "--memorylimit",
+        type=float,
+        help="Stop searching once the process takes this many MiB of memory."
+    )
+    
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help="Run the solver under cProfile and write the pstats dump to this file."
+    )
     
     args = parser.parse_args()
+    if args.depth is not None and args.depth < 0:
+        parser.error("--depth must be at least 0")
+    if args.deepen is not None and args.deepen < 1:
+        parser.error("--deepen must be at least 1")
 
+    if args.replay:
+        #replay every move before writing, so a bad move list leaves the output file alone
+        try:
+            with open(args.inputfile, "r") as inputfile:
+                keys = list(replay_moves(inputfile))
+        except ValueError as error:
+            parser.error('{}: {}'.format(args.inputfile, error))
+        with open(args.outputfile, "a", buffering=1 << 16) as outputfile:
+            write_boards(keys, outputfile)
+        sys.exit()
+    
     # read the board from the file
-    board = read_from_file(args.inputfile)
-    choice = args.algo
-    outputfile = open(args.outputfile, "a")
-    
-    #init state constants: board read, depth = 0, parent = None, f value needs to be calculated given a board
-    initial_state = State(board,0, 0, 0, None)
-    
-    dfs_goal = dfs(initial_state)
-    astar_goal = a_star(initial_state)
-    
-    if choice == "astar":
-        sol = get_solution(astar_goal)
-        for i in reversed(sol):
-            i.board.display(outputfile)
-            outputfile.write("\n")
-            #print("")
-                 
-    elif choice == "dfs":
-        sol = get_solution(dfs_goal)
-        for i in reversed(sol):
-            i.board.display(outputfile)
-            #print("")
-            outputfile.write("\n")
-        
-    outputfile.close()
-    
\ No newline at end of file
+    try:
+        board = read_from_file(args.inputfile, args.classic)
+    except ValueError as error:
+        parser.error('{}: {}'.format(args.inputfile, error))
+    
+    #the database, the batch engines, some heuristics and cache files only take the standard board;
+    #the cache is checked before solving, as it is only written once the search is over
+    if args.cache:
+        try:
+            require_classic_board('--cache')
+        except ValueError as error:
+            parser.error('{}: {}'.format(args.inputfile, error))
+    try:
+        cache = SolutionCache(args.cachesize, args.cache) if args.cache else None
+    except (OSError, ValueError) as error: # the messages name the cache file
+        parser.error(str(error))
+    
+    def report(result, frontier):
+        print("expanded {} generated {} frontier {} closed {} {:.1f}s".format(
+            result.expanded, result.generated, frontier, result.closed,
+            time.perf_counter() - result._start), file=sys.stderr)
+    
+    budget = None
+    if (args.timelimit, args.nodelimit, args.memorylimit) != (None, None, None):
+        budget = Budget(args.timelimit, args.nodelimit, args.memorylimit)
+    
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler is not None:
+        profiler.enable()
+    try:
+        result = solve(board, args.algo, cache, args.stats, report if args.progress else None, args.progress, budget,
+                       heuristic=args.heuristic, dbdir=args.dbdir, tablesize=args.tablesize, workers=args.workers,
+                       depth=args.depth, deepen=args.deepen, shorten=not args.noshorten)
+    except ValueError as error:
+        parser.error('{}: {}'.format(args.inputfile, error))
+    if profiler is not None:
+        profiler.disable()
+        profiler.dump_stats(args.profile)
+    if args.stats:
+        print(json.dumps(result.stats()), file=sys.stderr)
+    
+    if result.exhausted == 'depth':
+        print("the depth limit cut the search off: no solution within {} moves".format(args.depth), file=sys.stderr)
+    elif result.exhausted is not None:
+        print("the {} budget ran out: {}, at least {} moves".format(
+            result.exhausted, "best solution {} moves".format(result.moves) if result.solved else "no solution yet",
+            result.lower_bound), file=sys.stderr)
+    
+    with open(args.outputfile, "a", buffering=1 << 16) as outputfile:
+        if not result.solved and result.exhausted == 'depth':
+            outputfile.write("no solution found within the depth limit\n")
+        elif not result.solved and result.exhausted is not None:
+            outputfile.write("no solution found within the budget\n")
+        elif not result.solved:
+            outputfile.write("no solution\n")
+        elif args.format == "moves":
+            write_moves(result.keys(), outputfile)
+        else:
+            write_boards(result.keys(), outputfile)
+    
+    #after the output, so a cache that can't be written costs no more than the cache
+    if cache is not None:
+        cache.save()
@@ -0,0 +1,364 @@
+import argparse
+import concurrent.futures
+import glob
+import json
+import os
+import signal
+import sys
+import time
+
+import hrd
+
+#====================================================================================
+# Batch solver: solves many puzzle files on a pool of worker processes. Inputs can be
+# puzzle files, directories (every .txt file in them), glob patterns, or manifests
+# listing one puzzle file per line. A file may hold many puzzles separated by blank
+# lines. Every puzzle is read and checked before any is solved, so malformed ones are
+# reported up front and never reach a worker. Each solution goes to its own file in
+# --outdir, and/or one JSON object per puzzle is streamed to --jsonl as the puzzles
+# finish.
+#====================================================================================
+
+class PuzzleTimeout(Exception):
+    """
+    Raised in a worker when a puzzle runs past its time limit.
+    """
+
+
+def on_alarm(signum, frame):
+    raise PuzzleTimeout()
+
+
+# the share of a timeout the search may use as its time budget (see hrd.Budget); the
+# rest is left for writing out the best solution found, and the timeout itself stops
+# whatever doesn't check its budget, such as building tables
+budget_share = 0.9
+
+
+def collect_inputs(inputs, manifest=None):
+    """
+    Expand the input arguments into a list of puzzle files.
+
+    :param inputs: Puzzle files, directories or glob patterns
+    :type inputs: List[str]
+    :param manifest: A file listing one puzzle file per line, relative to the manifest
+    :type manifest: Optional[str]
+    :rtype: List[str]
+    """
+    files = []
+    for name in inputs:
+        if os.path.isdir(name):
+            files.extend(sorted(glob.glob(os.path.join(name, '*.txt'))))
+        elif glob.has_magic(name):
+            files.extend(sorted(glob.glob(name)))
+        else:
+            files.append(name)
+    if manifest is not None:
+        base = os.path.dirname(manifest)
+        with open(manifest, 'r') as manifest_file:
+            for line in manifest_file:
+                line = line.strip()
+                if line and not line.startswith('#'):
+                    files.append(os.path.join(base, line))
+    return files
+
+
+def collect_puzzles(files, classic=False):
+    """
+    Read and check every puzzle of the puzzle files.
+
+    :param classic: True to reject every puzzle but the standard one (see hrd.parse_puzzle)
+    :type classic: bool
+    :return: The (file, number, puzzle) of every puzzle read, where number counts the
+        puzzles of a file holding more than one from 1 and is None otherwise, and a
+        record for every file or puzzle that couldn't be read
+    :rtype: Tuple[List[Tuple[str, Optional[int], hrd.Puzzle]], List[dict]]
+    """
+    puzzles = []
+    invalid = []
+    for filename in files:
+        try:
+            with open(filename, 'r') as puzzle_file:
+                parts = list(hrd.split_puzzles(puzzle_file))
+            if not parts:
+                raise ValueError('the file holds no puzzle')
+        except (OSError, ValueError) as error:
+            invalid.append({'input': filename, 'status': 'invalid',
+                            'error': '{}: {}'.format(type(error).__name__, error)})
+            continue
+        for number, (first_line, lines) in enumerate(parts, 1):
+            if len(parts) == 1:
+                number = None
+            try:
+                puzzles.append((filename, number, hrd.parse_puzzle(lines, first_line, classic)))
+            except ValueError as error:
+                record = {'input': filename, 'status': 'invalid', 'error': '{}: {}'.format(type(error).__name__, error)}
+                if number is not None:
+                    record['puzzle'] = number
+                invalid.append(record)
+    return puzzles, invalid
+
+
+def output_name(filename, outdir, number=None):
+    """
+    returns the file the solution of a puzzle is written to: <puzzle name>.sol.txt, or
+    <puzzle name>.<number>.sol.txt for puzzle number of a file holding many
+    """
+    stem = os.path.splitext(os.path.basename(filename))[0]
+    if number is not None:
+        stem += '.{}'.format(number)
+    return os.path.join(outdir, stem + '.sol.txt')
+
+
+def solve_puzzle(filename, number, puzzle, algo, options, timeout=None, outdir=None, include_solution=False,
+                 output_format='boards', budget=None):
+    """
+    Solve one puzzle read by collect_puzzles. Runs in a worker process.
+
+    :param number: The number of the puzzle in its file, None if the file holds one
+    :type number: Optional[int]
+    :type puzzle: hrd.Puzzle
+    :param timeout: Seconds the puzzle may take, None for no limit. The search gets
+        budget_share of it as its time budget and reports the best it found when that
+        runs out; the whole limit is enforced with SIGALRM, so that part is ignored where
+        the signal doesn't exist.
+    :type timeout: Optional[float]
+    :param budget: The nodes and memory budget of the search, None for none
+    :type budget: Optional[hrd.Budget]
+    :param outdir: Directory to write the solution file to, None to skip it
+    :type outdir: Optional[str]
+    :param include_solution: True to return the solution boards in the record
+    :type include_solution: bool
+    :param output_format: 'boards' or 'moves', the format of the solution file
+    :type output_format: str
+    :return: A JSON serialisable record of the outcome
+    :rtype: dict
+    """
+    record = {'input': filename, 'algo': algo}
+    if number is not None:
+        record['puzzle'] = number
+    start = time.perf_counter()
+    alarm = bool(timeout) and hasattr(signal, 'SIGALRM')
+    if alarm:
+        signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        board = hrd.load_puzzle(puzzle)
+        if timeout:
+            budget = (budget or hrd.Budget())._replace(seconds=timeout * budget_share)
+        result = hrd.solve(board, algo, budget=budget, **options)
+        record['status'] = result.status
+        record['moves'] = result.moves
+        if result.exhausted is not None:
+            record['exhausted'] = result.exhausted
+            record['lower_bound'] = result.lower_bound
+        record['expanded'] = result.expanded
+        record['setup_time'] = result.setup_time
+        record['search_time'] = result.search_time
+        if result.solved:
+            if include_solution:
+                record['solution'] = [hrd.board_text(key).split() for key in result.keys()]
+            if outdir is not None:
+                with open(output_name(filename, outdir, number), 'w', buffering=1 << 16) as outputfile:
+                    if output_format == 'moves':
+                        hrd.write_moves(result.keys(), outputfile)
+                    else:
+                        hrd.write_boards(result.keys(), outputfile)
+    except PuzzleTimeout:
+        record['status'] = 'timeout'
+    except Exception as error:
+        record['status'] = 'error'
+        record['error'] = '{}: {}'.format(type(error).__name__, error)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    record['wall_time'] = time.perf_counter() - start
+    return record
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "inputs",
+        nargs="*",
+        help="Puzzle files, directories of .txt puzzle files or glob patterns."
+    )
+
+    parser.add_argument(
+        "--manifest",
+        type=str,
+        help="A file listing one puzzle file per line."
+    )
+
+    parser.add_argument(
+        "--algo",
+        type=str,
+        default="astar",
+        choices=list(hrd.search_engines),
+        help="The searching algorithm."
+    )
+
+    parser.add_argument(
+        "--heuristic",
+        type=str,
+        default='manhattan',
+        choices=list(hrd.heuristic_factories),
+        help="The heuristic used by astar and idastar."
+    )
+
+    parser.add_argument(
+        "--tablesize",
+        type=int,
+        default=1 << 16,
+        help="The number of boards kept in the transposition table of idastar."
+    )
+
+    parser.add_argument(
+        "--hdaworkers",
+        type=int,
+        default=1,
+        help="The number of processes hda starts for each puzzle, on top of the --workers solving puzzles."
+    )
+
+    parser.add_argument(
+        "--depth",
+        type=int,
+        help="With dfs, expand no board more than this many moves from the puzzle (at least 0)."
+    )
+
+    parser.add_argument(
+        "--deepen",
+        type=int,
+        help="With dfs, search again with a depth limit this much higher (at least 1) until a solution is found. "
+             "The solution is then at most DEEPEN - 1 moves longer than optimal instead of the first one found, "
+             "but many more boards are searched (see hrd.py --help)."
+    )
+
+    parser.add_argument(
+        "--noshorten",
+        action="store_true",
+        help="With dfs, keep the path found instead of the shortest one through the boards searched."
+    )
+
+    parser.add_argument(
+        "--dbdir",
+        type=str,
+        default=hrd.default_db_dir,
+        help="The directory holding the solution database."
+    )
+
+    parser.add_argument(
+        "--outdir",
+        type=str,
+        help="Write each solution to <outdir>/<puzzle name>.sol.txt."
+    )
+
+    parser.add_argument(
+        "--format",
+        type=str,
+        default='boards',
+        choices=['boards', 'moves'],
+        help="The format of the solution files in --outdir."
+    )
+
+    parser.add_argument(
+        "--jsonl",
+        type=str,
+        help="Stream one JSON object per puzzle to this file ('-' for stdout)."
+    )
+
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        help="Seconds each puzzle may take. Searches stop a little earlier and report the best they found."
+    )
+
+    parser.add_argument(
+        "--nodelimit",
+        type=int,
+        help="Boards each puzzle may expand before the best found so far is reported."
+    )
+
+    parser.add_argument(
+        "--memorylimit",
+        type=float,
+        help="MiB of memory a worker may take before the best found so far is reported."
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="The number of worker processes."
+    )
+
+    parser.add_argument(
+        "--classic",
+        action="store_true",
+        help="Reject every puzzle but the standard one: one 2x2, five 1x2 and four 1x1 pieces on the 4x5 board."
+    )
+
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only read and check the puzzles, report the invalid ones and exit with status 1 if there are any."
+    )
+
+    args = parser.parse_args()
+    files = collect_inputs(args.inputs, args.manifest)
+    if not files:
+        parser.error("no puzzle files given")
+    if args.outdir is None and args.jsonl is None and not args.check:
+        parser.error("give --outdir, --jsonl or both")
+    if args.depth is not None and args.depth < 0:
+        parser.error("--depth must be at least 0")
+    if args.deepen is not None and args.deepen < 1:
+        parser.error("--deepen must be at least 1")
+
+    start = time.perf_counter()
+    puzzles, invalid = collect_puzzles(files, args.classic)
+    if args.check:
+        for record in invalid:
+            where = record['input'] if record.get('puzzle') is None else '{} puzzle {}'.format(record['input'], record['puzzle'])
+            print('{}: {}'.format(where, record['error']), file=sys.stderr)
+        print("{} puzzles read in {:.2f}s, {} invalid".format(len(puzzles) + len(invalid), time.perf_counter() - start,
+                                                              len(invalid)), file=sys.stderr)
+        sys.exit(1 if invalid else 0)
+    if args.outdir is not None:
+        os.makedirs(args.outdir, exist_ok=True)
+
+    options = dict(heuristic=args.heuristic, dbdir=args.dbdir, tablesize=args.tablesize, workers=args.hdaworkers,
+                   depth=args.depth, deepen=args.deepen, shorten=not args.noshorten)
+    if args.jsonl == '-':
+        jsonl = sys.stdout
+    elif args.jsonl is not None:
+        jsonl = open(args.jsonl, 'w')
+    else:
+        jsonl = None
+
+    budget = None
+    if args.nodelimit is not None or args.memorylimit is not None:
+        budget = hrd.Budget(nodes=args.nodelimit, memory=args.memorylimit)
+    statuses = dict()
+    for record in invalid:
+        record['algo'] = args.algo
+        statuses['invalid'] = statuses.get('invalid', 0) + 1
+        if jsonl is not None:
+            jsonl.write(json.dumps(record) + '\n')
+    with concurrent.futures.ProcessPoolExecutor(max_workers=args.workers) as pool:
+        futures = [pool.submit(solve_puzzle, filename, number, puzzle, args.algo, options, args.timeout,
+                               args.outdir, jsonl is not None, args.format, budget)
+                   for filename, number, puzzle in puzzles]
+        for future in concurrent.futures.as_completed(futures):
+            record = future.result()
+            statuses[record['status']] = statuses.get(record['status'], 0) + 1
+            if jsonl is not None:
+                jsonl.write(json.dumps(record) + '\n')
+                jsonl.flush()
+
+    if jsonl is not None and jsonl is not sys.stdout:
+        jsonl.close()
+    summary = ', '.join('{} {}'.format(count, status) for status, count in sorted(statuses.items()))
+    print("{} puzzles in {:.2f}s: {}".format(len(puzzles) + len(invalid), time.perf_counter() - start, summary),
+          file=sys.stderr)
@@ -0,0 +1,277 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import signal
+import sys
+import time
+
+import hrd
+from hrd_batch import PuzzleTimeout, on_alarm
+
+#====================================================================================
+# Benchmark suite: runs search engines over the puzzles of a corpus and reports, as
+# JSON, the solution length, the states expanded and generated, the peak resident
+# memory and the wall time of every run. Each run gets a fresh process, so its peak
+# memory is its own. With --compare the report is checked against a saved baseline
+# and the exit status is 1 if anything got slower, bigger or worse than the
+# tolerances allow.
+#
+# The corpus is a JSON list of puzzles: the puzzle file (relative to the corpus),
+# its name, its layout, the length of its optimal solution and a note.
+#====================================================================================
+
+default_corpus = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'corpus.json')
+
+
+def load_corpus(filename, names=None):
+    """
+    Read a corpus file.
+
+    :param names: Only keep the puzzles with these names, None for all of them
+    :type names: Optional[List[str]]
+    :return: The puzzles, with 'path' set to the full name of each puzzle file
+    :rtype: List[dict]
+    """
+    with open(filename, 'r') as corpus_file:
+        puzzles = json.load(corpus_file)
+    base = os.path.dirname(filename)
+    for puzzle in puzzles:
+        puzzle['path'] = os.path.join(base, puzzle['file'])
+    if names:
+        puzzles = [puzzle for puzzle in puzzles if puzzle['name'] in names]
+    return puzzles
+
+
+def run_case(queue, puzzle, algo, options, timeout, repeat):
+    """
+    Solve one puzzle repeat times with one engine and put the record on queue. Runs in
+    its own process. Counts come from the last run and times from the fastest.
+    """
+    record = {'puzzle': puzzle['name'], 'algo': algo}
+    alarm = bool(timeout) and hasattr(signal, 'SIGALRM')
+    if alarm:
+        signal.signal(signal.SIGALRM, on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        board = hrd.read_from_file(puzzle['path'])
+        wall_times = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = hrd.solve(board, algo, **options)
+            wall_times.append(time.perf_counter() - start)
+        record['status'] = result.status
+        if result.exhausted is not None:
+            record['exhausted'] = result.exhausted
+            record['lower_bound'] = result.lower_bound
+        record['moves'] = result.moves
+        if puzzle.get('moves') is not None and algo in hrd.optimal_engines:
+            record['optimal'] = result.moves == puzzle['moves']
+        record['expanded'] = result.expanded
+        record['generated'] = result.generated
+        record['setup_time'] = result.setup_time
+        record['search_time'] = result.search_time
+        record['wall_time'] = min(wall_times)
+    except PuzzleTimeout:
+        record['status'] = 'timeout'
+    except Exception as error:
+        record['status'] = 'error'
+        record['error'] = '{}: {}'.format(type(error).__name__, error)
+    finally:
+        if alarm:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+    peak = hrd.resident_memory(peak=True)
+    record['peak_rss_kb'] = peak // 1024 if peak is not None else None
+    queue.put(record)
+
+
+def run_isolated(puzzle, algo, options, timeout=None, repeat=1):
+    """
+    returns the record of run_case, run in a fresh process
+    """
+    context = multiprocessing.get_context()
+    queue = context.Queue()
+    process = context.Process(target=run_case, args=(queue, puzzle, algo, options, timeout, repeat))
+    process.start()
+    record = queue.get()
+    process.join()
+    return record
+
+
+def compare(report, baseline, count_tolerance=0.0, time_tolerance=0.25, memory_tolerance=0.1, time_floor=0.05):
+    """
+    Check a report against a baseline report of the same runs.
+
+    :param count_tolerance: The fraction states expanded or generated may grow by
+    :type count_tolerance: float
+    :param time_tolerance: The fraction the wall time may grow by
+    :type time_tolerance: float
+    :param memory_tolerance: The fraction the peak memory may grow by
+    :type memory_tolerance: float
+    :param time_floor: Seconds of wall time growth that are never reported, as noise
+    :type time_floor: float
+    :return: One line per regression; runs missing from either report are skipped
+    :rtype: List[str]
+    """
+    before = {(record['puzzle'], record['algo']): record for record in baseline['results']}
+    regressions = []
+    for record in report['results']:
+        old = before.get((record['puzzle'], record['algo']))
+        if old is None:
+            continue
+        name = '{} {}'.format(record['puzzle'], record['algo'])
+        if record['status'] != old['status']:
+            regressions.append('{}: {} was {}'.format(name, record['status'], old['status']))
+            continue
+        if record['status'] != 'solved':
+            continue
+        if record['moves'] > old['moves']:
+            regressions.append('{}: {} moves was {}'.format(name, record['moves'], old['moves']))
+        for field in ('expanded', 'generated'):
+            if record[field] > old[field] * (1 + count_tolerance):
+                regressions.append('{}: {} {} was {}'.format(name, record[field], field, old[field]))
+        if (record['wall_time'] > old['wall_time'] * (1 + time_tolerance)
+                and record['wall_time'] - old['wall_time'] > time_floor):
+            regressions.append('{}: {:.3f}s was {:.3f}s'.format(name, record['wall_time'], old['wall_time']))
+        if (record['peak_rss_kb'] and old['peak_rss_kb']
+                and record['peak_rss_kb'] > old['peak_rss_kb'] * (1 + memory_tolerance)):
+            regressions.append('{}: {} KiB peak was {} KiB'.format(name, record['peak_rss_kb'], old['peak_rss_kb']))
+    return regressions
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--corpus",
+        type=str,
+        default=default_corpus,
+        help="The corpus file listing the puzzles."
+    )
+
+    parser.add_argument(
+        "--puzzles",
+        type=str,
+        nargs="+",
+        help="Only run the puzzles with these names."
+    )
+
+    parser.add_argument(
+        "--algo",
+        type=str,
+        nargs="+",
+        default=list(hrd.search_engines),
+        choices=list(hrd.search_engines),
+        help="The engines to run (all of them by default)."
+    )
+
+    parser.add_argument(
+        "--heuristic",
+        type=str,
+        default='manhattan',
+        choices=list(hrd.heuristic_factories),
+        help="The heuristic used by astar, idastar and hda."
+    )
+
+    parser.add_argument(
+        "--tablesize",
+        type=int,
+        default=1 << 16,
+        help="The number of boards kept in the transposition table of idastar."
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="The number of worker processes used by hda."
+    )
+
+    parser.add_argument(
+        "--dbdir",
+        type=str,
+        default=hrd.default_db_dir,
+        help="The directory holding the solution database."
+    )
+
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60.0,
+        help="Seconds each run may take (0 for no limit)."
+    )
+
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=1,
+        help="Solve every puzzle this many times per engine and keep the fastest time."
+    )
+
+    parser.add_argument(
+        "--output",
+        type=str,
+        help="Write the report to this file instead of stdout."
+    )
+
+    parser.add_argument(
+        "--compare",
+        type=str,
+        help="A saved report to check this one against."
+    )
+
+    parser.add_argument(
+        "--count-tolerance",
+        type=float,
+        default=0.0,
+        help="With --compare, the fraction states expanded or generated may grow by."
+    )
+
+    parser.add_argument(
+        "--time-tolerance",
+        type=float,
+        default=0.25,
+        help="With --compare, the fraction wall time may grow by."
+    )
+
+    parser.add_argument(
+        "--memory-tolerance",
+        type=float,
+        default=0.1,
+        help="With --compare, the fraction peak memory may grow by."
+    )
+
+    args = parser.parse_args()
+    puzzles = load_corpus(args.corpus, args.puzzles)
+    options = dict(heuristic=args.heuristic, dbdir=args.dbdir, tablesize=args.tablesize, workers=args.workers)
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'options': options,
+        'repeat': args.repeat,
+        'results': [],
+    }
+    for puzzle in puzzles:
+        for algo in args.algo:
+            record = run_isolated(puzzle, algo, options, args.timeout, args.repeat)
+            report['results'].append(record)
+            print('{} {}: {}'.format(puzzle['name'], algo, record['status']), file=sys.stderr)
+
+    text = json.dumps(report, indent=1)
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            output_file.write(text + '\n')
+    else:
+        print(text)
+
+    if args.compare is not None:
+        with open(args.compare, 'r') as baseline_file:
+            baseline = json.load(baseline_file)
+        regressions = compare(report, baseline, args.count_tolerance, args.time_tolerance, args.memory_tolerance)
+        for line in regressions:
+            print('regression: ' + line, file=sys.stderr)
+        if regressions:
+            sys.exit(1)
@@ -0,0 +1,34 @@
+import argparse
+import itertools
+import os
+import time
+
+import hrd
+
+#====================================================================================
+# Offline builder for the solution database used by hrd.py --algo db.
+# Builds one table for every way of splitting the five 1x2 pieces into vertical
+# and horizontal ones, and the smaller tables the pdb heuristic reads.
+#====================================================================================
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--dbdir",
+        type=str,
+        default=hrd.default_db_dir,
+        help="The directory the tables are written to."
+    )
+    
+    args = parser.parse_args()
+    os.makedirs(args.dbdir, exist_ok=True)
+    
+    for vertical, singles in itertools.product(range(6), (4, 3)):
+        layout = (vertical, 5 - vertical, singles)
+        start = time.time()
+        distances = hrd.build_solution_db(*layout)
+        filename = hrd.db_path(layout, args.dbdir)
+        hrd.write_solution_db(distances, filename)
+        print("{}: {} states, longest solution {} moves, {:.2f}s".format(
+            filename, len(distances), max(distances.values()), time.time() - start))
@@ -0,0 +1,129 @@
+import argparse
+import json
+import os
+import time
+
+import hrd
+
+#====================================================================================
+# State space enumerator. For a puzzle file it enumerates every board reachable from
+# it; for a layout (numbers of vertical, horizontal and single pieces) it splits every
+# board of the layout into connected components. For each component it reports the
+# number of boards and moves, how many boards can reach the goal, the histogram of
+# their solution lengths and the hardest start boards, and it can write the component
+# graph in the binary adjacency format of hrd.write_graph. With --workers a puzzle's
+# boards are only counted, by distance from it, on the parallel search engine. Output
+# is JSON.
+#====================================================================================
+
+def component_report(keys, hardest=5, graph_file=None):
+    """
+    returns the statistics of one component as a JSON serialisable dict
+    """
+    start = time.perf_counter()
+    packed, offsets, neighbours = hrd.component_graph(keys)
+    distances = hrd.graph_distances(packed, offsets, neighbours)
+    if graph_file is not None:
+        hrd.write_graph(graph_file, packed, offsets, neighbours, distances)
+
+    histogram = dict()
+    for distance in distances:
+        if distance != hrd.unreachable:
+            histogram[distance] = histogram.get(distance, 0) + 1
+    report = {
+        'boards': len(packed),
+        'moves': len(neighbours) // 2,
+        'solvable': sum(histogram.values()),
+        'longest_solution': max(histogram) if histogram else None,
+        'solution_lengths': {str(distance): histogram[distance] for distance in sorted(histogram)},
+    }
+    if histogram:
+        longest = max(histogram)
+        report['hardest'] = [hrd.board_text(hrd.unpack_key(packed[i])).split()
+                             for i, distance in enumerate(distances) if distance == longest][:hardest]
+    report['seconds'] = time.perf_counter() - start
+    return report
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--inputfile",
+        type=str,
+        help="Enumerate every board reachable from this puzzle."
+    )
+
+    parser.add_argument(
+        "--layout",
+        type=int,
+        nargs=3,
+        metavar=("VERTICAL", "HORIZONTAL", "SINGLE"),
+        help="Enumerate every board with these numbers of pieces, split into components."
+    )
+
+    parser.add_argument(
+        "--graph",
+        type=str,
+        help="With --inputfile, write the component graph to this file."
+    )
+
+    parser.add_argument(
+        "--graphdir",
+        type=str,
+        help="With --layout, write the graph of every component to component<i>.graph in this directory."
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="With --inputfile, only count the boards at each distance from the puzzle, on this many processes."
+    )
+
+    parser.add_argument(
+        "--hardest",
+        type=int,
+        default=5,
+        help="The number of hardest start boards to list per component."
+    )
+
+    args = parser.parse_args()
+    if (args.inputfile is None) == (args.layout is None):
+        parser.error("give exactly one of --inputfile and --layout")
+    if args.workers is not None and (args.inputfile is None or args.graph is not None):
+        parser.error("--workers only counts the boards of --inputfile, without --graph")
+
+    start = time.perf_counter()
+    if args.inputfile is not None:
+        try:
+            board = hrd.read_from_file(args.inputfile)
+        except ValueError as error:
+            parser.error('{}: {}'.format(args.inputfile, error))
+        if args.workers is not None:
+            layers = hrd.parallel_enumerate(board, args.workers)
+            report = {
+                'boards': sum(layers),
+                'farthest': len(layers) - 1,
+                'distances': {str(distance): count for distance, count in enumerate(layers)},
+            }
+        else:
+            report = component_report(hrd.enumerate_component(board.key), args.hardest, args.graph)
+    else:
+        if args.graphdir is not None:
+            os.makedirs(args.graphdir, exist_ok=True)
+        components = hrd.layout_components(*args.layout)
+        reports = []
+        for i, component in enumerate(components):
+            graph_file = None
+            if args.graphdir is not None:
+                graph_file = os.path.join(args.graphdir, 'component{}.graph'.format(i))
+            reports.append(component_report(component, args.hardest, graph_file))
+        report = {
+            'layout': args.layout,
+            'boards': sum(len(component) for component in components),
+            'components': len(components),
+            'solvable_components': sum(1 for r in reports if r['solvable']),
+            'component_reports': reports,
+        }
+    report['total_seconds'] = time.perf_counter() - start
+    print(json.dumps(report, indent=1))
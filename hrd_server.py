@@ -0,0 +1,515 @@
+import argparse
+import http.server
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import signal
+import sys
+import threading
+import time
+import urllib.parse
+from collections import OrderedDict
+
+import hrd
+from hrd_batch import PuzzleTimeout, budget_share
+
+#====================================================================================
+# Solver service: a long running HTTP server on localhost that solves boards sent to
+# it as JSON. Requests are run on a pool of worker processes started once, so the
+# move tables, the solution databases opened for db and pdb, and a solution cache for
+# each of the last few board geometries stay in memory from one request to the next.
+#
+#   POST /solve    a JSON object: "board" (the puzzle text, or a list of its lines),
+#                  and optionally "id", "algo", "heuristic", "tablesize", "workers",
+#                  "depth", "deepen", "shorten" (for dfs), "format" ('boards' or
+#                  'moves'), "timeout" in seconds, and "nodes" and "memory" (MiB)
+#                  budgets. A plain text body is taken as the board, with the options
+#                  in the query string. Answers with a JSON record of the outcome.
+#   POST /cancel   {"id": ...}: stops the request with that id, queued or running.
+#   GET /status    the workers, and the ids of the requests queued and running.
+#
+# The timeout of a request counts from its arrival, so time spent waiting for a free
+# worker counts too. The search gets most of the time left as its time budget (see
+# hrd.Budget), so it answers within the timeout with the best it found, 'partial' with
+# a solution and 'exhausted' without, and a lower bound on the solution length.
+# Timeouts and cancellation interrupt the worker with SIGALRM and SIGUSR1, so they need
+# a platform with those signals.
+#====================================================================================
+
+class RequestCancelled(Exception):
+    """
+    Raised in a worker when its request is cancelled.
+    """
+
+
+#the board geometries a worker keeps a solution cache for; the least recently used one
+#is dropped beyond this many
+cache_geometries = 8
+
+#the number of the request the worker process is running (None between requests) and
+#the shared value the server sets to the number of the request to cancel
+current_request = None
+cancel_request = None
+
+
+def on_signal(signum, frame):
+    #a signal meant for a request that is already over must not hit the next one
+    if current_request is None:
+        return
+    if signum == signal.SIGALRM:
+        raise PuzzleTimeout()
+    if cancel_request.value == current_request:
+        raise RequestCancelled()
+
+
+def request_board(board):
+    """
+    returns the Board of the "board" field of a request: the puzzle text, or its lines
+    """
+    if isinstance(board, str):
+        board = board.splitlines()
+    if not isinstance(board, list) or not all(isinstance(line, str) for line in board):
+        raise ValueError('board must be the puzzle text or a list of its lines')
+    return hrd.read_board(board)
+
+
+def solution_record(result, output_format):
+    """
+    returns the solution of a solved result as JSON: a list of boards, each a list of
+    rows, or for the 'moves' format the initial board and a list of [piece, direction,
+    cells] moves
+    """
+    if output_format == 'moves':
+        text = io.StringIO()
+        hrd.write_moves(result.keys(), text)
+        board, moves = text.getvalue().split('\n\n', 1)
+        return {'board': board.split(),
+                'moves': [[int(piece), direction, int(cells)]
+                          for piece, direction, cells in map(str.split, moves.splitlines())]}
+    return [hrd.board_text(key).split() for key in result.keys()]
+
+
+def handle_request(number, request, timeout, options, caches):
+    """
+    Solve one request. Runs in a worker process.
+
+    :param number: The number the server gave the request, for cancellation
+    :type number: int
+    :param timeout: Seconds left before the request times out, None for no limit
+    :type timeout: Optional[float]
+    :param options: Solver options of the server, overridden by those of the request
+    :type options: dict
+    :param caches: The solution caches of the board geometries seen last, least recently
+        used first
+    :type caches: OrderedDict[hrd.Geometry, hrd.SolutionCache]
+    :return: A JSON serialisable record of the outcome
+    :rtype: dict
+    """
+    global current_request
+    algo = request.get('algo', 'astar')
+    record = {'id': request['id'], 'algo': algo}
+    start = time.perf_counter()
+    try:
+        current_request = number
+        if timeout is not None:
+            signal.setitimer(signal.ITIMER_REAL, max(timeout, 1e-3))
+        board = request_board(request['board'])
+        cache = caches.get(hrd.geometry)
+        if cache is None:
+            cache = caches[hrd.geometry] = hrd.SolutionCache(options['cachesize'])
+            if len(caches) > cache_geometries:
+                caches.popitem(last=False)
+        caches.move_to_end(hrd.geometry)
+        solver_options = {name: request.get(name, options[name]) for name in ('heuristic', 'tablesize', 'workers')}
+        solver_options.update((name, request[name]) for name in ('depth', 'deepen', 'shorten') if name in request)
+        budget = hrd.Budget(timeout * budget_share if timeout is not None else None,
+                            request.get('nodes'), request.get('memory'))
+        result = hrd.solve(board, algo, cache, budget=budget, dbdir=options['dbdir'], **solver_options)
+        record['status'] = result.status
+        record['moves'] = result.moves
+        if result.exhausted is not None:
+            record['exhausted'] = result.exhausted
+            record['lower_bound'] = result.lower_bound
+        record['cached'] = result.cached
+        record['expanded'] = result.expanded
+        record['generated'] = result.generated
+        record['setup_time'] = result.setup_time
+        record['search_time'] = result.search_time
+        if result.solved:
+            record['solution'] = solution_record(result, request.get('format', 'boards'))
+    except PuzzleTimeout:
+        record['status'] = 'timeout'
+    except RequestCancelled:
+        record['status'] = 'cancelled'
+    except Exception as error:
+        record['status'] = 'error'
+        record['error'] = '{}: {}'.format(type(error).__name__, error)
+    finally:
+        current_request = None
+        signal.setitimer(signal.ITIMER_REAL, 0)
+    record['solve_time'] = time.perf_counter() - start
+    return record
+
+
+def serve_requests(connection, cancel, options):
+    """
+    The loop of a worker process: takes (number, request, timeout) from connection and
+    sends back the record of each, until it is sent None.
+    """
+    global cancel_request
+    cancel_request = cancel
+    signal.signal(signal.SIGALRM, on_signal)
+    signal.signal(signal.SIGUSR1, on_signal)
+    signal.signal(signal.SIGINT, signal.SIG_IGN) # the server shuts the workers down
+    caches = OrderedDict()
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        connection.send(handle_request(*message, options, caches))
+
+
+class Job:
+    """
+    A request waiting for a worker or running on one.
+    """
+
+    def __init__(self, number):
+        self.number = number
+        self.worker = None # the Worker running it, None while it waits
+        self.cancelled = False
+
+
+class Worker:
+    """
+    A worker process and the end of its pipe kept by the server.
+    """
+
+    def __init__(self, context, options):
+        self.connection, child_connection = context.Pipe()
+        self.cancel = context.Value('q', 0, lock=False)
+        #not a daemon, so hda can start processes of its own
+        self.process = context.Process(target=serve_requests, args=(child_connection, self.cancel, options))
+        self.process.start()
+
+
+class SolverPool:
+    """
+    Hands requests to idle worker processes. Called from the threads of the server, one
+    per connection.
+    """
+
+    def __init__(self, workers, options):
+        """
+        :param workers: The number of worker processes
+        :type workers: int
+        :param options: The solver options every worker starts with: heuristic,
+            tablesize, workers (for hda), dbdir and cachesize
+        :type options: dict
+        """
+        context = multiprocessing.get_context()
+        self.workers = [Worker(context, options) for _ in range(workers)]
+        self.idle = list(self.workers)
+        self.jobs = dict() # request id -> Job
+        self.numbers = itertools.count(1)
+        self.condition = threading.Condition()
+
+    def run(self, request, timeout=None):
+        """
+        Solve a request on the first worker free, waiting for one if they are all busy.
+
+        :param request: The decoded request, with its id
+        :type request: dict
+        :param timeout: Seconds the request may take in all, None for no limit
+        :type timeout: Optional[float]
+        :return: The record of the outcome
+        :rtype: dict
+        """
+        arrival = time.perf_counter()
+        deadline = arrival + timeout if timeout is not None else None
+        with self.condition:
+            if request['id'] in self.jobs:
+                raise KeyError('request {} is already running'.format(request['id']))
+            job = self.jobs[request['id']] = Job(next(self.numbers))
+            while not self.idle and not job.cancelled:
+                if deadline is not None and time.perf_counter() >= deadline:
+                    break
+                self.condition.wait(None if deadline is None else deadline - time.perf_counter())
+            if job.cancelled or not self.idle:
+                del self.jobs[request['id']]
+                return {'id': request['id'], 'status': 'cancelled' if job.cancelled else 'timeout',
+                        'queue_time': time.perf_counter() - arrival}
+            #the same board goes to the same worker when it is free, to find its cached solution
+            worker = self.workers[hash(str(request['board'])) % len(self.workers)]
+            if worker not in self.idle:
+                worker = self.idle[-1]
+            self.idle.remove(worker)
+            job.worker = worker
+        queue_time = time.perf_counter() - arrival
+        try:
+            worker.connection.send((job.number, request, None if deadline is None else deadline - time.perf_counter()))
+            record = worker.connection.recv()
+        finally:
+            with self.condition:
+                del self.jobs[request['id']]
+                self.idle.append(worker)
+                self.condition.notify()
+        record['queue_time'] = queue_time
+        return record
+
+    def cancel(self, request_id):
+        """
+        Cancel a request, waiting or running.
+
+        :return: False if no request with that id is waiting or running
+        :rtype: bool
+        """
+        with self.condition:
+            job = self.jobs.get(request_id)
+            if job is None:
+                return False
+            job.cancelled = True
+            if job.worker is not None:
+                job.worker.cancel.value = job.number
+                os.kill(job.worker.process.pid, signal.SIGUSR1)
+            else:
+                self.condition.notify_all()
+            return True
+
+    def status(self):
+        """
+        returns the number of workers and the ids of the requests waiting and running
+        """
+        with self.condition:
+            return {
+                'workers': len(self.workers),
+                'idle': len(self.idle),
+                'queued': [request_id for request_id, job in self.jobs.items() if job.worker is None],
+                'running': [request_id for request_id, job in self.jobs.items() if job.worker is not None],
+            }
+
+    def close(self):
+        for worker in self.workers:
+            worker.connection.send(None)
+        for worker in self.workers:
+            worker.process.join()
+
+
+class SolverHandler(http.server.BaseHTTPRequestHandler):
+    """
+    Decodes the requests of one connection and answers them with JSON.
+    """
+
+    # option name -> the type a value in the query string is converted to
+    query_types = {'id': str, 'algo': str, 'heuristic': str, 'format': str,
+                   'tablesize': int, 'workers': int, 'timeout': float, 'nodes': int, 'memory': float,
+                   'depth': int, 'deepen': int, 'shorten': lambda value: value.lower() not in ('0', 'false', 'no')}
+
+    def send_json(self, code, value):
+        body = json.dumps(value).encode()
+        self.send_response(code)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_request(self):
+        """
+        returns the request in the body, with the options of the query string for a
+        plain text board
+        """
+        url = urllib.parse.urlsplit(self.path)
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        if self.headers.get_content_type() == 'application/json':
+            request = json.loads(body)
+            if not isinstance(request, dict):
+                raise ValueError('the request must be a JSON object')
+            return request
+        request = {'board': body}
+        for name, values in urllib.parse.parse_qs(url.query).items():
+            if name not in self.query_types:
+                raise ValueError('unknown option {}'.format(name))
+            request[name] = self.query_types[name](values[-1])
+        return request
+
+    def check_id(self, request):
+        """
+        Raise ValueError unless the id of a request, if it has one, is a string or a whole number.
+        """
+        request_id = request.get('id')
+        if request_id is not None and (not isinstance(request_id, (str, int)) or isinstance(request_id, bool)):
+            raise ValueError('id must be a string or a whole number')
+
+    def check_request(self, request):
+        """
+        Raise ValueError if an option of a request is not one the solver has.
+        """
+        if 'board' not in request:
+            raise ValueError('the request has no board')
+        self.check_id(request)
+        #checked before looking them up, as a list or an object can't be
+        for name in ('algo', 'heuristic', 'format'):
+            if request.get(name) is not None and not isinstance(request[name], str):
+                raise ValueError('{} must be a string'.format(name))
+        if request.get('algo', 'astar') not in hrd.search_engines:
+            raise ValueError('unknown algo {}'.format(request['algo']))
+        if request.get('heuristic', 'manhattan') not in hrd.heuristic_factories:
+            raise ValueError('unknown heuristic {}'.format(request['heuristic']))
+        if request.get('format', 'boards') not in ('boards', 'moves'):
+            raise ValueError('unknown format {}'.format(request['format']))
+        if request.get('timeout') is not None and not isinstance(request['timeout'], (int, float)):
+            raise ValueError('timeout must be a number of seconds')
+        if request.get('nodes') is not None and not isinstance(request['nodes'], int):
+            raise ValueError('nodes must be a number of boards')
+        if request.get('memory') is not None and not isinstance(request['memory'], (int, float)):
+            raise ValueError('memory must be a number of MiB')
+        #a deepen of 0 would search to the same depth forever
+        for name, least in (('depth', 0), ('deepen', 1), ('tablesize', 0), ('workers', 0)):
+            value = request.get(name)
+            if value is not None and (not isinstance(value, int) or isinstance(value, bool) or value < least):
+                raise ValueError('{} must be a whole number of at least {}'.format(name, least))
+
+    def do_GET(self):
+        if urllib.parse.urlsplit(self.path).path == '/status':
+            self.send_json(200, self.server.pool.status())
+        else:
+            self.send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        path = urllib.parse.urlsplit(self.path).path
+        if path not in ('/solve', '/cancel'):
+            self.send_json(404, {'error': 'not found'})
+            return
+        try:
+            request = self.read_request()
+            if path == '/cancel':
+                self.check_id(request)
+                self.send_json(200, {'id': request.get('id'), 'cancelled': self.server.pool.cancel(request.get('id'))})
+                return
+            self.check_request(request)
+        except ValueError as error: # json.JSONDecodeError included
+            self.send_json(400, {'error': str(error)})
+            return
+        if request.get('id') is None:
+            request['id'] = 'request-{}'.format(next(self.server.request_ids))
+        timeout = request.get('timeout', self.server.request_timeout)
+        try:
+            record = self.server.pool.run(request, timeout or None)
+        except KeyError as error:
+            self.send_json(409, {'error': error.args[0]})
+            return
+        self.send_json(200, record)
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+class SolverServer(http.server.ThreadingHTTPServer):
+    """
+    The HTTP server, holding the pool its handlers send requests to.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, address, pool, request_timeout=None, verbose=False):
+        """
+        :param request_timeout: Seconds a request may take when it doesn't give its own
+            timeout, None for no limit
+        :type request_timeout: Optional[float]
+        """
+        super().__init__(address, SolverHandler)
+        self.pool = pool
+        self.request_timeout = request_timeout
+        self.verbose = verbose
+        self.request_ids = itertools.count(1)
+
+
+if __name__ == "__main__":
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--host",
+        type=str,
+        default="127.0.0.1",
+        help="The address to listen on."
+    )
+
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=8765,
+        help="The port to listen on."
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count(),
+        help="The number of worker processes solving requests."
+    )
+
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=60.0,
+        help="Seconds a request may take unless it gives its own timeout (0 for no limit)."
+    )
+
+    parser.add_argument(
+        "--heuristic",
+        type=str,
+        default='manhattan',
+        choices=list(hrd.heuristic_factories),
+        help="The heuristic used by astar, idastar and hda unless a request gives its own."
+    )
+
+    parser.add_argument(
+        "--tablesize",
+        type=int,
+        default=1 << 16,
+        help="The number of boards kept in the transposition table of idastar."
+    )
+
+    parser.add_argument(
+        "--hdaworkers",
+        type=int,
+        default=2,
+        help="The number of processes hda starts for a request unless it gives its own."
+    )
+
+    parser.add_argument(
+        "--dbdir",
+        type=str,
+        default=hrd.default_db_dir,
+        help="The directory holding the solution database."
+    )
+
+    parser.add_argument(
+        "--cachesize",
+        type=int,
+        default=1 << 20,
+        help="The number of boards kept in the solution cache of each worker and board geometry."
+    )
+
+    parser.add_argument(
+        "--verbose",
+        action="store_true",
+        help="Log every request to stderr."
+    )
+
+    args = parser.parse_args()
+    options = dict(heuristic=args.heuristic, tablesize=args.tablesize, workers=args.hdaworkers,
+                   dbdir=args.dbdir, cachesize=args.cachesize)
+    pool = SolverPool(args.workers, options)
+    server = SolverServer((args.host, args.port), pool, args.timeout or None, args.verbose)
+    print("serving on http://{}:{} with {} workers".format(args.host, server.server_port, args.workers), file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pool.close()
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, root)
+
+import hrd
+
+benchmarks = os.path.join(root, 'benchmarks')
+
+
+@pytest.fixture(autouse=True)
+def classic_board():
+    """
+    Every test starts and ends on the standard board, whatever geometry it loads.
+    """
+    hrd.set_geometry(hrd.classic_geometry)
+    yield
+    hrd.set_geometry(hrd.classic_geometry)
+
+
+def check_solution(keys):
+    """
+    Assert that every board of a solution is one move from the one before and that the
+    last one is solved, and return the number of moves.
+    """
+    keys = list(keys)
+    for prev, key in zip(keys, keys[1:]):
+        assert key in hrd.successor_keys(prev)
+    assert keys[-1] & hrd.goal_target
+    return len(keys) - 1
@@ -0,0 +1,109 @@
+import json
+import os
+import subprocess
+import sys
+
+import hrd_batch
+from conftest import root
+
+easy = '^^<>\nvv2^\n112v\n112^\n2..v\n'
+
+
+def write_puzzles(directory):
+    directory.mkdir()
+    (directory / 'easy.txt').write_text(easy)
+    (directory / 'hard.txt').write_text(open(os.path.join(root, 'testhrd_hard1.txt')).read())
+    return directory
+
+
+def run_batch(*args):
+    process = subprocess.run([sys.executable, os.path.join(root, 'hrd_batch.py')] + list(args),
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
+    return process.returncode, [json.loads(line) for line in process.stdout.splitlines()], process.stderr
+
+
+def test_collect_inputs(tmp_path):
+    puzzles = write_puzzles(tmp_path / 'puzzles')
+    manifest = tmp_path / 'manifest.txt'
+    manifest.write_text('# a comment\npuzzles/easy.txt\n\npuzzles/hard.txt\n')
+    files = hrd_batch.collect_inputs([str(puzzles)], str(manifest))
+    names = [os.path.basename(name) for name in files]
+    assert names == ['easy.txt', 'hard.txt', 'easy.txt', 'hard.txt']
+    assert hrd_batch.collect_inputs([str(puzzles / 'e*.txt')]) == [str(puzzles / 'easy.txt')]
+
+
+def test_collect_puzzles(tmp_path):
+    puzzles = write_puzzles(tmp_path / 'puzzles')
+    (puzzles / 'many.txt').write_text(easy + '\n' + easy.replace('<>', '<.'))
+    files = [str(puzzles / name) for name in ('easy.txt', 'many.txt', 'missing.txt')]
+    read, invalid = hrd_batch.collect_puzzles(files)
+    assert [(os.path.basename(name), number) for name, number, puzzle in read] == [('easy.txt', None), ('many.txt', 1)]
+    assert [(os.path.basename(record['input']), record.get('puzzle')) for record in invalid] == [
+        ('many.txt', 2), ('missing.txt', None)]
+    assert 'line 7' in invalid[0]['error']
+
+
+def test_solve_puzzle(tmp_path):
+    puzzles = write_puzzles(tmp_path / 'puzzles')
+    (read,), _ = hrd_batch.collect_puzzles([str(puzzles / 'easy.txt')])
+    record = hrd_batch.solve_puzzle(*read, 'astar', {}, outdir=str(tmp_path), include_solution=True)
+    assert record['status'] == 'solved'
+    assert record['moves'] == 10
+    assert len(record['solution']) == 11
+    assert os.path.exists(str(tmp_path / 'easy.sol.txt'))
+    assert hrd_batch.output_name('a/b.txt', 'out', 3) == os.path.join('out', 'b.3.sol.txt')
+
+
+def test_cli(tmp_path):
+    puzzles = write_puzzles(tmp_path / 'puzzles')
+    outdir = tmp_path / 'solutions'
+    code, records, stderr = run_batch(str(puzzles), '--outdir', str(outdir), '--jsonl', '-', '--workers', '2')
+    assert code == 0
+    statuses = {os.path.basename(record['input']): record['status'] for record in records}
+    assert statuses == {'easy.txt': 'solved', 'hard.txt': 'solved'}
+    assert sorted(os.listdir(str(outdir))) == ['easy.sol.txt', 'hard.sol.txt']
+    assert '2 puzzles' in stderr
+
+
+def test_cli_needs_output(tmp_path):
+    puzzles = write_puzzles(tmp_path / 'puzzles')
+    code, _, stderr = run_batch(str(puzzles))
+    assert code == 2
+    assert '--outdir, --jsonl or both' in stderr
+
+
+def test_cli_many(tmp_path):
+    puzzles = write_puzzles(tmp_path / 'puzzles')
+    (puzzles / 'many.txt').write_text(easy + '\n' + easy + '\n' + easy.replace('<>', '<.'))
+    outdir = tmp_path / 'solutions'
+    code, records, _ = run_batch(str(puzzles / 'many.txt'), '--outdir', str(outdir), '--jsonl', '-')
+    assert code == 0
+    assert sorted((record.get('puzzle'), record['status']) for record in records) == [
+        (1, 'solved'), (2, 'solved'), (3, 'invalid')]
+    assert sorted(os.listdir(str(outdir))) == ['many.1.sol.txt', 'many.2.sol.txt']
+
+
+def test_cli_check(tmp_path):
+    puzzles = write_puzzles(tmp_path / 'puzzles')
+    assert run_batch(str(puzzles), '--check')[0] == 0
+    (puzzles / 'bad.txt').write_text(easy.replace('<>', '<.'))
+    code, _, stderr = run_batch(str(puzzles), '--check')
+    assert code == 1
+    assert 'bad.txt: ValueError: line 1' in stderr
+    assert '3 puzzles read' in stderr
+
+
+def test_cli_dfs_options(tmp_path):
+    puzzles = write_puzzles(tmp_path / 'puzzles')
+    code, records, _ = run_batch(str(puzzles / 'hard.txt'), '--jsonl', '-', '--algo', 'dfs', '--depth', '100')
+    assert code == 0
+    assert [(record['status'], record['lower_bound']) for record in records] == [('exhausted', 101)]
+    code, records, _ = run_batch(str(puzzles / 'hard.txt'), '--jsonl', '-', '--algo', 'hda', '--hdaworkers', '2')
+    assert [(record['status'], record['moves']) for record in records] == [('solved', 116)]
+
+
+def test_cli_bad_deepen(tmp_path):
+    puzzles = write_puzzles(tmp_path / 'puzzles')
+    code, _, stderr = run_batch(str(puzzles), '--jsonl', '-', '--algo', 'dfs', '--deepen', '0')
+    assert code == 2
+    assert '--deepen must be at least 1' in stderr
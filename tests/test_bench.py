@@ -0,0 +1,48 @@
+import json
+import os
+import queue
+import subprocess
+import sys
+
+import hrd
+import hrd_bench
+from conftest import root
+
+
+def record(moves=10, expanded=100, wall_time=1.0, peak_rss_kb=1000, status='solved'):
+    return {'puzzle': 'p', 'algo': 'astar', 'status': status, 'moves': moves, 'expanded': expanded,
+            'generated': expanded * 2, 'wall_time': wall_time, 'peak_rss_kb': peak_rss_kb}
+
+
+def test_load_corpus():
+    puzzles = hrd_bench.load_corpus(hrd_bench.default_corpus, ['v4h1_easy', 'v0h5_hardest'])
+    assert [puzzle['name'] for puzzle in puzzles] == ['v4h1_easy', 'v0h5_hardest']
+    assert all(os.path.isfile(puzzle['path']) for puzzle in puzzles)
+
+
+def test_compare():
+    baseline = {'results': [record()]}
+    assert hrd_bench.compare({'results': [record(wall_time=1.1, peak_rss_kb=1050)]}, baseline) == []
+    assert len(hrd_bench.compare({'results': [record(moves=12, expanded=101)]}, baseline)) == 3
+    assert len(hrd_bench.compare({'results': [record(wall_time=2.0)]}, baseline)) == 1
+    assert len(hrd_bench.compare({'results': [record(status='timeout')]}, baseline)) == 1
+
+
+def test_cli(tmp_path):
+    output = str(tmp_path / 'report.json')
+    command = [sys.executable, os.path.join(root, 'hrd_bench.py'), '--algo', 'astar', 'dfs',
+               '--puzzles', 'v4h1_easy', '--output', output]
+    subprocess.run(command, check=True, stderr=subprocess.PIPE)
+    report = json.load(open(output))
+    assert [(r['algo'], r['status']) for r in report['results']] == [('astar', 'solved'), ('dfs', 'solved')]
+    assert report['results'][0]['optimal']
+
+
+def test_run_case_status():
+    puzzle = hrd_bench.load_corpus(hrd_bench.default_corpus, ['v3h2_hardest'])[0]
+    records = queue.Queue()
+    hrd_bench.run_case(records, puzzle, 'astar', {'budget': hrd.Budget(nodes=1000)}, None, 1)
+    record = records.get_nowait()
+    assert (record['status'], record['exhausted']) == ('exhausted', 'nodes')
+    assert 0 < record['lower_bound'] <= puzzle['moves']
+    assert record['peak_rss_kb'] > 1000
@@ -0,0 +1,60 @@
+import pytest
+
+import hrd
+from conftest import check_solution
+from test_solve import corpus, load
+
+hardest = corpus[-1]
+
+
+@pytest.mark.parametrize('algo', ['astar', 'anytime', 'idastar', 'dfs', 'bfs', 'hda'])
+def test_node_budget(algo):
+    if algo == 'bfs' and hrd.np is None:
+        pytest.skip('bfs needs numpy')
+    result = hrd.solve(load(hardest), algo, budget=hrd.Budget(nodes=2000))
+    assert result.status == 'exhausted'
+    assert result.exhausted == 'nodes'
+    assert not result.solved
+    #checked every budget_every boards, and once a round or layer by hda and bfs
+    assert result.expanded < 2000 + 1000
+    assert 0 < result.lower_bound <= hardest['moves']
+
+
+def test_time_budget():
+    result = hrd.solve(load(hardest), 'astar', budget=hrd.Budget(seconds=0.05))
+    assert (result.status, result.exhausted) == ('exhausted', 'seconds')
+    assert result.lower_bound <= hardest['moves']
+
+
+def test_partial():
+    puzzle = corpus[3]
+    result = hrd.solve(load(puzzle), 'anytime', budget=hrd.Budget(nodes=10000))
+    assert (result.status, result.exhausted) == ('partial', 'nodes')
+    assert check_solution(result.keys()) == result.moves >= puzzle['moves']
+    assert result.lower_bound <= puzzle['moves']
+
+
+def test_within_budget():
+    puzzle = corpus[3]
+    result = hrd.solve(load(puzzle), 'anytime', budget=hrd.Budget(seconds=600, nodes=10 ** 6))
+    assert result.status == 'solved'
+    assert result.exhausted is None
+    assert check_solution(result.keys()) == result.lower_bound == puzzle['moves']
+
+
+def test_zero_nodes():
+    result = hrd.solve(load(hardest), 'astar', budget=hrd.Budget(nodes=0))
+    assert (result.status, result.exhausted) == ('exhausted', 'nodes')
+    assert result.expanded <= 1
+
+
+def test_bfs_lower_bound(monkeypatch):
+    if hrd.np is None:
+        pytest.skip('bfs needs numpy')
+    puzzle = corpus[5]
+    bounds = [hrd.solve(load(puzzle), 'bfs', budget=hrd.Budget(nodes=3000), heuristic=heuristic).lower_bound
+              for heuristic in ('manhattan', 'blocking')]
+    #the layers searched alone prove less than either
+    monkeypatch.setattr(hrd, 'np', None)
+    plain = hrd.solve(load(puzzle), 'bfs', budget=hrd.Budget(nodes=3000)).lower_bound
+    assert plain < bounds[0] <= bounds[1] <= puzzle['moves']
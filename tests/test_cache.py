@@ -0,0 +1,123 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import hrd
+from conftest import root
+
+
+def load():
+    return hrd.read_from_file(os.path.join(root, 'testhrd_hard1.txt'))
+
+
+def check_path(keys, moves):
+    keys = list(keys)
+    assert len(keys) == moves + 1
+    for prev, key in zip(keys, keys[1:]):
+        assert key in hrd.successor_keys(prev)
+    assert keys[-1] & hrd.goal_target
+
+
+def test_hit_after_solve():
+    cache = hrd.SolutionCache()
+    board = load()
+    first = hrd.solve(board, 'astar', cache)
+    assert not first.cached
+    second = hrd.solve(board, 'astar', cache)
+    assert second.cached
+    assert second.expanded == 0
+    check_path(second.keys(), first.moves)
+    assert cache.hits
+
+
+def test_board_on_cached_path():
+    cache = hrd.SolutionCache()
+    first = hrd.solve(load(), 'astar', cache)
+    #a board halfway along the solution is answered from the cache too
+    middle = list(first.keys())[first.moves // 2]
+    result = hrd.solve(hrd.Board.from_key(middle), 'astar', cache)
+    assert result.cached
+    check_path(result.keys(), first.moves - first.moves // 2)
+
+
+def test_mirrored_board():
+    cache = hrd.SolutionCache()
+    board = load()
+    moves = hrd.solve(board, 'astar', cache).moves
+    result = hrd.solve(hrd.Board.from_key(hrd.mirror_key(board.key)), 'astar', cache)
+    assert result.cached
+    check_path(result.keys(), moves)
+
+
+def test_suboptimal_solutions_kept_apart():
+    cache = hrd.SolutionCache()
+    board = load()
+    hrd.solve(board, 'dfs', cache)
+    assert hrd.solve(board, 'dfs', cache).cached
+    result = hrd.solve(board, 'astar', cache)
+    assert not result.cached
+    assert result.moves == 116
+
+
+def test_save_and_load(tmp_path):
+    filename = str(tmp_path / 'solutions.cache')
+    board = load()
+    cache = hrd.SolutionCache(filename=filename)
+    moves = hrd.solve(board, 'astar', cache).moves
+    cache.save()
+
+    loaded = hrd.SolutionCache(filename=filename)
+    assert loaded.entries == cache.entries
+    result = hrd.solve(board, 'astar', loaded)
+    assert result.cached
+    check_path(result.keys(), moves)
+
+
+def test_size_bound():
+    cache = hrd.SolutionCache(max_entries=10)
+    hrd.solve(load(), 'astar', cache)
+    assert len(cache) == 10
+
+
+def run_hrd(*args):
+    return subprocess.run([sys.executable, os.path.join(root, 'hrd.py'), '--algo', 'astar'] + list(args),
+                          stderr=subprocess.PIPE, universal_newlines=True)
+
+
+def test_cli_variant_board(tmp_path):
+    puzzle = tmp_path / 'variant.txt'
+    puzzle.write_text('size 5 5\n^11^.\nv11v.\n^<>^.\nv22v.\n2..2.\n')
+    process = run_hrd('--inputfile', str(puzzle), '--outputfile', str(tmp_path / 'out.txt'),
+                      '--cache', str(tmp_path / 'solutions.cache'))
+    assert process.returncode == 2
+    assert '--cache needs the standard 4x5 board' in process.stderr
+    assert os.listdir(str(tmp_path)) == ['variant.txt']
+
+
+def test_cli_output_before_cache(tmp_path):
+    output = tmp_path / 'out.txt'
+    process = run_hrd('--inputfile', os.path.join(root, 'testhrd_hard1.txt'), '--outputfile', str(output),
+                      '--cache', str(tmp_path / 'missing' / 'solutions.cache'))
+    assert process.returncode != 0
+    assert output.read_text().count('\n\n') == 117
+
+
+def test_damaged_file(tmp_path):
+    filename = str(tmp_path / 'solutions.cache')
+    cache = hrd.SolutionCache()
+    hrd.solve(load(), 'astar', cache)
+    cache.save(filename)
+    with open(filename, 'r+b') as cache_file:
+        cache_file.truncate(os.path.getsize(filename) - 1)
+    with pytest.raises(ValueError, match='damaged'):
+        hrd.SolutionCache(filename=filename)
+    with open(filename, 'r+b') as cache_file:
+        cache_file.truncate(4)
+    with pytest.raises(ValueError, match='not a cache file'):
+        hrd.SolutionCache(filename=filename)
+    process = run_hrd('--inputfile', os.path.join(root, 'testhrd_hard1.txt'), '--outputfile', str(tmp_path / 'out.txt'),
+                      '--cache', filename)
+    assert process.returncode == 2
+    assert 'error: {} is not a cache file'.format(filename) in process.stderr
@@ -0,0 +1,70 @@
+import json
+import os
+import subprocess
+import sys
+from array import array
+
+import hrd
+from conftest import root
+
+
+def load(name):
+    return hrd.read_from_file(os.path.join(root, name))
+
+
+def run_enumerate(*args):
+    output = subprocess.check_output([sys.executable, os.path.join(root, 'hrd_enumerate.py')] + list(args))
+    return json.loads(output.decode())
+
+
+def test_component_graph():
+    board = load('testhrd_hard1.txt')
+    component = hrd.enumerate_component(board.key)
+    assert len(component) == 13011
+    assert component[0] == hrd.canonical_key(board.key)[0]
+    packed, offsets, neighbours = hrd.component_graph(component)
+    assert list(packed) == sorted(packed)
+    edges = {(i, j) for i in range(len(packed)) for j in neighbours[offsets[i]:offsets[i + 1]]}
+    assert all((j, i) in edges for i, j in edges)
+    distances = hrd.graph_distances(packed, offsets, neighbours)
+    start = list(packed).index(hrd.pack_key(component[0]))
+    assert distances[start] == 116
+
+
+def test_graph_file(tmp_path):
+    board = load('testhrd_hard1.txt')
+    filename = str(tmp_path / 'component.graph')
+    report = run_enumerate('--inputfile', os.path.join(root, 'testhrd_hard1.txt'), '--graph', filename)
+    assert report['boards'] == 13011
+    assert report['longest_solution'] >= 116
+    with open(filename, 'rb') as graph_file:
+        data = graph_file.read()
+    magic, boards, edges = hrd.graph_header.unpack_from(data)
+    assert magic == hrd.graph_magic
+    assert boards == report['boards']
+    assert edges == 2 * report['moves']
+    assert len(data) == hrd.graph_header.size + 8 * boards + 4 * (boards + 1) + 4 * edges + boards
+    packed = array('Q', data[hrd.graph_header.size:hrd.graph_header.size + 8 * boards])
+    assert hrd.pack_key(hrd.canonical_key(board.key)[0]) in packed
+
+
+def test_layout(tmp_path):
+    report = run_enumerate('--layout', '5', '0', '4', '--graphdir', str(tmp_path))
+    assert report['boards'] == sum(component['boards'] for component in report['component_reports'])
+    assert report['components'] == len(os.listdir(str(tmp_path)))
+    assert report['solvable_components'] >= 1
+
+
+def test_workers():
+    report = run_enumerate('--inputfile', os.path.join(root, 'testhrd_hard1.txt'), '--workers', '2')
+    assert report['boards'] == 13011
+    assert report['distances']['0'] == 1
+    assert sum(report['distances'].values()) == 13011
+
+
+def test_workers_without_graph(tmp_path):
+    process = subprocess.run([sys.executable, os.path.join(root, 'hrd_enumerate.py'), '--inputfile',
+                              os.path.join(root, 'testhrd_hard1.txt'), '--workers', '2', '--graph',
+                              str(tmp_path / 'g')], stderr=subprocess.PIPE, universal_newlines=True)
+    assert process.returncode == 2
+    assert 'without --graph' in process.stderr
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import hrd
+from conftest import check_solution, root
+
+
+def test_size_header():
+    board = hrd.read_board(['size 5 5', '^11^.', 'v11v.', '^<>^.', 'v22v.', '2..2.'])
+    assert (hrd.board_width, hrd.board_height) == (5, 5)
+    result = hrd.solve(board, 'astar')
+    assert check_solution(result.keys()) == result.moves
+    assert hrd.solve(board, 'idastar').moves == result.moves
+    assert check_solution(hrd.solve(board, 'bfs').keys()) == result.moves
+    with pytest.raises(ValueError):
+        hrd.solve(board, 'db')
+
+
+def test_shaped_pieces():
+    #an L shaped goal piece and a lettered L piece, on a board without a mirror image goal
+    board = hrd.read_board(['goal 0 2', '1.aa', '11a.', '.2..', '2..2'])
+    assert len(hrd.geometry.shapes) > 4
+    result = hrd.solve(board, 'astar')
+    assert check_solution(result.keys()) == result.moves
+    assert hrd.solve(board, 'dfs').solved
+
+
+def test_classic_restored():
+    hrd.read_board(['size 5 5', '^11^.', 'v11v.', '^<>^.', 'v22v.', '2..2.'])
+    hrd.set_geometry(hrd.classic_geometry)
+    assert (hrd.board_width, hrd.board_height) == (4, 5)
+    assert hrd.goal_target == 1 << 13
+
+
+def test_interrupted_rebuild(monkeypatch):
+    variant = hrd.parse_puzzle(['size 5 5', '^11^.', 'v11v.', '^<>^.', 'v22v.', '2..2.']).geometry
+
+    def interrupted(*args):
+        raise KeyboardInterrupt()
+    with monkeypatch.context() as patch:
+        patch.setattr(hrd, 'build_shape_moves', interrupted)
+        with pytest.raises(KeyboardInterrupt):
+            hrd.set_geometry(variant)
+    assert hrd.geometry is None
+    #the next call builds every table again instead of taking the stale ones as current
+    hrd.set_geometry(hrd.classic_geometry)
+    assert hrd.geometry == hrd.classic_geometry
+    assert hrd.board_width == 4
+    assert len(hrd.successor_keys(hrd.read_board(['^11^', 'v11v', '^<>^', 'v22v', '2..2']).key)) == 4
+
+
+@pytest.mark.parametrize('options', [['--algo', 'db'], ['--heuristic', 'pdb'], ['--heuristic', 'max']])
+def test_cli_classic_only(tmp_path, options):
+    puzzle = tmp_path / 'variant.txt'
+    puzzle.write_text('size 5 5\n^11^.\nv11v.\n^<>^.\nv22v.\n2..2.\n')
+    process = subprocess.run([sys.executable, os.path.join(root, 'hrd.py'), '--inputfile', str(puzzle),
+                              '--outputfile', str(tmp_path / 'out.txt'), '--dbdir', str(tmp_path)] + options,
+                             stderr=subprocess.PIPE, universal_newlines=True)
+    assert process.returncode == 2
+    assert 'standard' in process.stderr
+    assert 'Traceback' not in process.stderr
+
+
+def test_move_table_bounded():
+    #seven empty cells: only the masks of two empty cells are kept
+    board = hrd.read_board(['size 5 5', '^11^.', 'v11v.', '^<>^.', 'v22v.', '2..2.'])
+    result = hrd.solve(board, 'astar')
+    assert result.expanded > 1000
+    assert len(hrd.move_table) == 25 * 24 // 2
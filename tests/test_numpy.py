@@ -0,0 +1,51 @@
+import os
+
+import pytest
+
+import hrd
+from conftest import root
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.fixture(scope='module')
+def keys():
+    """
+    every board on an optimal solution of testhrd_hard1, and their mirror images
+    """
+    hrd.set_geometry(hrd.classic_geometry)
+    result = hrd.solve(hrd.read_from_file(os.path.join(root, 'testhrd_hard1.txt')), 'astar')
+    keys = list(result.keys())
+    return keys + [hrd.mirror_key(key) for key in keys]
+
+
+def test_successors(keys):
+    packed = np.array([hrd.pack_key(key) for key in keys], dtype=np.uint64)
+    parents, successors = hrd.batch_successors(packed)
+    for i, key in enumerate(keys):
+        found = sorted(int(p) for p in successors[parents == i])
+        assert found == sorted(hrd.pack_key(s) for s in hrd.successor_keys(key))
+
+
+def test_canonical(keys):
+    packed = np.array([hrd.pack_key(key) for key in keys], dtype=np.uint64)
+    canonical = hrd.batch_canonical(packed)
+    assert [int(p) for p in canonical] == [hrd.pack_key(hrd.canonical_key(key)[0]) for key in keys]
+
+
+def test_scores(keys):
+    packed = np.array([hrd.pack_key(key) for key in keys], dtype=np.uint64)
+    assert list(hrd.batch_goal_flags(packed)) == [bool(key & hrd.goal_target) for key in keys]
+    assert list(hrd.batch_goal_distance(packed)) == [hrd.goal_distance(key) for key in keys]
+    assert list(hrd.batch_blocking_distance(packed)) == [hrd.blocking_distance(key) for key in keys]
+
+
+def test_layers(keys):
+    start = hrd.pack_key(hrd.canonical_key(keys[0])[0])
+    layers = list(hrd.batch_layers([start]))
+    assert len(layers[0]) == 1
+    assert sum(map(len, layers)) == 13011
+    #every layer is sorted, and no board is in two of them
+    merged = np.concatenate(layers)
+    assert len(np.unique(merged)) == len(merged)
+    assert all((np.diff(layer.astype(np.int64)) != 0).all() for layer in layers)
@@ -0,0 +1,70 @@
+import io
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import hrd
+from conftest import root
+
+
+def solve_sample():
+    return hrd.solve(hrd.read_from_file(os.path.join(root, 'testhrd_hard1.txt')), 'astar')
+
+
+def test_boards_round_trip():
+    result = solve_sample()
+    output = io.StringIO()
+    hrd.write_boards(result.keys(), output)
+    boards = output.getvalue().split('\n\n')
+    assert len([board for board in boards if board.strip()]) == 117
+    assert hrd.board_text(next(result.keys())).strip() == open(os.path.join(root, 'testhrd_hard1.txt')).read().strip()
+
+
+def test_moves_round_trip():
+    result = solve_sample()
+    output = io.StringIO()
+    hrd.write_moves(result.keys(), output)
+    #a run of moves of one piece in one direction takes one line
+    lines = output.getvalue().split('\n\n')[1].split()
+    assert len(lines) // 3 < 116
+    assert list(hrd.replay_moves(io.StringIO(output.getvalue()))) == list(result.keys())
+
+
+def test_replay_cli(tmp_path):
+    moves = str(tmp_path / 'moves.txt')
+    boards = str(tmp_path / 'boards.txt')
+    script = os.path.join(root, 'hrd.py')
+    inputfile = os.path.join(root, 'testhrd_hard1.txt')
+    subprocess.check_call([sys.executable, script, '--format', 'moves', '--inputfile', inputfile, '--outputfile', moves])
+    subprocess.check_call([sys.executable, script, '--replay', '--inputfile', moves, '--outputfile', boards])
+    output = io.StringIO()
+    hrd.write_boards(solve_sample().keys(), output)
+    assert open(boards).read() == output.getvalue()
+
+
+@pytest.mark.parametrize('moves,message', [
+    ('0 U 1', 'line 7: piece 0 can\'t move U'),
+    ('3 L 1', 'line 7: piece 3 can\'t move L'),
+    ('99 L 1', 'line 7: there is no piece 99'),
+    ('1 2', 'line 7: can\'t read'),
+    ('1 X 1', 'line 7: can\'t read'),
+    ('1 D 0', 'line 7: can\'t read'),
+])
+def test_replay_rejects_bad_moves(moves, message):
+    board = '^11^\nv11v\n^<>^\nv22v\n2..2\n\n'
+    with pytest.raises(ValueError, match=re.escape(message)):
+        list(hrd.replay_moves(io.StringIO(board + moves + '\n')))
+
+
+def test_replay_cli_error(tmp_path):
+    moves = tmp_path / 'moves.txt'
+    moves.write_text('^11^\nv11v\n^<>^\nv22v\n2..2\n\n9 L 1\n0 U 1\n')
+    output = tmp_path / 'out.txt'
+    process = subprocess.run([sys.executable, os.path.join(root, 'hrd.py'), '--replay', '--inputfile', str(moves),
+                              '--outputfile', str(output)], stderr=subprocess.PIPE, universal_newlines=True)
+    assert process.returncode == 2
+    assert 'line 8: piece 0 can\'t move U' in process.stderr
+    assert not output.exists()
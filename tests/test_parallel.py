@@ -0,0 +1,39 @@
+import os
+
+import pytest
+
+import hrd
+from conftest import root
+
+easy = ['^^<>', 'vv2^', '112v', '112^', '2..v']
+
+
+def load(name):
+    return hrd.read_from_file(os.path.join(root, name))
+
+
+@pytest.mark.parametrize('workers', [1, 3])
+def test_optimal(workers):
+    result = hrd.solve(load('testhrd_hard1.txt'), 'hda', workers=workers)
+    assert result.solved
+    assert result.moves == 116
+    keys = [state.board.key for state in result.path]
+    for prev, key in zip(keys, keys[1:]):
+        assert key in hrd.successor_keys(prev)
+
+
+@pytest.mark.parametrize('heuristic', ['manhattan', 'blocking'])
+def test_heuristics(heuristic):
+    assert hrd.solve(load('testhrd_hard1.txt'), 'hda', workers=2, heuristic=heuristic).moves == 116
+
+
+def test_key_owner_spreads_keys():
+    path = hrd.solve(load('testhrd_hard1.txt'), 'astar').path
+    owners = [hrd.key_owner(hrd.canonical_key(state.board.key)[0], 4) for state in path]
+    assert set(owners) == set(range(4))
+
+
+def test_parallel_enumerate():
+    layers = hrd.parallel_enumerate(load('testhrd_hard1.txt'), 2)
+    assert layers[0] == 1
+    assert sum(layers) == 13011
@@ -0,0 +1,95 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+import hrd
+from conftest import root
+
+classic = ['^11^', 'v11v', '^<>^', 'v22v', '2..2']
+
+
+def parse(rows, classic=False):
+    return hrd.parse_puzzle(rows, 1, classic)
+
+
+def test_classic():
+    puzzle = parse(classic, classic=True)
+    assert puzzle.geometry == hrd.classic_geometry
+
+
+@pytest.mark.parametrize('rows,message', [
+    (['^11^', 'v11v', '.<>^', 'v22v', '2..2'], 'line 4, column 1: v without a ^ above it'),
+    (['^11^', 'v11v', '^<>^', 'v22v', '2..^'], '^ without a v below it'),
+    (['^11^', 'v11v', '^<.^', 'v22v', '2..2'], '< without a >'),
+    (['^11^', 'v11v', '^.>^', 'v22v', '2..2'], '> without a <'),
+    (['^11^', 'v11v', '^<>^', 'v22v', '2..2.'], 'cells wide'),
+    (['^11^', 'v11v', '^<>^', 'v23v', '2..2'], 'unknown piece'),
+    (['^..^', 'v..v', '^<>^', 'v22v', '2..2'], 'no goal piece'),
+    (['size 4', '^11^'], 'can\'t read'),
+    (['size 4 6'] + classic, '5 rows, not 6'),
+    (['goal 3 3'] + classic, 'doesn\'t fit'),
+    (['1..1', '^..^', 'v..v', '....', '....'], 'goal piece don\'t join up'),
+    (['^11^', 'v11v', 'a..a', '....', '....'], 'piece a don\'t join up'),
+    (['goal 1'] + classic, 'can\'t read'),
+])
+def test_rejected(rows, message):
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse(rows)
+
+
+@pytest.mark.parametrize('rows,message', [
+    (['^11^', 'v1.v', '^<>^', 'v22v', '2..2'], '2x2 block'),
+    (['^11^', 'v11v', 'aa..', 'a...', '....'], 'no lettered pieces'),
+    (['^11^', 'v11v', '^..^', 'v22v', '2..2'], 'not a standard puzzle'),
+    (['size 5 5', '^11^.', 'v11v.', '^<>^.', 'v22v.', '2..2.'], 'not a standard puzzle'),
+])
+def test_rejected_classic(rows, message):
+    parse(rows)
+    with pytest.raises(ValueError, match=re.escape(message)):
+        parse(rows, classic=True)
+
+
+def test_error_names_line():
+    lines = classic + [''] + ['^11^', 'v11v', '^<>^', 'v23v', '2..2']
+    with pytest.raises(ValueError, match='line 10, column 3'):
+        list(hrd.read_puzzles(lines))
+
+
+def test_lettered_pieces():
+    puzzle = parse(['size 5 5', 'goal 3 3', 'a11b.', 'a11bb', 'aa...', '.....', '.....'])
+    assert len(puzzle.geometry.shapes) > 4
+    assert hrd.is_connected([(0, 0), (0, 1), (1, 1)])
+    assert not hrd.is_connected([(0, 0), (1, 1)])
+
+
+
+def test_read_puzzles():
+    lines = classic + ['', ''] + ['size 5 5', '^11^.', 'v11v.', '^<>^.', 'v22v.', '2..2.']
+    puzzles = list(hrd.read_puzzles(lines))
+    assert [puzzle.geometry.width for puzzle in puzzles] == [4, 5]
+    with pytest.raises(ValueError):
+        hrd.read_board(lines)
+
+
+def test_cli_error(tmp_path):
+    puzzle = tmp_path / 'bad.txt'
+    puzzle.write_text('\n'.join(classic).replace('<>', '<.') + '\n')
+    process = subprocess.run([sys.executable, os.path.join(root, 'hrd.py'), '--algo', 'astar', '--inputfile', str(puzzle),
+                              '--outputfile', str(tmp_path / 'out.txt')], stderr=subprocess.PIPE, universal_newlines=True)
+    assert process.returncode == 2
+    assert 'line 3, column 2: < without a >' in process.stderr
+    assert 'Traceback' not in process.stderr
+
+
+def test_cli_classic(tmp_path):
+    puzzle = tmp_path / 'variant.txt'
+    puzzle.write_text('size 5 5\n^11^.\nv11v.\n^<>^.\nv22v.\n2..2.\n')
+    command = [sys.executable, os.path.join(root, 'hrd.py'), '--algo', 'astar', '--inputfile', str(puzzle),
+               '--outputfile', str(tmp_path / 'out.txt')]
+    assert subprocess.run(command, stderr=subprocess.PIPE).returncode == 0
+    process = subprocess.run(command + ['--classic'], stderr=subprocess.PIPE, universal_newlines=True)
+    assert process.returncode == 2
+    assert 'not a standard puzzle' in process.stderr
@@ -0,0 +1,158 @@
+import json
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import OrderedDict
+
+import pytest
+
+import hrd
+import hrd_server
+from conftest import benchmarks, check_solution
+
+easy = '^^<>\nvv2^\n112v\n112^\n2..v\n'
+hard = open(os.path.join(benchmarks, 'v3h2_hardest.txt')).read()
+
+
+@pytest.fixture(scope='module')
+def server():
+    options = dict(heuristic='manhattan', tablesize=1 << 16, workers=2, dbdir=hrd.default_db_dir, cachesize=1000)
+    pool = hrd_server.SolverPool(2, options)
+    server = hrd_server.SolverServer(('127.0.0.1', 0), pool)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    thread.join()
+    pool.close()
+
+
+def post(server, path, value):
+    """
+    returns the status code and decoded reply of a JSON request
+    """
+    url = 'http://127.0.0.1:{}{}'.format(server.server_port, path)
+    request = urllib.request.Request(url, json.dumps(value).encode(), {'Content-Type': 'application/json'})
+    try:
+        with urllib.request.urlopen(request) as reply:
+            return reply.status, json.load(reply)
+    except urllib.error.HTTPError as error:
+        return error.code, json.load(error)
+
+
+def test_solve(server):
+    code, record = post(server, '/solve', {'id': 'easy', 'board': easy})
+    assert code == 200
+    assert (record['id'], record['status'], record['moves']) == ('easy', 'solved', 10)
+    keys = [hrd.read_board(rows).key for rows in record['solution']]
+    assert check_solution(keys) == 10
+
+
+def test_moves_format(server):
+    code, record = post(server, '/solve', {'board': easy.splitlines(), 'algo': 'dfs', 'format': 'moves'})
+    assert code == 200
+    assert record['solution']['board'] == easy.split()
+    assert sum(cells for piece, direction, cells in record['solution']['moves']) == record['moves']
+
+
+def test_cached(server):
+    post(server, '/solve', {'board': easy})
+    #one of the two workers may not have seen the board yet
+    assert any(post(server, '/solve', {'board': easy})[1]['cached'] for _ in range(4))
+
+
+def test_plain_text(server):
+    url = 'http://127.0.0.1:{}/solve?algo=idastar&id=text'.format(server.server_port)
+    request = urllib.request.Request(url, easy.encode(), {'Content-Type': 'text/plain'})
+    with urllib.request.urlopen(request) as reply:
+        record = json.load(reply)
+    assert (record['id'], record['algo'], record['moves']) == ('text', 'idastar', 10)
+
+
+@pytest.mark.parametrize('request_value', [
+    {'board': easy, 'algo': 'nope'},
+    {'board': easy, 'heuristic': 'nope'},
+    {'board': easy, 'format': 'nope'},
+    {'board': easy, 'timeout': 'soon'},
+    {'board': easy, 'nodes': 1.5},
+    {'board': easy, 'memory': 'lots'},
+    {'board': easy, 'algo': 'dfs', 'deepen': 0},
+    {'board': easy, 'algo': 'dfs', 'depth': -1},
+    {'board': easy, 'tablesize': '1000'},
+    {'board': easy, 'workers': True},
+    {'algo': 'astar'},
+    [easy],
+    {'board': easy, 'id': ['a']},
+    {'board': easy, 'id': {'a': 1}},
+    {'board': easy, 'algo': ['astar']},
+    {'board': easy, 'heuristic': ['manhattan']},
+    {'board': easy, 'format': {'moves': 1}},
+])
+def test_bad_request(server, request_value):
+    code, record = post(server, '/solve', request_value)
+    assert code == 400
+    assert record['error']
+
+
+def test_broken_board(server):
+    code, record = post(server, '/solve', {'board': '^2\nv2\n'})
+    assert code == 200
+    assert record['status'] == 'error'
+
+
+def test_not_found(server):
+    assert post(server, '/nope', {})[0] == 404
+
+
+def test_timeout(server):
+    code, record = post(server, '/solve', {'board': hard, 'algo': 'idastar', 'timeout': 0.5})
+    assert (record['status'], record['exhausted']) == ('exhausted', 'seconds')
+    assert 0 < record['lower_bound'] <= 179
+    code, record = post(server, '/solve', {'board': hard, 'algo': 'astar', 'nodes': 1000})
+    assert (record['status'], record['exhausted']) == ('exhausted', 'nodes')
+    #the worker is free again afterwards
+    assert post(server, '/solve', {'board': easy})[1]['status'] == 'solved'
+
+
+def test_cancel(server):
+    replies = []
+    thread = threading.Thread(target=lambda: replies.append(
+        post(server, '/solve', {'id': 'slow', 'board': hard, 'algo': 'idastar'})))
+    thread.start()
+    for _ in range(100):
+        if 'slow' in post_status(server)['running']:
+            break
+        time.sleep(0.05)
+    assert post(server, '/solve', {'id': 'slow', 'board': easy})[0] == 409
+    assert post(server, '/cancel', {'id': 'slow'})[1]['cancelled']
+    thread.join(30)
+    assert replies[0][1]['status'] == 'cancelled'
+    assert not post(server, '/cancel', {'id': 'slow'})[1]['cancelled']
+    assert post_status(server)['idle'] == 2
+
+
+def test_cancel_bad_id(server):
+    code, record = post(server, '/cancel', {'id': ['slow']})
+    assert code == 400
+    assert 'id must be' in record['error']
+
+
+def post_status(server):
+    with urllib.request.urlopen('http://127.0.0.1:{}/status'.format(server.server_port)) as reply:
+        return json.load(reply)
+
+
+def test_caches_bounded():
+    caches = OrderedDict()
+    options = dict(heuristic='manhattan', tablesize=0, workers=1, dbdir=hrd.default_db_dir, cachesize=100)
+    #a goal piece alone on boards of growing width: a geometry each
+    for width in range(2, 2 + hrd_server.cache_geometries + 3):
+        board = ['size {} 3'.format(width), '11' + '.' * (width - 2), '11' + '.' * (width - 2), '.' * width]
+        record = hrd_server.handle_request(width, {'id': width, 'board': board}, None, options, caches)
+        assert record['status'] == 'solved'
+        assert len(caches) <= hrd_server.cache_geometries
+    assert len(caches) == hrd_server.cache_geometries
+    assert next(reversed(caches)) == hrd.geometry
@@ -0,0 +1,98 @@
+import json
+import os
+
+import pytest
+
+import hrd
+from conftest import benchmarks, check_solution
+
+corpus = json.load(open(os.path.join(benchmarks, 'corpus.json')))
+
+# idastar takes tens of seconds on the hardest boards
+quick = [puzzle for puzzle in corpus if puzzle['moves'] <= 80]
+
+
+def load(puzzle):
+    return hrd.read_from_file(os.path.join(benchmarks, puzzle['file']))
+
+
+@pytest.mark.parametrize('puzzle', corpus, ids=lambda puzzle: puzzle['name'])
+@pytest.mark.parametrize('algo', ['astar', 'bfs', 'plain bfs'])
+def test_optimal(monkeypatch, algo, puzzle):
+    if algo == 'plain bfs':
+        #the search bfs falls back to without numpy
+        monkeypatch.setattr(hrd, 'np', None)
+        algo = 'bfs'
+    result = hrd.solve(load(puzzle), algo)
+    assert check_solution(result.keys()) == result.moves == puzzle['moves']
+
+
+@pytest.mark.parametrize('puzzle', quick, ids=lambda puzzle: puzzle['name'])
+@pytest.mark.parametrize('algo,options', [
+    ('idastar', {}),
+    ('astar', {'heuristic': 'blocking'}),
+    ('hda', {'workers': 2}),
+])
+def test_optimal_quick(algo, options, puzzle):
+    result = hrd.solve(load(puzzle), algo, **options)
+    assert check_solution(result.keys()) == puzzle['moves']
+
+
+@pytest.mark.parametrize('puzzle', quick, ids=lambda puzzle: puzzle['name'])
+def test_db(tmp_path_factory, puzzle):
+    dbdir = str(tmp_path_factory.getbasetemp() / 'db')
+    result = hrd.solve(load(puzzle), 'db', dbdir=dbdir)
+    assert check_solution(result.keys()) == puzzle['moves']
+
+
+@pytest.mark.parametrize('puzzle', corpus, ids=lambda puzzle: puzzle['name'])
+@pytest.mark.parametrize('algo', ['dfs', 'anytime'])
+def test_legal(algo, puzzle):
+    result = hrd.solve(load(puzzle), algo)
+    assert check_solution(result.keys()) == result.moves >= puzzle['moves']
+
+
+def test_dfs_depth():
+    puzzle = corpus[2]
+    cut_off = hrd.solve(load(puzzle), 'dfs', depth=puzzle['moves'] - 1)
+    assert (cut_off.status, cut_off.exhausted) == ('exhausted', 'depth')
+    assert cut_off.lower_bound == puzzle['moves']
+    result = hrd.solve(load(puzzle), 'dfs', depth=puzzle['moves'])
+    assert check_solution(result.keys()) == puzzle['moves']
+
+
+def test_dfs_deepen():
+    puzzle = corpus[3]
+    result = hrd.solve(load(puzzle), 'dfs', deepen=4)
+    assert puzzle['moves'] <= check_solution(result.keys()) < puzzle['moves'] + 4
+
+
+def test_dfs_shorten():
+    puzzle = corpus[4]
+    short = hrd.solve(load(puzzle), 'dfs')
+    long = hrd.solve(load(puzzle), 'dfs', shorten=False)
+    assert short.expanded == long.expanded
+    assert check_solution(short.keys()) <= check_solution(long.keys())
+
+
+@pytest.mark.parametrize('algo', ['dfs', 'astar', 'bfs', 'idastar'])
+def test_unsolvable(algo):
+    #the goal piece is walled in by the horizontal piece below it
+    board = hrd.read_board(['211^', '211v', '2<>2', '.^^^', '.vvv'])
+    result = hrd.solve(board, algo)
+    assert result.status == 'no solution'
+    if algo != 'idastar': # which expands boards again in every iteration
+        assert result.expanded == 248
+
+
+def test_idastar_unsolvable_small_table():
+    board = hrd.read_board(['211^', '211v', '2<>2', '.^^^', '.vvv'])
+    #the table can't hold every board, so nothing proves the goal out of reach
+    result = hrd.solve(board, 'idastar', tablesize=100, budget=hrd.Budget(nodes=20000))
+    assert (result.status, result.exhausted) == ('exhausted', 'nodes')
+
+
+@pytest.mark.parametrize('options', [{'deepen': 0}, {'deepen': -2}, {'depth': -1}])
+def test_dfs_bad_limits(options):
+    with pytest.raises(ValueError):
+        hrd.solve(load(corpus[0]), 'dfs', **options)
@@ -0,0 +1,89 @@
+import os
+
+import pytest
+
+import hrd
+from conftest import root
+
+
+def test_round_trip(tmp_path):
+    filename = str(tmp_path / 'table.db')
+    keys = [7, 1 << 63, 3, 12345678901234]
+    values = [1, 2, 3, 4]
+    hrd.write_key_table(filename, keys, values)
+    table = hrd.KeyTable(filename)
+    assert len(table) == len(keys)
+    assert list(table.keys) == sorted(keys)
+    for key, value in zip(keys, values):
+        assert key in table
+        assert table.get(key) == value
+    assert 5 not in table
+    assert table.get(5, -1) == -1
+
+
+@pytest.mark.parametrize('width', [0, 1, 2, 4])
+def test_widths(tmp_path, width):
+    filename = str(tmp_path / 'table.db')
+    keys = list(range(0, 3000, 3))
+    if width:
+        hrd.write_key_table(filename, keys, [key % 200 for key in keys], width)
+    else:
+        hrd.write_key_table(filename, keys)
+    table = hrd.KeyTable(filename)
+    assert len(table) == len(keys)
+    assert table.find(2997) == len(keys) - 1
+    assert table.find(2998) == -1
+    if width:
+        assert table.get(2997) == 2997 % 200
+    else:
+        assert table.values is None
+
+
+def test_no_temporary_files_left(tmp_path):
+    hrd.write_key_table(str(tmp_path / 'table.db'), [1, 2], [3, 4])
+    assert os.listdir(str(tmp_path)) == ['table.db']
+
+
+def test_damaged(tmp_path):
+    filename = str(tmp_path / 'table.db')
+    hrd.write_key_table(filename, [1, 2, 3], [4, 5, 6])
+    with open(filename, 'r+b') as table_file:
+        table_file.truncate(os.path.getsize(filename) - 1)
+    with pytest.raises(ValueError, match='damaged'):
+        hrd.KeyTable(filename)
+    open(filename, 'wb').close()
+    with pytest.raises(ValueError, match='not a table file'):
+        hrd.KeyTable(filename)
+
+
+def test_not_a_table(tmp_path):
+    filename = str(tmp_path / 'table.db')
+    with open(filename, 'wb') as table_file:
+        table_file.write(b'x' * 64)
+    with pytest.raises(ValueError, match='not a table file'):
+        hrd.KeyTable(filename)
+
+
+def test_solution_db(tmp_path):
+    board = hrd.read_from_file(os.path.join(root, 'testhrd_hard1.txt'))
+    db = hrd.load_solution_db(hrd.key_layout(board.key), str(tmp_path))
+    assert db.distance(board.key) == 116
+    assert db.distance(hrd.mirror_key(board.key)) == 116
+    #opened again from the file, not rebuilt
+    hrd.open_tables.clear()
+    assert hrd.load_solution_db(hrd.key_layout(board.key), str(tmp_path)).distance(board.key) == 116
+    hrd.open_tables.clear()
+
+
+def test_solution_db_rebuilt(tmp_path):
+    layout = (4, 1, 4)
+    dbdir = str(tmp_path)
+    distances = hrd.load_solution_db(layout, dbdir)
+    size = len(distances)
+    hrd.open_tables.clear()
+    filename = hrd.db_path(layout, dbdir)
+    with open(filename, 'r+b') as table_file:
+        table_file.truncate(100)
+    rebuilt = hrd.load_solution_db(layout, dbdir)
+    assert len(rebuilt) == size
+    hrd.open_tables.clear()